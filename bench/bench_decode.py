@@ -0,0 +1,107 @@
+"""
+解码微基准：比较各解码器在数千个短片段上的单次延迟与吞吐。
+
+    python -m bench.bench_decode --count 3000 [--db words.db] [--json decode.json]
+
+片段优先取自数据库 audio 表（不足时循环使用），库中没有音频时生成合成 wav 片段。
+"""
+import argparse
+import json
+import os
+import sqlite3
+import time
+import wave
+from io import BytesIO
+
+import numpy as np
+
+from util import audio_decode
+
+
+def synth_wav(seconds=0.8, rate=24000, freq=440.0):
+    """生成一段 16 位单声道正弦波 wav"""
+    t = np.arange(int(seconds * rate), dtype=np.float32) / rate
+    samples = (0.3 * np.sin(2 * np.pi * freq * t) * 32767).astype(np.int16)
+    buf = BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(samples.tobytes())
+    return buf.getvalue()
+
+
+def load_clips(db_path, count):
+    clips = []
+    if db_path and os.path.exists(db_path):
+        conn = sqlite3.connect(db_path)
+        try:
+            clips = conn.execute("SELECT data, format FROM audio LIMIT ?", (count,)).fetchall()
+        except sqlite3.OperationalError:
+            clips = []
+        finally:
+            conn.close()
+    if not clips:
+        clips = [(synth_wav(freq=220.0 + 20 * i), "wav") for i in range(50)]
+    return [clips[i % len(clips)] for i in range(count)]
+
+
+def bench_decoder(name, clips):
+    audio_decode.set_decoder(name)
+    latencies, errors, audio_seconds = [], 0, 0.0
+    start = time.perf_counter()
+    try:
+        for data, fmt in clips:
+            t0 = time.perf_counter()
+            try:
+                samples, frame_rate, channels = audio_decode.decode(data, fmt)
+            except Exception:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - t0)
+            audio_seconds += samples.size / channels / frame_rate
+    finally:
+        audio_decode.set_decoder(None)
+    elapsed = time.perf_counter() - start
+    result = {"decoder": name, "clips": len(clips), "errors": errors}
+    if latencies:
+        ms = np.array(latencies) * 1000
+        result.update({
+            "mean_ms": float(ms.mean()),
+            "p50_ms": float(np.percentile(ms, 50)),
+            "p95_ms": float(np.percentile(ms, 95)),
+            "clips_per_sec": len(latencies) / elapsed,
+            "audio_x_realtime": audio_seconds / elapsed,
+        })
+    return result
+
+
+def run(count=2000, db_path="words.db", decoders=None):
+    clips = load_clips(db_path, count)
+    names = decoders or audio_decode.available_decoders()
+    return [bench_decoder(name, clips) for name in names]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="音频解码微基准")
+    parser.add_argument("--count", type=int, default=2000)
+    parser.add_argument("--db", default="words.db")
+    parser.add_argument("--decoders", help="逗号分隔的解码器名称，默认全部可用的")
+    parser.add_argument("--json", help="结果写入 JSON 文件")
+    args = parser.parse_args()
+
+    decoders = args.decoders.split(",") if args.decoders else None
+    results = run(args.count, args.db, decoders)
+    for r in results:
+        if "mean_ms" in r:
+            print(f"{r['decoder']:>10}: mean {r['mean_ms']:.2f}ms  p50 {r['p50_ms']:.2f}ms  "
+                  f"p95 {r['p95_ms']:.2f}ms  {r['clips_per_sec']:.0f} clips/s  errors {r['errors']}")
+        else:
+            print(f"{r['decoder']:>10}: 全部失败 ({r['errors']} 个片段)")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+存储基准：大文件导入进行时，UI 读取页面的延迟是否仍然稳定。
+
+    python -m bench.bench_storage --rows 50000 [--json storage.json]
+
+在临时目录中建库（通过 WORDLEARNER_DB），使用 FakeTTSBackend，不访问网络。
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+
+def write_deck(path, rows, seed=0):
+    rng = random.Random(seed)
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(rows):
+            f.write(f"word{rng.randint(0, rows)}\t释义{i % 7}\t/ipa{i}/\n")
+
+
+def summarize(latencies, errors):
+    if not latencies:
+        return {"count": 0, "errors": errors}
+    ms = np.array(latencies) * 1000
+    return {
+        "count": len(latencies),
+        "errors": errors,
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "max_ms": float(ms.max()),
+    }
+
+
+def measure_pages(word_service, file_id, pages, page_size, until):
+    """循环随机读页，直到 until() 返回 True"""
+    latencies, errors = [], 0
+    while not until():
+        page = random.randrange(pages)
+        t0 = time.perf_counter()
+        try:
+            word_service._load_page(file_id, page, page_size)
+        except Exception as e:
+            errors += 1
+            print(f"读页失败: {e}")
+        latencies.append(time.perf_counter() - t0)
+        time.sleep(0.005)
+    return latencies, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="导入期间的页面读取延迟基准")
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--page-size", type=int, default=30)
+    parser.add_argument("--json", help="结果写入 JSON 文件")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="wl-bench-")
+    os.environ["WORDLEARNER_DB"] = os.path.join(tmp, "words.db")
+
+    from model import ensure_db
+    from service.file_service import FileService
+    from service.tts_service import FakeTTSBackend
+    from service.word_service import WordService
+
+    ensure_db()
+    backend = FakeTTSBackend()
+    seed_path = os.path.join(tmp, "seed.tsv")
+    write_deck(seed_path, 5000, seed=1)
+    for _ in FileService.import_file_bulk(seed_path, tts_backend=backend, tts_rate_limit=None):
+        pass
+    file_id = FileService.get_file_id("seed.tsv")
+    pages = max(WordService.count_displays(file_id) // args.page_size, 1)
+
+    deadline = time.perf_counter() + 2.0
+    idle = summarize(*measure_pages(WordService, file_id, pages, args.page_size,
+                                    lambda: time.perf_counter() > deadline))
+
+    big_path = os.path.join(tmp, "big.tsv")
+    write_deck(big_path, args.rows, seed=2)
+    done = threading.Event()
+    import_result = {}
+
+    def run_import():
+        t0 = time.perf_counter()
+        try:
+            for _ in FileService.import_file_bulk(big_path, tts_backend=backend, tts_rate_limit=None):
+                pass
+        except Exception as e:
+            import_result["error"] = str(e)
+        import_result["seconds"] = time.perf_counter() - t0
+        done.set()
+
+    threading.Thread(target=run_import, daemon=True).start()
+    busy = summarize(*measure_pages(WordService, file_id, pages, args.page_size, done.is_set))
+
+    result = {"rows": args.rows, "idle": idle, "during_import": busy, "import": import_result}
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+批量合成基准：对比逐词合成与批量合成（按静音切分）的请求次数、耗时与切分准确度。
+
+    python -m bench.bench_tts_batch --words 2000 --batch 20 --latency 0.05 [--json tts.json]
+
+使用本地 SyntheticTTSBackend，latency 模拟每次请求的网络往返；
+准确度：批量切出的片段与单独合成同一单词的片段相比，有声部分时长相差不超过 TOLERANCE_MS
+（片段保持 wav，不让 mp3 编码的首尾填充影响比较）。
+"""
+import argparse
+import json
+import random
+import time
+
+from service.tts_batch import BatchTTSBackend, SyntheticTTSBackend, split_on_silence
+from service.tts_service import TTSPipeline
+from util import audio_decode
+
+TOLERANCE_MS = 20
+_SYLLABLES = ("ab", "ble", "con", "dis", "er", "in", "ly", "ment", "ness", "pro", "tion", "un", "ver")
+
+
+def make_words(count, seed=0, phrase_ratio=0.1):
+    """随机单词与少量词组（含空格），不含标点"""
+    rng = random.Random(seed)
+
+    def word():
+        return "".join(rng.choice(_SYLLABLES) for _ in range(rng.randint(1, 4)))
+
+    return [
+        f"{word()} {word()}" if rng.random() < phrase_ratio else word()
+        for _ in range(count)
+    ]
+
+
+def _synthesize_all(backend, words, workers):
+    t0 = time.perf_counter()
+    with TTSPipeline(backend, workers=workers, rate_limit=None) as tts:
+        for i, w in enumerate(words):
+            tts.submit(i, w)
+        results = dict(tts.drain(wait=True))
+    return results, time.perf_counter() - t0
+
+
+def _voiced_ms(data):
+    samples, frame_rate, channels = audio_decode.decode(data, "wav")
+    bounds = split_on_silence(samples, frame_rate, 1, channels, pad_ms=0)
+    return None if bounds is None else (bounds[0][1] - bounds[0][0]) * 1000 / frame_rate
+
+
+def run(words=2000, batch=20, latency=0.05, workers=4, seed=0):
+    texts = make_words(words, seed)
+
+    single = SyntheticTTSBackend(latency=latency)
+    single_results, single_s = _synthesize_all(single, texts, workers)
+
+    batched = BatchTTSBackend(SyntheticTTSBackend(latency=latency), batch_words=batch, compress=False)
+    batch_results, batch_s = _synthesize_all(batched, texts, workers)
+
+    mismatched = sum(
+        1 for i in range(len(texts))
+        if not batch_results[i] or not single_results[i]
+        or abs(_voiced_ms(batch_results[i]) - _voiced_ms(single_results[i])) > TOLERANCE_MS
+    )
+    return {
+        "words": words,
+        "batch_words": batch,
+        "latency_ms": latency * 1000,
+        "single_requests": single.calls,
+        "batch_requests": batched.requests,
+        "request_ratio": single.calls / max(1, batched.requests),
+        "fallback_batches": batched.fallbacks,
+        "single_words_per_sec": words / single_s,
+        "batch_words_per_sec": words / batch_s,
+        "mismatched_clips": mismatched,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="批量合成基准")
+    parser.add_argument("--words", type=int, default=2000)
+    parser.add_argument("--batch", type=int, default=20, help="每次请求的单词数")
+    parser.add_argument("--latency", type=float, default=0.05, help="模拟的每次请求耗时（秒）")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--json", help="结果写入 JSON 文件")
+    args = parser.parse_args()
+
+    result = run(args.words, args.batch, args.latency, args.workers)
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
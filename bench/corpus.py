@@ -0,0 +1,50 @@
+"""
+合成单词表：行数与重复比例可控、按种子可复现。
+
+    python -m bench.corpus deck.tsv --lines 100000 --dup 0.3
+"""
+import argparse
+import random
+
+
+def iter_deck(lines, dup_ratio=0.2, seed=0, prefix="word"):
+    """
+    yield (word, trans, ipa)：共 lines 行，其中约 dup_ratio 比例的行与之前某行完全相同，
+    另有少量只差大小写的变体（同一单词小写后相同、翻译相同，导入时应去重）。
+    """
+    if not 0 <= dup_ratio < 1:
+        raise ValueError("dup_ratio 必须在 [0, 1) 之间")
+    rng = random.Random(seed)
+    unique = max(1, int(round(lines * (1 - dup_ratio))))
+    order = list(range(unique)) + [rng.randrange(unique) for _ in range(lines - unique)]
+    rng.shuffle(order)
+    for i in order[:lines]:
+        word = f"{prefix}{i}"
+        if i % 50 == 0 and rng.random() < 0.5:
+            word = word.capitalize()
+        yield word, f"释义{i % 97}-{i % 13}", f"/{prefix[:2]}{i % 1000}/"
+
+
+def write_deck(path, lines, dup_ratio=0.2, seed=0, prefix="word"):
+    """写出 TSV，返回实际行数"""
+    count = 0
+    with open(path, "w", encoding="utf-8") as f:
+        for word, trans, ipa in iter_deck(lines, dup_ratio, seed, prefix):
+            f.write(f"{word}\t{trans}\t{ipa}\n")
+            count += 1
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="生成合成单词表")
+    parser.add_argument("path")
+    parser.add_argument("--lines", type=int, default=10000)
+    parser.add_argument("--dup", type=float, default=0.2, help="重复行比例")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--prefix", default="word")
+    args = parser.parse_args()
+    print(f"写入 {write_deck(args.path, args.lines, args.dup, args.seed, args.prefix)} 行 -> {args.path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+"""
+基准套件：按不同规模生成合成单词表，在临时库中测量热点路径，结果写成 JSON，便于比较不同提交。
+
+    python -m bench.run_bench --sizes 1000,10000,100000 --dup 0.2 --json bench.json
+    python -m bench.run_bench --sizes 10000 --json new.json --compare bench.json
+
+每个规模在独立子进程和临时数据库（WORDLEARNER_DB）中运行；
+token2voice 与默认 TTS 后端都换成本地确定性的假合成器，不访问网络。
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from bench.corpus import write_deck
+
+DEFAULT_SIZES = "1000,10000"
+PAGE_SIZE = 30
+SEARCH_QUERIES = ("word1", "ord12", "释义3", "/wo", "legacy", "zzz")
+# 对比时只看这些指标（延迟分位数与吞吐），计数类字段不参与
+COMPARED_SUFFIXES = ("p50_ms", "p95_ms", "flush_ms", "submit_us_per_op", "rows_per_sec", "clips_per_sec",
+                     "import_ms", "first_window_ms", "file_list_ms", "words_per_sec")
+
+
+def timing(latencies):
+    """延迟列表（秒）-> 统计（毫秒）"""
+    if not latencies:
+        return {"count": 0}
+    ms = np.array(latencies) * 1000
+    return {
+        "count": len(latencies),
+        "mean_ms": float(ms.mean()),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "max_ms": float(ms.max()),
+    }
+
+
+def timed(fn, *args, **kwargs):
+    t0 = time.perf_counter()
+    fn(*args, **kwargs)
+    return time.perf_counter() - t0
+
+
+def _install_fake_tts():
+    """默认后端与 token2voice 都换成假合成器"""
+    import service.tts_service as tts_service
+    import util.audio_util as audio_util
+
+    backend = tts_service.FakeTTSBackend()
+    fake = lambda text, *args, **kwargs: backend.synthesize(text)  # noqa: E731
+    tts_service.token2voice = fake
+    audio_util.token2voice = fake
+    tts_service.set_default_backend(backend)
+    return backend
+
+
+def run_size(size, dup, seed, ops, legacy_max, workdir):
+    """在当前进程（数据库已由 WORDLEARNER_DB 指定）中测量一个规模"""
+    deck = os.path.join(workdir, f"deck{size}.tsv")
+    write_deck(deck, size, dup, seed)
+
+    from model import ensure_db
+    from service.file_service import FileService
+    from service.review_service import ReviewService
+    from service.search_service import SearchService
+    from service.word_service import WordService
+    from service.write_behind import WriteBehindQueue
+
+    ensure_db()
+    backend = _install_fake_tts()
+    rng = random.Random(seed)
+    results = {"lines": size, "dup_ratio": dup}
+
+    t0 = time.perf_counter()
+    for _ in FileService.import_file_bulk(deck, tts_backend=backend, tts_rate_limit=None):
+        pass
+    seconds = time.perf_counter() - t0
+    results["import_bulk"] = {"seconds": seconds, "rows_per_sec": size / seconds, "tts_calls": backend.calls}
+
+    if size <= legacy_max:
+        legacy = os.path.join(workdir, f"legacy{size}.tsv")
+        write_deck(legacy, size, dup, seed + 1, prefix="legacy")
+        t0 = time.perf_counter()
+        for _ in FileService.import_file(legacy):
+            pass
+        seconds = time.perf_counter() - t0
+        results["import_legacy"] = {"seconds": seconds, "rows_per_sec": size / seconds}
+
+    file_id = FileService.get_file_id(os.path.basename(deck))
+    total = WordService.count_displays(file_id)
+    pages = max(total // PAGE_SIZE, 1)
+    results["displays"] = total
+
+    # OFFSET 分页（非页对齐的 offset 走旧的 OFFSET 查询）：首页、中间、末页
+    results["page_offset"] = {
+        name: timing([timed(WordService.get_displays_by_page, file_id, PAGE_SIZE, page * PAGE_SIZE + 1)
+                      for _ in range(20)])
+        for name, page in (("first", 0), ("middle", pages // 2), ("last", pages - 1))
+    }
+    results["page_keyset_cold"] = timing([
+        timed(WordService._load_page, file_id, rng.randrange(pages), PAGE_SIZE) for _ in range(ops)
+    ])
+    WordService.get_page(file_id, 0, PAGE_SIZE, prefetch=False)
+    results["page_cached"] = timing([
+        timed(WordService.get_page, file_id, 0, PAGE_SIZE, prefetch=False) for _ in range(ops)
+    ])
+
+    def sample_displays(n):
+        found = []
+        while len(found) < n:
+            found.extend(WordService._load_page(file_id, rng.randrange(pages), PAGE_SIZE).values())
+        return found[:n]
+
+    results["toggle"] = timing([timed(WordService.toggle_unlearned, d) for d in sample_displays(ops)])
+
+    latencies = []
+    for d in sample_displays(ops):
+        d.trans = d.trans + "*"
+        latencies.append(timed(WordService.update_display, d, "trans"))
+    results["edit_trans"] = timing(latencies)
+
+    latencies = []
+    for d in sample_displays(ops):
+        d.word = d.word + "x"
+        latencies.append(timed(WordService.update_display, d, "word"))
+    results["edit_word"] = timing(latencies)
+
+    queue = WriteBehindQueue(flush_interval=3600)
+    displays = sample_displays(ops * 5)
+    t0 = time.perf_counter()
+    for d in displays:
+        queue.toggle_unlearned(d)
+    submit = time.perf_counter() - t0
+    flush = timed(queue.flush)
+    queue.close()
+    results["write_behind"] = {
+        "ops": len(displays),
+        "submit_us_per_op": submit / len(displays) * 1e6,
+        "flush_ms": flush * 1000,
+    }
+
+    results["search"] = timing([timed(SearchService.search, q) for q in SEARCH_QUERIES for _ in range(5)])
+    results["review_next_due"] = timing([timed(ReviewService.next_due, 30) for _ in range(20)])
+    return results
+
+
+def run_decode(count):
+    from bench import bench_decode
+    return bench_decode.run(count, db_path=None)
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _run_child(size, args, workdir):
+    """在子进程中运行一个规模，避免数据库与缓存在规模之间共享"""
+    out = os.path.join(workdir, f"result{size}.json")
+    env = dict(os.environ, WORDLEARNER_DB=os.path.join(workdir, f"bench{size}.db"))
+    cmd = [sys.executable, "-m", "bench.run_bench", "--child", str(size), "--out", out,
+           "--dup", str(args.dup), "--seed", str(args.seed), "--ops", str(args.ops),
+           "--legacy-max", str(args.legacy_max), "--workdir", workdir]
+    subprocess.run(cmd, env=env, check=True)
+    with open(out, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _flatten(prefix, value, out):
+    if isinstance(value, dict):
+        for key, item in value.items():
+            _flatten(f"{prefix}.{key}" if prefix else str(key), item, out)
+    elif isinstance(value, list):
+        for item in value:
+            if isinstance(item, dict) and "decoder" in item:
+                _flatten(f"{prefix}.{item['decoder']}", item, out)
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        out[prefix] = value
+    return out
+
+
+def compare(current, baseline, threshold=0.2):
+    """打印与基线相比变化超过 threshold 的延迟 / 吞吐指标"""
+    now = _flatten("", current["results"], {})
+    before = _flatten("", baseline["results"], {})
+    print(f"\n对比基线 {baseline['meta'].get('commit')} -> {current['meta'].get('commit')}")
+    for key in sorted(now.keys() & before.keys()):
+        if not key.endswith(COMPARED_SUFFIXES):
+            continue
+        old, new = before[key], now[key]
+        if old and abs(new - old) / abs(old) > threshold:
+            print(f"  {key}: {old:.3f} -> {new:.3f} ({(new - old) / abs(old) * 100:+.0f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="WordLearner 热点路径基准套件")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="逗号分隔的行数（1000 ~ 1000000）")
+    parser.add_argument("--dup", type=float, default=0.2, help="重复行比例")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--ops", type=int, default=200, help="每项单次操作的采样次数")
+    parser.add_argument("--legacy-max", type=int, default=2000, help="超过此行数不跑逐行导入")
+    parser.add_argument("--decode-count", type=int, default=300)
+    parser.add_argument("--tts-words", type=int, default=1000, help="批量合成基准的单词数，0 表示跳过")
+    parser.add_argument("--startup-runs", type=int, default=3, help="冷启动测量次数，0 表示跳过")
+    parser.add_argument("--json", help="结果写入 JSON 文件")
+    parser.add_argument("--compare", help="与之前的 JSON 结果对比")
+    parser.add_argument("--threshold", type=float, default=0.2, help="对比时报告的最小变化比例")
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--out", help=argparse.SUPPRESS)
+    parser.add_argument("--workdir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        result = run_size(args.child, args.dup, args.seed, args.ops, args.legacy_max, args.workdir)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(result, f)
+        return
+
+    workdir = tempfile.mkdtemp(prefix="wl-bench-")
+    results = {}
+    for size in (int(s) for s in args.sizes.split(",")):
+        print(f"== {size} 行 ==")
+        results[str(size)] = _run_child(size, args, workdir)
+    results["decode"] = run_decode(args.decode_count)
+    if args.tts_words:
+        from bench import bench_tts_batch
+        results["tts_batch"] = bench_tts_batch.run(args.tts_words)
+    if args.startup_runs:
+        from bench import startup
+        results["startup"] = startup.run(args.startup_runs, top=10)
+
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "args": {"sizes": args.sizes, "dup": args.dup, "seed": args.seed, "ops": args.ops,
+                     "tts_words": args.tts_words, "startup_runs": args.startup_runs},
+        },
+        "results": results,
+    }
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(report, json.load(f), args.threshold)
+
+
+if __name__ == "__main__":
+    main()
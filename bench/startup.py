@@ -0,0 +1,124 @@
+"""
+冷启动基准：界面模块的导入耗时剖析，以及从启动进程到窗口显示 / 文件列表加载完成的耗时。
+
+    python -m bench.startup                  # 导入剖析 + 首窗耗时（需要图形环境）
+    python -m bench.startup --runs 5 --top 20 --json startup.json
+
+导入剖析基于 python -X importtime，在子进程与临时数据库中运行；
+DEFERRED 中的模块应当在窗口出现之后才导入，出现在剖析结果里即视为回退。
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+UI_MODULE = "view.word_app"
+# 启动路径上不应导入的重量级模块（音频解码 / 播放 / 在线合成）
+DEFERRED = ("numpy", "pydub", "sounddevice", "gtts", "requests", "service.audio_service", "service.audio_pack")
+WINDOW_TIMEOUT = 60
+
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def _env(db_path, **extra):
+    env = dict(os.environ, WORDLEARNER_DB=db_path, **extra)
+    env["PYTHONPATH"] = os.pathsep.join(p for p in (ROOT, env.get("PYTHONPATH")) if p)
+    return env
+
+
+def import_profile(module=UI_MODULE, db_path=None, top=15):
+    """
+    在子进程中导入 module，返回 {"import_ms", "wall_ms", "top", "deferred_loaded"}：
+    import_ms 为 module 的累计导入耗时，top 为自身耗时最多的模块。
+    """
+    db_path = db_path or os.path.join(tempfile.mkdtemp(prefix="wl-startup-"), "words.db")
+    t0 = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          env=_env(db_path), cwd=ROOT, capture_output=True, text=True)
+    wall = time.perf_counter() - t0
+    if proc.returncode != 0:
+        raise RuntimeError(f"导入 {module} 失败:\n{proc.stderr[-2000:]}")
+
+    rows = []
+    for line in proc.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            rows.append((name, int(self_us) / 1000, int(cumulative_us) / 1000, len(indent) // 2))
+    total = next((cumulative for name, _, cumulative, depth in rows if name == module and depth == 0), None)
+    loaded = {name for name, _, _, _ in rows}
+    return {
+        "module": module,
+        "import_ms": total,
+        "wall_ms": wall * 1000,
+        "top": [
+            {"module": name, "self_ms": self_ms, "cumulative_ms": cumulative}
+            for name, self_ms, cumulative, _ in sorted(rows, key=lambda r: r[1], reverse=True)[:top]
+        ],
+        "deferred_loaded": sorted(m for m in DEFERRED if m in loaded),
+    }
+
+
+def first_window(db_path=None):
+    """
+    启动 main_app（WORDLEARNER_STARTUP_PROBE=1），返回 {"first_window_ms", "file_list_ms", "wall_ms"}；
+    前两项从 main_app 开始执行算起，wall_ms 从启动进程算起（含解释器启动）。
+    没有图形环境时返回 None。
+    """
+    db_path = db_path or os.path.join(tempfile.mkdtemp(prefix="wl-startup-"), "words.db")
+    t0 = time.perf_counter()
+    try:
+        proc = subprocess.run([sys.executable, "main_app.py"], env=_env(db_path, WORDLEARNER_STARTUP_PROBE="1"),
+                              cwd=ROOT, capture_output=True, text=True, timeout=WINDOW_TIMEOUT)
+    except subprocess.TimeoutExpired:
+        print("首窗测量超时")
+        return None
+    wall = time.perf_counter() - t0
+    for line in reversed(proc.stdout.splitlines()):
+        if line.startswith("{"):
+            result = json.loads(line)
+            result["wall_ms"] = wall * 1000
+            return result
+    print(f"首窗测量不可用（无图形环境？）: {proc.stderr.strip().splitlines()[-1:] or proc.returncode}")
+    return None
+
+
+def run(runs=3, top=15, db_path=None):
+    """多次测量取中位数（首次运行含磁盘缓存预热，只用于剖析明细）"""
+    profiles = [import_profile(db_path=db_path, top=top) for _ in range(runs)]
+    profile = sorted(profiles, key=lambda p: p["import_ms"] or 0)[len(profiles) // 2]
+    windows = [w for w in (first_window(db_path) for _ in range(runs)) if w]
+    window = sorted(windows, key=lambda w: w["file_list_ms"])[len(windows) // 2] if windows else None
+    return {"import": profile, "window": window}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="WordLearner 冷启动基准")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=15, help="列出自身导入耗时最多的模块数")
+    parser.add_argument("--db", help="使用已有数据库（默认临时空库）")
+    parser.add_argument("--json", help="结果写入 JSON 文件")
+    args = parser.parse_args()
+
+    result = run(args.runs, args.top, args.db)
+    profile = result["import"]
+    print(f"导入 {profile['module']}: {profile['import_ms']:.1f} ms（进程 {profile['wall_ms']:.0f} ms）")
+    for row in profile["top"]:
+        print(f"  {row['module']:<48}{row['self_ms']:>8.1f} ms{row['cumulative_ms']:>10.1f} ms")
+    if profile["deferred_loaded"]:
+        print(f"警告：启动路径导入了应延迟加载的模块: {', '.join(profile['deferred_loaded'])}")
+    if result["window"]:
+        w = result["window"]
+        print(f"首窗 {w['first_window_ms']:.0f} ms，文件列表 {w['file_list_ms']:.0f} ms（含进程启动 {w['wall_ms']:.0f} ms）")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""
+命令行入口（无界面）。
+
+    python cli.py import decks/                 # 导入目录下的全部 .tsv / .txt
+    python cli.py import "decks/*.tsv" a.tsv --workers 4
+    python cli.py export deck.tsv deck.wlpack   # 导出卡组（单词、学习状态与音频）
+    python cli.py import-pack deck.wlpack       # 导入卡组，不调用 TTS
+    python cli.py stats                         # 库的概况：单词、复习、音频与补齐进度
+    python cli.py backfill-audio --workers 8    # 为缺少音频的单词补合成（可中断续跑）
+    python cli.py backfill-audio --tts-batch 20 # 每次请求合成 20 个单词，按静音切分（无 ffmpeg 时存为 wav，体积约 10 倍）
+    python cli.py schema                        # 迁移到最新版本并检查热点查询的执行计划
+"""
+import argparse
+import json
+import sys
+import time
+
+
+def _tts_backend(args):
+    backend = None
+    if args.fake_tts:
+        from service.tts_service import FakeTTSBackend
+        backend = FakeTTSBackend()
+    elif args.synthetic_tts:
+        from service.tts_batch import SyntheticTTSBackend
+        backend = SyntheticTTSBackend()
+    if args.tts_batch > 1:
+        if args.fake_tts:
+            sys.exit("--fake-tts 生成的不是音频，无法按静音切分；批量合成请用 --synthetic-tts")
+        from service.tts_batch import BatchTTSBackend
+        backend = BatchTTSBackend(backend, batch_words=args.tts_batch)
+    return backend
+
+
+def _add_tts_arguments(p):
+    p.add_argument("--rate-limit", type=float, default=None, help="TTS 每秒请求数，0 表示不限速")
+    p.add_argument("--tts-batch", type=int, default=1, help="每次请求合成的单词数（按静音切分；有 ffmpeg 时存为 mp3，否则存为 wav，体积约 10 倍）")
+    fake = p.add_mutually_exclusive_group()
+    fake.add_argument("--fake-tts", action="store_true", help="使用本地假合成器（测试用）")
+    fake.add_argument("--synthetic-tts", action="store_true", help="使用本地合成音频生成器（测试用）")
+
+
+def _rate_limit(args):
+    """未指定时用默认限速，0 表示不限速"""
+    from service.tts_service import TTS_RATE_LIMIT
+    if args.rate_limit is None:
+        return TTS_RATE_LIMIT
+    return args.rate_limit or None
+
+
+def cmd_import(args):
+    from service.file_service import FileService, IMPORT_BATCH_SIZE
+
+    _print_progress("导入进度", FileService.import_many(
+        args.paths, batch_size=args.batch_size or IMPORT_BATCH_SIZE, parse_workers=args.workers,
+        tts_backend=_tts_backend(args), tts_rate_limit=_rate_limit(args),
+    ))
+    return 0
+
+
+def _print_progress(label, progress):
+    shown = -1
+    for done, total in progress:
+        percent = int(done * 100 / total) if total else 100
+        if percent != shown:
+            shown = percent
+            print(f"\r{label}: {percent}%", end="", flush=True)
+    print()
+
+
+def cmd_stats(args):
+    from service.stats_service import StatsService
+
+    stats = StatsService.collect()
+    if args.json:
+        print(json.dumps(stats, ensure_ascii=False, indent=2))
+        return 0
+    backfill = stats.pop("backfill")
+    for name, value in stats.items():
+        print(f"{name:<16}{value}")
+    if backfill:
+        state = "完成" if backfill["done"] else f"进行中（Word.id > {backfill['last_id']}）"
+        print(f"{'backfill':<16}{state}，已处理 {backfill['processed']}，失败 {backfill['failed']}")
+    return 0
+
+
+def cmd_backfill_audio(args):
+    from service.audio_backfill import AudioBackfill, BACKFILL_BATCH_SIZE
+    from service.tts_service import TTS_WORKERS
+
+    start = time.perf_counter()
+    _print_progress("补齐音频", AudioBackfill.run(
+        backend=_tts_backend(args), workers=args.workers or TTS_WORKERS, rate_limit=_rate_limit(args),
+        batch_size=args.batch_size or BACKFILL_BATCH_SIZE, restart=args.restart,
+    ))
+    cp = AudioBackfill.checkpoint()
+    retry = "（下次运行时重试）" if cp["failed"] else ""
+    print(f"处理 {cp['processed']} 个单词，失败 {cp['failed']} 个{retry}，用时 {time.perf_counter() - start:.2f}s")
+    return 0
+
+
+def cmd_export(args):
+    from service.deck_pack import DeckPack
+
+    stats = DeckPack.export(args.filename, args.output)
+    print(f"导出 {stats['words']} 个单词、{stats['audio']} 段音频，共 {stats['bytes']} 字节")
+    return 0
+
+
+def cmd_import_pack(args):
+    from service.deck_pack import DeckPack
+
+    for path in args.packs:
+        t0 = time.perf_counter()
+        stats = DeckPack.import_pack(path, args.name)
+        if stats:
+            print(f"{path}: 导入 {stats['words']} 个单词（新增 {stats['new_words']}）、"
+                  f"{stats['audio']} 段音频，用时 {time.perf_counter() - t0:.2f} 秒")
+    return 0
+
+
+def cmd_schema(args):
+    """执行待迁移步骤，打印版本与热点查询计划；有查询未走预期索引时返回 1"""
+    from model.migrations import LATEST_VERSION, current_version, explain_hot_queries
+    from model.orm_models import engine, ensure_db
+
+    ensure_db()
+    failed = 0
+    with engine.connect() as conn:
+        print(f"数据库版本: {current_version(conn)}（最新 {LATEST_VERSION}）")
+        for name, plan, problems in explain_hot_queries(conn):
+            failed += bool(problems)
+            print(f"[{'FAIL' if problems else ' OK '}] {name}")
+            if problems or args.verbose:
+                for detail in plan:
+                    print(f"         {detail}")
+                for problem in problems:
+                    print(f"       ! {problem}")
+    return 1 if failed else 0
+
+
+def build_parser():
+    # 只在执行命令时才导入 service / model，--help 不触发数据库初始化
+    parser = argparse.ArgumentParser(prog="cli.py", description="单词学习助手命令行工具")
+    sub = parser.add_subparsers(dest="command")
+    sub.required = True
+
+    p = sub.add_parser("import", help="导入文件、目录或通配符匹配的单词表（可续传）")
+    p.add_argument("paths", nargs="+", help="文件、目录或通配符")
+    p.add_argument("--workers", type=int, default=None, help="解析进程数，默认按 CPU 数与文件大小决定")
+    p.add_argument("--batch-size", type=int, default=None, help="每批提交的行数")
+    _add_tts_arguments(p)
+    p.set_defaults(func=cmd_import)
+
+    p = sub.add_parser("stats", help="显示库的概况（单词、复习、音频、补齐进度）")
+    p.add_argument("--json", action="store_true", help="以 JSON 输出")
+    p.set_defaults(func=cmd_stats)
+
+    p = sub.add_parser("backfill-audio", help="为缺少音频的单词补合成（中断后再次运行会续传）")
+    p.add_argument("--workers", type=int, default=None, help="并发合成线程数")
+    p.add_argument("--batch-size", type=int, default=None, help="每批提交的单词数")
+    _add_tts_arguments(p)
+    p.add_argument("--restart", action="store_true", help="忽略上次的进度，从头扫描")
+    p.set_defaults(func=cmd_backfill_audio)
+
+    p = sub.add_parser("export", help="把已导入的文件导出为卡组打包文件（.wlpack）")
+    p.add_argument("filename", help="数据库中的文件名")
+    p.add_argument("output", help="输出路径")
+    p.set_defaults(func=cmd_export)
+
+    p = sub.add_parser("import-pack", help="导入卡组打包文件（.wlpack），不调用 TTS")
+    p.add_argument("packs", nargs="+", help="打包文件")
+    p.add_argument("--name", default=None, help="导入后的文件名，默认沿用导出时的文件名")
+    p.set_defaults(func=cmd_import_pack)
+
+    p = sub.add_parser("schema", help="迁移数据库并检查热点查询是否走索引")
+    p.add_argument("-v", "--verbose", action="store_true", help="打印每条查询的执行计划")
+    p.set_defaults(func=cmd_schema)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
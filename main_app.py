@@ -1,8 +1,46 @@
-from view.word_app import WordApp
-import tkinter as tk
+import time
+
+STARTED = time.perf_counter()
+
+import json  # noqa: E402
+import os  # noqa: E402
+import tkinter as tk  # noqa: E402
+
+from util import instrument  # noqa: E402
+from view.word_app import WordApp  # noqa: E402
+
+PROBE_POLL_MS = 10
+
+
+def track_startup(root, app, probe=False):
+    """
+    记录启动耗时（计入 util.instrument）：窗口第一次显示、文件列表第一次加载完成。
+    probe=True（WORDLEARNER_STARTUP_PROBE=1）时打印 JSON 并退出，供 bench.startup 测量。
+    """
+    marks = {}
+
+    def on_map(event):
+        if event.widget is root and "first_window" not in marks:
+            marks["first_window"] = time.perf_counter() - STARTED
+            instrument.record("startup.first_window", marks["first_window"])
+            poll()
+
+    def poll():
+        if app.files_loaded_at is None:
+            root.after(PROBE_POLL_MS, poll)
+            return
+        marks["file_list"] = app.files_loaded_at - STARTED
+        instrument.record("startup.file_list", marks["file_list"])
+        if probe:
+            print(json.dumps({f"{k}_ms": v * 1000 for k, v in marks.items()}), flush=True)
+            app.on_close()
+
+    root.bind("<Map>", on_map, add="+")
+
 
 if __name__ == "__main__":
     # test the application
     root = tk.Tk()
     app = WordApp(root)
-    root.mainloop()
\ No newline at end of file
+    track_startup(root, app, probe=os.environ.get("WORDLEARNER_STARTUP_PROBE") == "1")
+    root.mainloop()
@@ -1,4 +1 @@
-from .orm_models import init_db
-
-# Initialize DB on import
-init_db()
\ No newline at end of file
+from .orm_models import init_db, ensure_db  # noqa: F401
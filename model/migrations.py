@@ -0,0 +1,336 @@
+"""
+版本化的数据库迁移。
+
+schema_version 表记录已执行的步骤；upgrade() 先用 create_all 建出缺失的表，
+再按顺序执行版本号大于当前版本的步骤，每步在一个事务里执行并写入版本记录。
+每一步都必须可重复执行（IF NOT EXISTS、先检查再补列），中断后重跑是安全的；
+引入版本表之前的旧库版本视为 0，早期步骤会在已有的结构上空跑一次。
+
+HOT_QUERIES 列出热点查询及其应当使用的索引，explain_hot_queries() 用 EXPLAIN QUERY PLAN
+检查它们没有退化为全表扫描或临时排序（python cli.py schema）。
+"""
+import sqlite3
+import time
+
+from sqlalchemy import bindparam, inspect, text
+
+from .orm_models import (
+    Base, Audio, SEARCH_TABLE, audio_key, normalize_spoken, search_tokenizer,
+)
+
+# 旧版 Word.gtts 均由 gTTS(lang="en", tld="co.uk") 生成，迁移时按此计算音频键
+LEGACY_TTS_LANG = "en"
+LEGACY_TTS_VOICE = "co.uk"
+
+
+def _columns(conn, table):
+    return {c["name"] for c in inspect(conn).get_columns(table)}
+
+
+def _add_column_if_missing(conn, table, column, ddl):
+    """给旧库补列；返回是否新增"""
+    if column in _columns(conn, table):
+        return False
+    conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+    return True
+
+
+# ------------------- 迁移步骤 -------------------
+def migrate_audio_store(conn, chunk_size=500):
+    """
+    把旧版 words.gtts 中的音频迁入 audio 表：相同朗读文本只保留一份，
+    Word 通过 audio_id 引用。迁移完成的行 gtts 置空。
+    """
+    _add_column_if_missing(conn, "words", "audio_id", "INTEGER REFERENCES audio(id)")
+    if "gtts" not in _columns(conn, "words"):
+        return
+
+    audio_table = Audio.__table__
+    while True:
+        rows = conn.execute(text(
+            "SELECT id, word, gtts FROM words "
+            "WHERE gtts IS NOT NULL AND audio_id IS NULL LIMIT :n"
+        ), {"n": chunk_size}).all()
+        if not rows:
+            return
+        for word_id, word, blob in rows:
+            audio_id = None
+            if blob:
+                key = audio_key(word, LEGACY_TTS_LANG, LEGACY_TTS_VOICE)
+                audio_id = conn.execute(
+                    audio_table.select().with_only_columns(audio_table.c.id).where(audio_table.c.key == key)
+                ).scalar()
+                if audio_id is None:
+                    audio_id = conn.execute(audio_table.insert().values(
+                        key=key, text=normalize_spoken(word), lang=LEGACY_TTS_LANG,
+                        voice=LEGACY_TTS_VOICE, format="mp3", data=blob,
+                    )).inserted_primary_key[0]
+            conn.execute(
+                text("UPDATE words SET audio_id = :aid, gtts = NULL WHERE id = :wid"),
+                {"aid": audio_id, "wid": word_id},
+            )
+
+
+def migrate_file_counts(conn):
+    """旧库补 files.display_count 并一次性回填"""
+    if _add_column_if_missing(conn, "files", "display_count", "INTEGER NOT NULL DEFAULT 0"):
+        _recount_displays(conn)
+
+
+# 全文索引：words_fts 为 words 的外部内容 FTS5 表，由触发器保持同步。
+# 优先使用 trigram 分词（任意子串匹配，含中文）；SQLite 不支持时退回 unicode61 + 前缀索引。
+_SEARCH_TOKENIZERS = ("trigram", "unicode61 remove_diacritics 2")
+_SEARCH_TRIGGERS = (
+    """CREATE TRIGGER IF NOT EXISTS words_fts_ai AFTER INSERT ON words BEGIN
+        INSERT INTO words_fts(rowid, word, trans, ipa) VALUES (new.id, new.word, new.trans, new.ipa);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS words_fts_ad AFTER DELETE ON words BEGIN
+        INSERT INTO words_fts(words_fts, rowid, word, trans, ipa)
+        VALUES ('delete', old.id, old.word, old.trans, old.ipa);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS words_fts_au AFTER UPDATE OF word, trans, ipa ON words BEGIN
+        INSERT INTO words_fts(words_fts, rowid, word, trans, ipa)
+        VALUES ('delete', old.id, old.word, old.trans, old.ipa);
+        INSERT INTO words_fts(rowid, word, trans, ipa) VALUES (new.id, new.word, new.trans, new.ipa);
+    END""",
+)
+
+
+def _fts_options(tokenizer):
+    return "" if tokenizer == "trigram" else ", prefix='2 3'"
+
+
+def _available_tokenizer():
+    """在内存库里试建，返回本机 SQLite 支持的第一个分词器；没有 FTS5 返回 None"""
+    probe = sqlite3.connect(":memory:")
+    try:
+        for tokenizer in _SEARCH_TOKENIZERS:
+            try:
+                probe.execute(f"CREATE VIRTUAL TABLE t USING fts5(x, tokenize='{tokenizer}'{_fts_options(tokenizer)})")
+                return tokenizer
+            except sqlite3.Error as e:
+                print(f"全文索引分词器 {tokenizer.split()[0]} 不可用: {e}")
+    finally:
+        probe.close()
+    return None
+
+
+def migrate_search_index(conn):
+    """建立 words_fts 与同步触发器，首次建立时从 words 全量重建"""
+    if search_tokenizer(conn) is not None:
+        return
+    tokenizer = _available_tokenizer()
+    if tokenizer is None:
+        return
+    conn.execute(text(
+        f"CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5("
+        f"word, trans, ipa, content='words', content_rowid='id', "
+        f"tokenize='{tokenizer}'{_fts_options(tokenizer)})"
+    ))
+    conn.execute(text(f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('rebuild')"))
+    for trigger in _SEARCH_TRIGGERS:
+        conn.execute(text(trigger))
+
+
+def migrate_review_schedule(conn):
+    """旧库补 SM-2 调度列与到期索引"""
+    _add_column_if_missing(conn, "words", "ease", "FLOAT NOT NULL DEFAULT 2.5")
+    _add_column_if_missing(conn, "words", "interval_days", "INTEGER NOT NULL DEFAULT 0")
+    _add_column_if_missing(conn, "words", "repetitions", "INTEGER NOT NULL DEFAULT 0")
+    _add_column_if_missing(conn, "words", "due_at", "INTEGER")
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_words_due ON words (due_at, id)"))
+
+
+def _recount_displays(conn):
+    conn.execute(text(
+        "UPDATE files SET display_count = "
+        "(SELECT COUNT(*) FROM display WHERE display.file_id = files.id)"
+    ))
+
+
+def _merge_words(conn, rows):
+    """
+    把同一 (word_lower, trans) 的多行合并到 id 最小的一行：
+    学习状态取“任一行已学会即已学会”，复习调度取复习次数最多的一行，音频取第一个非空；
+    展示行改指向保留的单词（同一文件已有则删除），复习记录随之迁移。返回删除的展示行数。
+    """
+    keep, losers = rows[0], rows[1:]
+    best = max(rows, key=lambda r: (r.due_at is not None, r.repetitions, -r.id))
+    conn.execute(text(
+        "UPDATE words SET is_unlearned = :unlearned, audio_id = :audio_id, ease = :ease, "
+        "interval_days = :interval_days, repetitions = :repetitions, due_at = :due_at WHERE id = :id"
+    ), {
+        "id": keep.id,
+        "unlearned": all(r.is_unlearned for r in rows),
+        "audio_id": next((r.audio_id for r in rows if r.audio_id is not None), None),
+        "ease": best.ease, "interval_days": best.interval_days,
+        "repetitions": best.repetitions, "due_at": best.due_at,
+    })
+    loser_ids = [r.id for r in losers]
+    removed = 0
+    displays = conn.execute(
+        text("SELECT id, file_id FROM display WHERE word_id IN :ids ORDER BY id")
+        .bindparams(bindparam("ids", expanding=True)),
+        {"ids": loser_ids},
+    ).all()
+    for display_id, file_id in displays:
+        iid = f"{file_id}_{keep.id}"
+        if conn.execute(text("SELECT 1 FROM display WHERE iid = :iid"), {"iid": iid}).first():
+            conn.execute(text("DELETE FROM display WHERE id = :id"), {"id": display_id})
+            removed += 1
+        else:
+            conn.execute(text("UPDATE display SET word_id = :wid, iid = :iid WHERE id = :id"),
+                         {"wid": keep.id, "iid": iid, "id": display_id})
+    conn.execute(text("UPDATE review_log SET word_id = :wid WHERE word_id IN :ids")
+                 .bindparams(bindparam("ids", expanding=True)), {"wid": keep.id, "ids": loser_ids})
+    conn.execute(text("DELETE FROM words WHERE id IN :ids")
+                 .bindparams(bindparam("ids", expanding=True)), {"ids": loser_ids})
+    return removed
+
+
+def migrate_unique_words(conn):
+    """
+    为导入去重键 (word_lower, trans) 建唯一索引。
+    先修正编辑单词后未同步的 word_lower，再合并重复行，最后建索引。
+    """
+    stale = [
+        {"id": word_id, "lower": word.lower()}
+        for word_id, word, word_lower in conn.execute(text("SELECT id, word, word_lower FROM words"))
+        if word.lower() != word_lower
+    ]
+    if stale:
+        conn.execute(text("UPDATE words SET word_lower = :lower WHERE id = :id"), stale)
+
+    rows = conn.execute(text(
+        "SELECT w.id, w.word_lower, w.trans, w.is_unlearned, w.audio_id, w.ease, w.interval_days, "
+        "w.repetitions, w.due_at FROM words w JOIN ("
+        "  SELECT word_lower, trans FROM words GROUP BY word_lower, trans HAVING COUNT(*) > 1"
+        ") d ON w.word_lower = d.word_lower AND w.trans = d.trans "
+        "ORDER BY w.word_lower, w.trans, w.id"
+    )).all()
+    groups = {}
+    for row in rows:
+        groups.setdefault((row.word_lower, row.trans), []).append(row)
+    removed = sum(_merge_words(conn, group) for group in groups.values())
+    if removed:
+        _recount_displays(conn)
+    if stale or groups:
+        print(f"单词去重：修正 word_lower {len(stale)} 行，合并 {len(groups)} 组重复单词，删除重复展示行 {removed} 行")
+    conn.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS ux_words_lower_trans ON words (word_lower, trans)"))
+
+
+def migrate_display_file_index(conn):
+    """分页按 file_id 过滤、按 id 排序：(file_id, id) 复合索引"""
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_display_file_id ON display (file_id, id)"))
+
+
+def migrate_missing_audio_index(conn):
+    """缺失音频补齐按 id 续扫：audio_id IS NULL 的部分索引"""
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_words_missing_audio ON words (id) WHERE audio_id IS NULL"))
+
+
+def migrate_display_word_index(conn):
+    """旧库的 display.word_id 没有索引（模型中 index=True，新库由 create_all 建出），按单词反查展示行时需要"""
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_display_word_id ON display (word_id)"))
+
+
+# (版本号, 说明, 步骤)：只能在末尾追加，已发布的步骤不要修改
+MIGRATIONS = (
+    (1, "共享音频表（迁移旧版 words.gtts）", migrate_audio_store),
+    (2, "files.display_count 计数列", migrate_file_counts),
+    (3, "全文索引 words_fts", migrate_search_index),
+    (4, "SM-2 复习调度列与 (due_at, id) 索引", migrate_review_schedule),
+    (5, "words(word_lower, trans) 去重与唯一索引", migrate_unique_words),
+    (6, "display(file_id, id) 分页索引", migrate_display_file_index),
+    (7, "缺失音频的部分索引", migrate_missing_audio_index),
+    (8, "display(word_id) 索引", migrate_display_word_index),
+)
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+# ------------------- 版本表 -------------------
+def _ensure_version_table(conn):
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_version ("
+        "version INTEGER PRIMARY KEY, description TEXT NOT NULL, applied_at INTEGER NOT NULL)"
+    ))
+
+
+def current_version(conn):
+    """已执行到的版本；没有版本表（新库或旧库）返回 0"""
+    if not inspect(conn).has_table("schema_version"):
+        return 0
+    return conn.execute(text("SELECT MAX(version) FROM schema_version")).scalar() or 0
+
+
+def upgrade(engine, target=LATEST_VERSION):
+    """建出缺失的表并执行尚未执行的迁移步骤，返回执行的步骤版本号列表"""
+    fresh = not inspect(engine).has_table("words")
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        _ensure_version_table(conn)
+        version = current_version(conn)
+    applied = []
+    for number, description, step in MIGRATIONS:
+        if number <= version or number > target:
+            continue
+        if not fresh:
+            print(f"数据库迁移 {number}: {description}")
+        with engine.begin() as conn:
+            step(conn)
+            conn.execute(
+                text("INSERT INTO schema_version (version, description, applied_at) VALUES (:v, :d, :t)"),
+                {"v": number, "d": description, "t": int(time.time())},
+            )
+        applied.append(number)
+    return applied
+
+
+# ------------------- 查询计划检查 -------------------
+# (名称, SQL, 参数, 可接受的索引)：与 service 中的热点查询保持一致
+HOT_QUERIES = (
+    ("导入去重查找", "SELECT id FROM words WHERE word_lower = :w AND trans = :t",
+     {"w": "apple", "t": "苹果"}, ("ux_words_lower_trans",)),
+    ("导入批量预取", "SELECT id, word_lower, trans FROM words WHERE word_lower IN (:a, :b)",
+     {"a": "apple", "b": "pear"}, ("ux_words_lower_trans", "ix_words_word_lower")),
+    ("键集分页", "SELECT display.id, display.iid, words.word, words.trans FROM display "
+     "JOIN words ON display.word_id = words.id "
+     "WHERE display.file_id = :f AND display.id > :a ORDER BY display.id LIMIT 30",
+     {"f": 1, "a": 0}, ("ix_display_file_id",)),
+    ("页锚点", "SELECT id FROM display WHERE file_id = :f AND id > :a ORDER BY id LIMIT 1 OFFSET 29",
+     {"f": 1, "a": 0}, ("ix_display_file_id",)),
+    ("按 iid 查展示行", "SELECT id FROM display WHERE iid = :iid", {"iid": "1_1"}, ("sqlite_autoindex_display_1",)),
+    ("单词的首个展示行", "SELECT min(id) FROM display WHERE word_id IN (:a, :b) GROUP BY word_id",
+     {"a": 1, "b": 2}, ("ix_display_word_id",)),
+    ("到期复习队列", "SELECT id FROM words WHERE due_at IS NOT NULL AND due_at <= :n ORDER BY due_at, id LIMIT 30",
+     {"n": 0}, ("ix_words_due",)),
+    ("新卡片队列", "SELECT id FROM words WHERE due_at IS NULL AND is_unlearned = 1 ORDER BY id LIMIT 30",
+     {}, ("ix_words_due",)),
+    ("单词前缀搜索", "SELECT id FROM words WHERE word_lower >= :a AND word_lower < :b "
+     "ORDER BY word_lower, id LIMIT 50", {"a": "app", "b": "app\U0010ffff"}, ("ix_words_word_lower",)),
+    ("复习历史", "SELECT reviewed_at, grade FROM review_log WHERE word_id = :w ORDER BY reviewed_at",
+     {"w": 1}, ("ix_review_log_word",)),
+    ("缺失音频扫描", "SELECT id, word FROM words WHERE audio_id IS NULL AND id > :a ORDER BY id LIMIT 500",
+     {"a": 0}, ("ix_words_missing_audio",)),
+)
+
+
+def _plan_problems(plan, indexes):
+    problems = []
+    for detail in plan:
+        if detail.startswith("SCAN ") and " USING " not in detail:
+            problems.append(f"全表扫描: {detail}")
+        if "TEMP B-TREE" in detail:
+            problems.append(f"临时排序: {detail}")
+    if not any(f"INDEX {index}" in detail for detail in plan for index in indexes):
+        problems.append(f"未使用索引 {' / '.join(indexes)}")
+    return problems
+
+
+def explain_hot_queries(conn):
+    """返回 [(名称, 查询计划各行, 问题列表)]；问题列表为空表示走了预期索引"""
+    results = []
+    for name, sql, params, indexes in HOT_QUERIES:
+        plan = [row[-1] for row in conn.execute(text(f"EXPLAIN QUERY PLAN {sql}"), params)]
+        results.append((name, plan, _plan_problems(plan, indexes)))
+    return results
@@ -1,26 +1,26 @@
 """
 ORM module using SQLAlchemy.
 Usage:
-    from orm_models import Session, init_db, File, Word, Display
+    from orm_models import Session, ReadSession, init_db, ensure_db, File, Word, Display, Audio, AudioPackEntry, ImportCheckpoint, ReviewLog
 
 This file defines the ORM models and helper functions.
 """
 from sqlalchemy import (
-    create_engine, Column, Integer, String, Boolean, ForeignKey, LargeBinary, UniqueConstraint
+    text, Column, Integer, String, Boolean, Float, ForeignKey, Index, LargeBinary
 )
-from sqlalchemy.orm import declarative_base, relationship, sessionmaker
-import os
+from sqlalchemy.orm import declarative_base, relationship
+import hashlib
+import threading
 
-DB_FILE = os.path.abspath("words.db")
-engine = create_engine(f"sqlite:///{DB_FILE}", echo=False, future=True)
-Session = sessionmaker(bind=engine, future=True)
-Base = declarative_base()
+from .storage import DB_FILE, engine, read_engine, Session, ReadSession  # noqa: F401 (re-exported)
 
+Base = declarative_base()
 
 class File(Base):
     __tablename__ = "files"
     id = Column(Integer, primary_key=True, autoincrement=True)
     filename = Column(String, unique=True, nullable=False)
+    display_count = Column(Integer, default=0, nullable=False)  # 导入时增量维护，避免 COUNT(*)
 
     displays = relationship("Display", back_populates="file", cascade="all, delete-orphan")
 
@@ -32,25 +32,156 @@ class Word(Base):
     word_lower = Column(String, nullable=False, index=True)
     trans = Column(String, nullable=False)
     ipa = Column(String)
-    gtts = Column(LargeBinary)
+    audio_id = Column(Integer, ForeignKey("audio.id"))
     is_unlearned = Column(Boolean, default=True, nullable=False)
+    # SM-2 复习调度；due_at 为 Unix 秒，NULL 表示从未复习过的新卡片
+    ease = Column(Float, default=2.5, nullable=False)
+    interval_days = Column(Integer, default=0, nullable=False)
+    repetitions = Column(Integer, default=0, nullable=False)
+    due_at = Column(Integer)
     displays = relationship("Display", back_populates="word_ref", cascade="all, delete-orphan")
+    audio = relationship("Audio")
+
+    __table_args__ = (
+        # “全部文件中最早到期的 N 张卡片”走 (due_at, id) 索引范围扫描
+        Index("ix_words_due", "due_at", "id"),
+        # 导入去重键：同一单词（忽略大小写）+ 同一释义只存一行
+        Index("ux_words_lower_trans", "word_lower", "trans", unique=True),
+        # 缺失音频的单词（部分索引）：补齐任务按 id 续扫，计数不必全表扫描
+        Index("ix_words_missing_audio", "id", sqlite_where=text("audio_id IS NULL")),
+    )
+
+
+class Audio(Base):
+    """按朗读文本（规范化后）+ 语言/口音寻址的共享音频，多个 Word 可引用同一条"""
+    __tablename__ = "audio"
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    key = Column(String, unique=True, nullable=False)
+    text = Column(String, nullable=False)
+    lang = Column(String, nullable=False)
+    voice = Column(String, nullable=False, default="")
+    format = Column(String, nullable=False, default="mp3")
+    data = Column(LargeBinary, nullable=False)
+
+
+class AudioPackEntry(Base):
+    """音频打包文件（预解码 int16 PCM）中的段索引，一条 Audio 对应一段"""
+    __tablename__ = "audio_pack"
+    audio_id = Column(Integer, ForeignKey("audio.id"), primary_key=True)
+    offset = Column(Integer, nullable=False)  # 段在打包文件中的字节偏移
+    frames = Column(Integer, nullable=False)
+    channels = Column(Integer, nullable=False, default=1)
+    frame_rate = Column(Integer, nullable=False)
+
+
+class AudioPackFile(Base):
+    """当前使用的打包文件代数（只有 id=1 一行）：compact 写出新一代文件，与新偏移在同一事务里切换"""
+    __tablename__ = "audio_pack_file"
+    id = Column(Integer, primary_key=True)
+    generation = Column(Integer, nullable=False, default=0)
 
 
 class Display(Base):
     __tablename__ = "display"
     id = Column(Integer, primary_key=True, autoincrement=True)
     iid = Column(String, unique=True)
-    word_id = Column(Integer, ForeignKey("words.id"), nullable=False)
+    word_id = Column(Integer, ForeignKey("words.id"), nullable=False, index=True)
     file_id = Column(Integer, ForeignKey("files.id"), nullable=False)
 
     word_ref = relationship("Word", back_populates="displays")
     file = relationship("File", back_populates="displays")
 
+    # 分页：按 file_id 过滤、按 id 排序
+    __table_args__ = (Index("ix_display_file_id", "file_id", "id"),)
+
+
+class ReviewLog(Base):
+    """复习记录：只追加，热路径不扫描；按 (word_id, reviewed_at) 查单词历史"""
+    __tablename__ = "review_log"
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    word_id = Column(Integer, ForeignKey("words.id"), nullable=False)
+    reviewed_at = Column(Integer, nullable=False)
+    grade = Column(Integer, nullable=False)          # SM-2 评分 0-5
+    ease = Column(Float, nullable=False)             # 复习后的值
+    interval_days = Column(Integer, nullable=False)
+
+    __table_args__ = (Index("ix_review_log_word", "word_id", "reviewed_at"),)
+
+
+class ImportCheckpoint(Base):
+    """导入进度：与每批数据在同一事务提交，中断后从 offset 处续传"""
+    __tablename__ = "import_checkpoint"
+    file_id = Column(Integer, ForeignKey("files.id"), primary_key=True)
+    path = Column(String, nullable=False)
+    size = Column(Integer, nullable=False)                   # 源文件字节数，变化时从头重新扫描
+    line_no = Column(Integer, nullable=False, default=0)     # 已提交的最后一行行号
+    offset = Column(Integer, nullable=False, default=0)      # 该行结束处的字节偏移
+    done = Column(Boolean, nullable=False, default=False)
+
+
+class BackfillCheckpoint(Base):
+    """后台补齐任务的进度：与每批结果在同一事务提交，中断后从 last_id 之后继续"""
+    __tablename__ = "backfill_checkpoint"
+    job = Column(String, primary_key=True)
+    last_id = Column(Integer, nullable=False, default=0)     # 已处理到的最后一个 Word.id
+    processed = Column(Integer, nullable=False, default=0)   # 本轮已处理的单词数
+    failed = Column(Integer, nullable=False, default=0)      # 本轮合成失败的单词数（下一轮重试）
+    updated_at = Column(Integer, nullable=False, default=0)
+    done = Column(Boolean, nullable=False, default=False)
+
+
+def normalize_spoken(text):
+    """朗读文本规范化：去首尾空白、合并空白、转小写"""
+    return " ".join(text.split()).lower()
+
+
+def audio_key(text, lang, voice=""):
+    """音频内容寻址键"""
+    raw = f"{lang}\x1f{voice}\x1f{normalize_spoken(text)}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
 
 def init_db():
-    """Create tables if they don't exist."""
-    Base.metadata.create_all(engine)
+    """Create missing tables and apply pending schema migrations (see model.migrations)."""
+    from .migrations import upgrade
+    upgrade(engine)
+
+
+_db_ready = False
+_db_lock = threading.Lock()
+
+
+def ensure_db():
+    """
+    Run init_db once per process, on first use (thread-safe).
+    Sessions from service.db_utils call this, so the UI can show its window
+    first and let the first background query pay for schema checks.
+    """
+    global _db_ready
+    if _db_ready:
+        return
+    with _db_lock:
+        if not _db_ready:
+            init_db()
+            _db_ready = True
+
+
+# 全文索引：words_fts 为 words 的外部内容 FTS5 表（建立与同步触发器见 migrations）
+SEARCH_TABLE = "words_fts"
+
+
+def search_tokenizer(conn=None):
+    """当前全文索引使用的分词器：'trigram' / 'unicode61'；没有全文索引返回 None"""
+    if conn is None:
+        with engine.connect() as conn:
+            return search_tokenizer(conn)
+    sql = conn.execute(
+        text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"),
+        {"name": SEARCH_TABLE},
+    ).scalar()
+    if not sql:
+        return None
+    return "trigram" if "trigram" in sql else "unicode61"
 
 
 # Convenience helpers
@@ -64,12 +195,12 @@ def get_or_create_file(session, filename):
     return f
 
 
-def get_or_create_word(session, word, trans, ipa=None, gtts_bin=None):
+def get_or_create_word(session, word, trans, ipa=None, audio_id=None):
     word_lower = word.lower()
     w = session.query(Word).filter_by(word_lower=word_lower, trans=trans).first()
     if w:
         return w
-    w = Word(word=word, word_lower=word_lower, trans=trans, ipa=ipa, gtts=gtts_bin)
+    w = Word(word=word, word_lower=word_lower, trans=trans, ipa=ipa, audio_id=audio_id)
     session.add(w)
     session.commit()
     return w
@@ -0,0 +1,89 @@
+"""
+SQLite storage configuration.
+
+- WAL journal so readers never block the writer (and vice versa)
+- busy timeout instead of immediate "database is locked"
+- synchronous / cache_size / mmap_size / temp_store pragmas
+- separate engines: a single-connection writer pool that serializes all
+  writes in the process, and a small read-only pool for the UI
+
+The database path defaults to ./words.db and can be overridden with the
+WORDLEARNER_DB environment variable (benchmarks and tools use this).
+"""
+import os
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
+
+from util.instrument import register_engine
+
+DB_FILE = os.path.abspath(os.environ.get("WORDLEARNER_DB", "words.db"))
+
+
+class StorageConfig:
+    """Connection pragmas and pool sizes."""
+
+    def __init__(self, journal_mode="WAL", busy_timeout_ms=15000, synchronous="NORMAL",
+                 cache_size_kib=64 * 1024, mmap_size=256 * 1024 * 1024, temp_store="MEMORY",
+                 read_pool_size=4):
+        self.journal_mode = journal_mode
+        self.busy_timeout_ms = busy_timeout_ms
+        self.synchronous = synchronous
+        self.cache_size_kib = cache_size_kib
+        self.mmap_size = mmap_size
+        self.temp_store = temp_store
+        self.read_pool_size = read_pool_size
+
+    def pragmas(self, readonly=False):
+        statements = [
+            f"PRAGMA busy_timeout = {int(self.busy_timeout_ms)}",
+            f"PRAGMA synchronous = {self.synchronous}",
+            f"PRAGMA cache_size = -{int(self.cache_size_kib)}",
+            f"PRAGMA mmap_size = {int(self.mmap_size)}",
+            f"PRAGMA temp_store = {self.temp_store}",
+        ]
+        if readonly:
+            statements.append("PRAGMA query_only = ON")
+        else:
+            statements.insert(0, f"PRAGMA journal_mode = {self.journal_mode}")
+        return statements
+
+
+def _apply_pragmas(engine, statements):
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_conn, _record):
+        cursor = dbapi_conn.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+        finally:
+            cursor.close()
+
+
+def make_engines(db_file=DB_FILE, config=None):
+    """Return (write_engine, read_engine) for db_file."""
+    config = config or StorageConfig()
+    url = f"sqlite:///{db_file}"
+    connect_args = {"check_same_thread": False, "timeout": config.busy_timeout_ms / 1000}
+
+    # One writer connection: concurrent writers queue on the pool instead of
+    # racing for SQLite's write lock.
+    write_engine = create_engine(
+        url, echo=False, future=True, connect_args=connect_args, poolclass=QueuePool,
+        pool_size=1, max_overflow=0, pool_timeout=config.busy_timeout_ms / 1000 * 4,
+    )
+    read_engine = create_engine(
+        url, echo=False, future=True, connect_args=connect_args, poolclass=QueuePool,
+        pool_size=config.read_pool_size, max_overflow=config.read_pool_size,
+    )
+    _apply_pragmas(write_engine, config.pragmas(readonly=False))
+    _apply_pragmas(read_engine, config.pragmas(readonly=True))
+    register_engine(write_engine, "write")
+    register_engine(read_engine, "read")
+    return write_engine, read_engine
+
+
+engine, read_engine = make_engines()
+Session = sessionmaker(bind=engine, future=True)
+ReadSession = sessionmaker(bind=read_engine, future=True)
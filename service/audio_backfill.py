@@ -0,0 +1,132 @@
+"""
+缺失音频补齐：扫描 audio_id 为空的单词（导入时合成失败或离线导入），
+用 TTSPipeline 有界并发合成，按批写回。
+
+进度记在 backfill_checkpoint 表里，与每批结果同一事务提交：
+任务被中断后再次运行会从上次提交的 Word.id 之后继续；
+一轮扫描结束后，下一次运行从头开始，重试本轮合成失败的单词。
+
+    python cli.py backfill-audio --workers 8
+"""
+import time
+
+from sqlalchemy import bindparam, func, select, update
+
+from model.orm_models import BackfillCheckpoint, Word
+from service.audio_store import AudioStore
+from service.db_utils import auto_session, read_session
+from service.page_cache import page_cache
+from service.tts_service import TTSPipeline, TTS_WORKERS, TTS_RATE_LIMIT, get_default_backend
+from util.instrument import instrument_class
+
+BACKFILL_JOB = "audio"
+BACKFILL_BATCH_SIZE = 500
+
+
+class AudioBackfill:
+    """缺失音频的可续传补齐任务"""
+
+    @staticmethod
+    def _missing(session, after_id=0):
+        return session.scalar(
+            select(func.count()).select_from(Word).where(Word.audio_id.is_(None), Word.id > after_id)
+        )
+
+    @staticmethod
+    def checkpoint():
+        """当前进度 {"last_id", "processed", "failed", "updated_at", "done"}；从未运行过返回 None"""
+        with read_session() as session:
+            cp = session.get(BackfillCheckpoint, BACKFILL_JOB)
+            if cp is None:
+                return None
+            return {"last_id": cp.last_id, "processed": cp.processed, "failed": cp.failed,
+                    "updated_at": cp.updated_at, "done": cp.done}
+
+    @staticmethod
+    def _read_batch(after_id, batch_size, backend):
+        """
+        在读连接上取下一批缺音频的单词，按朗读文本分组并查出已有的音频。
+        返回 (rows, waiting, texts, audio_ids)：waiting {key: [word_id]}，texts {key: 朗读文本}
+        """
+        with read_session() as session:
+            rows = session.execute(
+                select(Word.id, Word.word)
+                .where(Word.audio_id.is_(None), Word.id > after_id)
+                .order_by(Word.id)
+                .limit(batch_size)
+            ).all()
+            waiting, texts = {}, {}
+            for word_id, word in rows:
+                key = AudioStore.key_for(word, backend)
+                waiting.setdefault(key, []).append(word_id)
+                texts.setdefault(key, word)
+            # 其他单词已经合成过的同一朗读文本直接复用
+            audio_ids = AudioStore.lookup_ids(session, waiting) if rows else {}
+        return rows, waiting, texts, audio_ids
+
+    @staticmethod
+    def _write_batch(session, rows, waiting, audio_ids, results, backend):
+        """存入合成结果 [(key, text, data)] 并写回 Word.audio_id，返回失败的单词数"""
+        audio_ids = dict(audio_ids)
+        audio_ids.update(AudioStore.store_many(session, results, backend))
+        updates = [
+            {"b_id": word_id, "b_audio": audio_ids[key]}
+            for key, word_ids in waiting.items() if key in audio_ids for word_id in word_ids
+        ]
+        if updates:
+            table = Word.__table__
+            session.execute(
+                update(table)
+                .where(table.c.id == bindparam("b_id"), table.c.audio_id.is_(None))
+                .values(audio_id=bindparam("b_audio")),
+                updates,
+            )
+        return len(rows) - len(updates)
+
+    @staticmethod
+    def run(backend=None, workers=TTS_WORKERS, rate_limit=TTS_RATE_LIMIT,
+            batch_size=BACKFILL_BATCH_SIZE, restart=False):
+        """
+        补齐缺失音频，产出进度 (已处理, 本轮总数)；结束后的统计见 checkpoint()。
+        每批合成结果与检查点一起提交；restart=True 时忽略上次的进度从头扫描。
+        读批次走读连接，合成期间不持有任何 session，只在写回时短暂占用写连接。
+        """
+        backend = backend or get_default_backend()
+        with auto_session() as session:
+            cp = session.get(BackfillCheckpoint, BACKFILL_JOB)
+            if cp is None:
+                cp = BackfillCheckpoint(job=BACKFILL_JOB, last_id=0, processed=0, failed=0)
+                session.add(cp)
+            elif restart or cp.done:
+                cp.last_id, cp.processed, cp.failed = 0, 0, 0
+            cp.done = False
+            cp.updated_at = int(time.time())
+            last_id, processed, failed = cp.last_id, cp.processed, cp.failed
+        if processed:
+            print(f"从上次中断处继续：已处理 {processed} 个单词（Word.id > {last_id}）")
+
+        with read_session() as session:
+            total = processed + AudioBackfill._missing(session, last_id)
+        yield processed, total
+        with TTSPipeline(backend, workers=workers, rate_limit=rate_limit) as tts:
+            while True:
+                rows, waiting, texts, audio_ids = AudioBackfill._read_batch(last_id, batch_size, backend)
+                if not rows:
+                    break
+                for key in waiting.keys() - audio_ids.keys():
+                    tts.submit(key, texts[key])
+                results = [(key, texts[key], data) for key, data in tts.drain(wait=True)]
+
+                last_id, processed = rows[-1].id, processed + len(rows)
+                with auto_session() as session:
+                    failed += AudioBackfill._write_batch(session, rows, waiting, audio_ids, results, backend)
+                    cp = session.get(BackfillCheckpoint, BACKFILL_JOB)
+                    cp.last_id, cp.processed, cp.failed = last_id, processed, failed
+                    cp.updated_at = int(time.time())
+                page_cache.invalidate()
+                yield processed, total
+        with auto_session() as session:
+            session.get(BackfillCheckpoint, BACKFILL_JOB).done = True
+
+
+instrument_class(AudioBackfill, "backfill")
@@ -0,0 +1,353 @@
+"""
+常驻低延迟音频输出引擎。
+
+整个进程只打开一个输出流，回调从单生产者/单消费者环形缓冲区读取样本：
+- 生产者：引擎的 feeder 线程，独占写指针与待播队列；
+- 消费者：输出回调（或无声/文件输出的驱动线程），独占读指针。
+两端只各自推进自己的计数器，不需要加锁。
+样本全程为 int16：打包文件的 mmap 视图直接写入环形缓冲，输出流也以 int16 打开。
+
+    engine = get_engine()
+    engine.play(samples, rate)        # 打断正在播放的内容
+    engine.enqueue(samples, rate)     # 接在当前内容之后
+    engine.chain((word, rate), (example, rate))
+"""
+import queue
+import threading
+import time
+import wave
+from collections import deque
+
+import numpy as np
+
+from util.audio_decode import pcm_to_float32
+
+ENGINE_RATE = 24000     # gTTS 输出为 24kHz 单声道
+ENGINE_BLOCK = 256      # 每次回调的帧数（约 10ms）
+RING_SECONDS = 20
+LATENCY_HISTORY = 256
+
+
+class RingBuffer:
+    """单生产者单消费者 int16 环形缓冲；读写位置为单调递增计数"""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._buf = np.zeros(capacity, dtype=np.int16)
+        self._read = 0
+        self._write = 0
+        self._flush_to = 0   # 生产者请求丢弃此位置之前的全部数据
+
+    def available(self):
+        return self._write - self._read
+
+    def space(self):
+        return self.capacity - (self._write - self._read)
+
+    def write(self, samples):
+        """生产者调用：写入尽可能多的样本，返回写入数"""
+        n = min(len(samples), self.space())
+        if n <= 0:
+            return 0
+        start = self._write % self.capacity
+        first = min(n, self.capacity - start)
+        self._buf[start:start + first] = samples[:first]
+        if n > first:
+            self._buf[:n - first] = samples[first:n]
+        self._write += n
+        return n
+
+    def flush(self):
+        """生产者调用：请求消费者跳过已写入的全部数据"""
+        self._flush_to = self._write
+
+    @property
+    def write_pos(self):
+        return self._write
+
+    def read_into(self, out):
+        """消费者调用：填满 out（不足部分补零），返回 (读取起点, 实际读取数)"""
+        if self._flush_to > self._read:
+            self._read = self._flush_to
+        begin = self._read
+        n = min(len(out), self._write - begin)
+        if n > 0:
+            start = begin % self.capacity
+            first = min(n, self.capacity - start)
+            out[:first] = self._buf[start:start + first]
+            if n > first:
+                out[first:n] = self._buf[:n - first]
+            self._read = begin + n
+        out[max(n, 0):] = 0
+        return begin, max(n, 0)
+
+
+class NullSink:
+    """无声输出：按实时节奏（或尽快）消费样本，用于无界面环境与测试"""
+
+    def __init__(self, realtime=True):
+        self.realtime = realtime
+        self.frames_played = 0
+        self.output_latency = 0.0
+        self._thread = None
+        self._running = False
+
+    def start(self, engine):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, args=(engine,), daemon=True, name="audio-sink")
+        self._thread.start()
+
+    def _run(self, engine):
+        block = np.zeros(engine.block, dtype=np.int16)
+        period = engine.block / engine.rate
+        next_tick = time.perf_counter()
+        while self._running:
+            engine.fill(block)
+            self.consume(block)
+            if self.realtime:
+                next_tick += period
+                delay = next_tick - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    next_tick = time.perf_counter()
+            elif engine.ring.available() == 0:
+                time.sleep(0.001)
+
+    def consume(self, block):
+        self.frames_played += len(block)
+
+    def stop(self):
+        self._running = False
+        if self._thread:
+            self._thread.join()
+
+
+class FileSink(NullSink):
+    """把输出写入 16 位 wav 文件（含静音段），便于离线检查引擎输出"""
+
+    def __init__(self, path, realtime=False):
+        super().__init__(realtime)
+        self.path = path
+        self._wav = None
+
+    def start(self, engine):
+        self._wav = wave.open(self.path, "wb")
+        self._wav.setnchannels(1)
+        self._wav.setsampwidth(2)
+        self._wav.setframerate(engine.rate)
+        super().start(engine)
+
+    def consume(self, block):
+        super().consume(block)
+        self._wav.writeframes(block.tobytes())
+
+    def stop(self):
+        super().stop()
+        if self._wav:
+            self._wav.close()
+            self._wav = None
+
+
+class SoundDeviceSink:
+    """sounddevice 常驻输出流"""
+
+    def __init__(self, latency="low"):
+        self.latency = latency
+        self.output_latency = 0.0
+        self._stream = None
+
+    def start(self, engine):
+        import sounddevice as sd
+
+        def callback(outdata, frames, time_info, status):
+            engine.fill(outdata[:, 0])
+
+        self._stream = sd.OutputStream(
+            samplerate=engine.rate, blocksize=engine.block, channels=1,
+            dtype="int16", latency=self.latency, callback=callback,
+        )
+        self._stream.start()
+        self.output_latency = float(self._stream.latency)
+
+    def stop(self):
+        if self._stream:
+            self._stream.stop()
+            self._stream.close()
+            self._stream = None
+
+
+class AudioEngine:
+    """常驻输出引擎：入队 / 打断 / 串联播放，并记录按键到首个样本输出的延迟"""
+
+    def __init__(self, sink=None, rate=ENGINE_RATE, block=ENGINE_BLOCK, ring_seconds=RING_SECONDS):
+        self.sink = sink or SoundDeviceSink()
+        self.rate = rate
+        self.block = block
+        self.ring = RingBuffer(rate * ring_seconds)
+        self.latencies = deque(maxlen=LATENCY_HISTORY)   # 秒，不含设备输出缓冲
+        self._commands = queue.Queue()
+        self._pending = deque()    # feeder 独占：[(样本, 已写入数, 请求时刻)]
+        self._marks = deque()      # (片段起点写位置, 请求时刻)，消费者据此计算延迟
+        self._idle = threading.Event()
+        self._idle.set()
+        self._submit_lock = threading.Lock()
+        self._submitted = 0
+        self._processed = 0
+        self._running = False
+        self._feeder = None
+
+    # ------------------- 生命周期 -------------------
+    def start(self):
+        if self._running:
+            return self
+        self.sink.start(self)
+        self._running = True
+        self._feeder = threading.Thread(target=self._feed, daemon=True, name="audio-feeder")
+        self._feeder.start()
+        return self
+
+    def stop(self):
+        if not self._running:
+            return
+        self._running = False
+        self._commands.put(("quit", None))
+        self._feeder.join()
+        self.sink.stop()
+
+    # ------------------- 对外 API -------------------
+    def play(self, samples, frame_rate, requested=None):
+        """
+        打断当前播放并立即播放新片段。
+        requested 为按键时刻（perf_counter），缺省为调用时刻，用于统计延迟。
+        """
+        self._submit("preempt", [(samples, frame_rate)], requested)
+
+    def enqueue(self, samples, frame_rate, requested=None):
+        """接在已排队内容之后播放"""
+        self._submit("enqueue", [(samples, frame_rate)], requested)
+
+    def chain(self, *clips, requested=None):
+        """打断当前播放，依次播放多个片段 clips = (samples, frame_rate), ..."""
+        self._submit("preempt", list(clips), requested)
+
+    def stop_playback(self):
+        self._submit("preempt", [])
+
+    def wait(self, timeout=None):
+        """阻塞直到队列播放完毕"""
+        return self._idle.wait(timeout)
+
+    def latency_stats(self):
+        values = list(self.latencies)
+        if not values:
+            return {"count": 0}
+        ms = np.array(values) * 1000
+        return {
+            "count": len(values),
+            "mean_ms": float(ms.mean()),
+            "p95_ms": float(np.percentile(ms, 95)),
+            "max_ms": float(ms.max()),
+            "output_latency_ms": self.sink.output_latency * 1000,
+        }
+
+    def _submit(self, kind, clips, requested=None):
+        requested = requested or time.perf_counter()
+        prepared = [self._prepare(samples, rate) for samples, rate in clips]
+        prepared = [(p, requested) for p in prepared if len(p)]
+        with self._submit_lock:
+            self._submitted += 1
+            self._idle.clear()
+            self._commands.put((kind, prepared))
+
+    def _prepare(self, samples, frame_rate):
+        """转为引擎采样率的单声道 int16；采样率相同的单声道 int16（如打包文件视图）原样返回"""
+        samples = np.asarray(samples)
+        if samples.dtype != np.int16:
+            if samples.dtype.kind in "iu":
+                samples = pcm_to_float32(samples)
+            samples = (np.clip(samples, -1.0, 1.0) * 32767).astype(np.int16)
+        if samples.ndim > 1:
+            samples = np.round(samples.mean(axis=1)).astype(np.int16)
+        if frame_rate != self.rate and len(samples):
+            n_out = int(round(len(samples) * self.rate / frame_rate))
+            x_out = np.arange(n_out, dtype=np.float64) * (frame_rate / self.rate)
+            samples = np.round(np.interp(x_out, np.arange(len(samples)), samples)).astype(np.int16)
+        return samples
+
+    # ------------------- 生产者（feeder 线程） -------------------
+    def _feed(self):
+        while self._running:
+            timeout = None if self._idle.is_set() else 0.005
+            try:
+                kind, clips = self._commands.get(timeout=timeout)
+            except queue.Empty:
+                kind, clips = None, None
+            while kind is not None:
+                if kind == "quit":
+                    return
+                if kind == "preempt":
+                    self._pending.clear()
+                    self.ring.flush()
+                for samples, requested in clips:
+                    self._pending.append([samples, 0, requested])
+                self._processed += 1
+                try:
+                    kind, clips = self._commands.get_nowait()
+                except queue.Empty:
+                    kind = None
+            self._top_up()
+            if not self._pending and self.ring.available() == 0:
+                with self._submit_lock:
+                    if self._processed == self._submitted:
+                        self._idle.set()
+
+    def _top_up(self):
+        while self._pending:
+            item = self._pending[0]
+            samples, written, requested = item
+            if written == 0:
+                self._marks.append((self.ring.write_pos, requested))
+            n = self.ring.write(samples[written:])
+            item[1] = written + n
+            if item[1] < len(samples):
+                return
+            self._pending.popleft()
+
+    # ------------------- 消费者（输出回调） -------------------
+    def fill(self, out):
+        begin, n = self.ring.read_into(out)
+        marks = self._marks
+        while marks and marks[0][0] < begin:
+            marks.popleft()          # 被打断、从未播放的片段
+        if n:
+            now = time.perf_counter()
+            while marks and marks[0][0] < begin + n:
+                _, requested = marks.popleft()
+                self.latencies.append(now - requested)
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    """进程级引擎；声卡不可用时退回无声输出"""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            try:
+                _engine = AudioEngine().start()
+            except Exception as e:
+                print(f"音频输出不可用，改用无声输出: {e}")
+                _engine = AudioEngine(sink=NullSink()).start()
+        return _engine
+
+
+def set_engine(engine):
+    """替换进程级引擎（测试或无界面运行时传入 NullSink / FileSink 引擎）"""
+    global _engine
+    with _engine_lock:
+        if _engine is not None and _engine is not engine:
+            _engine.stop()
+        _engine = engine
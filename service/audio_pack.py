@@ -0,0 +1,243 @@
+"""
+音频打包文件：一个只追加的文件，顺序存放预解码的 int16 PCM 段，段索引存在数据库 audio_pack 表。
+播放时直接对 mmap 切片构造 NumPy 视图交给 sounddevice，无需解码、无需拷贝。
+
+compact 不覆盖正在使用的文件，而是写出下一代文件（words.<代数>.audiopack），
+再在同一事务里提交新偏移与新代数（audio_pack_file 表）；提交前崩溃仍使用旧文件与旧偏移，
+提交后使用新文件与新偏移，旧文件在提交后删除（残留的文件下次 compact 时清理）。
+
+用法：
+    python -m service.audio_pack build     # 把尚未打包的音频解码追加进打包文件
+    python -m service.audio_pack compact   # 回收失效段
+    python -m service.audio_pack stats
+"""
+import glob
+import mmap
+import os
+import sys
+import threading
+
+import numpy as np
+from sqlalchemy import bindparam, delete, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from model.orm_models import DB_FILE, Audio, AudioPackEntry, AudioPackFile
+from service.db_utils import auto_session, read_session
+from util.audio_decode import decode
+
+PACK_MAGIC = b"WLPCM001"
+AUDIO_PACK_FILE = os.path.splitext(DB_FILE)[0] + ".audiopack"
+BUILD_BATCH_SIZE = 200
+_SAMPLE_BYTES = 2  # int16
+
+
+def decode_to_int16(data: bytes, format="mp3"):
+    """解码为 int16 样本，返回 (samples, frame_rate, channels)"""
+    return decode(data, format)
+
+
+class AudioPack:
+    """只追加的 PCM 打包文件 + 数据库段索引"""
+
+    def __init__(self, path=AUDIO_PACK_FILE):
+        self.base_path = path
+        self._lock = threading.Lock()
+        self._index = None  # {audio_id: (offset, frames, channels, frame_rate)}
+        self._generation = None
+        self._mm = None
+        self._mm_size = 0
+
+    def _path_for(self, generation):
+        """第 0 代沿用原文件名，之后为 <名称>.<代数><扩展名>"""
+        if not generation:
+            return self.base_path
+        root, ext = os.path.splitext(self.base_path)
+        return f"{root}.{generation}{ext}"
+
+    @property
+    def path(self):
+        if self._generation is None:
+            self._load_index()
+        return self._path_for(self._generation)
+
+    @property
+    def enabled(self):
+        return os.path.exists(self.path)
+
+    def _load_index(self):
+        if self._index is None:
+            with read_session() as session:
+                # 代数与段索引取自同一读事务，二者总是匹配
+                self._generation = session.scalar(
+                    select(AudioPackFile.generation).where(AudioPackFile.id == 1)
+                ) or 0
+                rows = session.execute(select(
+                    AudioPackEntry.audio_id, AudioPackEntry.offset, AudioPackEntry.frames,
+                    AudioPackEntry.channels, AudioPackEntry.frame_rate,
+                )).all()
+            self._index = {row[0]: tuple(row[1:]) for row in rows}
+        return self._index
+
+    def _map(self, end):
+        """确保 mmap 覆盖到 end；文件追加后重新映射（旧映射由仍在使用的视图持有，交给 GC 释放）"""
+        if self._mm is None or end > self._mm_size:
+            with open(self.path, "rb") as f:
+                self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._mm_size = len(self._mm)
+        return self._mm
+
+    def lookup(self, audio_id):
+        """返回 (int16 样本视图, 采样率)；未打包返回 None。整个查找持锁，不会与 compact 的切换交错"""
+        with self._lock:
+            if not self.enabled:
+                return None
+            entry = self._load_index().get(audio_id)
+            if entry is None:
+                return None
+            offset, frames, channels, frame_rate = entry
+            count = frames * channels
+            mm = self._map(offset + count * _SAMPLE_BYTES)
+            samples = np.frombuffer(mm, dtype=np.int16, count=count, offset=offset)
+        if channels > 1:
+            samples = samples.reshape((-1, channels))
+        return samples, frame_rate
+
+    def append(self, items):
+        """追加一批段 items = [(audio_id, int16 样本, frame_rate, channels)]，同一 audio_id 的旧段变为失效段"""
+        if not items:
+            return 0
+        with self._lock:
+            rows = []
+            with open(self.path, "ab") as f:
+                if f.tell() == 0:
+                    f.write(PACK_MAGIC)
+                for audio_id, samples, frame_rate, channels in items:
+                    offset = f.tell()
+                    f.write(np.ascontiguousarray(samples, dtype=np.int16).tobytes())
+                    rows.append({
+                        "audio_id": audio_id, "offset": offset, "frames": samples.size // channels,
+                        "channels": channels, "frame_rate": frame_rate,
+                    })
+                f.flush()
+                os.fsync(f.fileno())
+            stmt = sqlite_insert(AudioPackEntry)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[AudioPackEntry.audio_id],
+                set_={c: stmt.excluded[c] for c in ("offset", "frames", "channels", "frame_rate")},
+            )
+            with auto_session() as session:
+                session.execute(stmt, rows)
+            index = self._load_index()
+            for row in rows:
+                index[row["audio_id"]] = (row["offset"], row["frames"], row["channels"], row["frame_rate"])
+        return len(rows)
+
+    def build(self, batch_size=BUILD_BATCH_SIZE):
+        """把尚未打包的音频解码后追加进打包文件，返回新增段数"""
+        added = 0
+        last_id = 0
+        while True:
+            with read_session() as session:
+                rows = session.execute(
+                    select(Audio.id, Audio.data, Audio.format)
+                    .outerjoin(AudioPackEntry, AudioPackEntry.audio_id == Audio.id)
+                    .where(AudioPackEntry.audio_id.is_(None), Audio.id > last_id)
+                    .order_by(Audio.id)
+                    .limit(batch_size)
+                ).all()
+            if not rows:
+                return added
+            items = []
+            for audio_id, data, fmt in rows:
+                try:
+                    samples, frame_rate, channels = decode_to_int16(data, fmt)
+                except Exception as e:
+                    print(f"解码失败，跳过 audio_id={audio_id} ({e})")
+                    continue
+                items.append((audio_id, samples, frame_rate, channels))
+            added += self.append(items)
+            last_id = rows[-1][0]
+
+    def stats(self):
+        with self._lock:
+            size = os.path.getsize(self.path) if self.enabled else 0
+            index = self._load_index()
+            live = sum(frames * channels * _SAMPLE_BYTES for _, frames, channels, _ in index.values())
+        header = len(PACK_MAGIC) if size else 0
+        return {"entries": len(index), "file_bytes": size, "live_bytes": live,
+                "dead_bytes": max(size - header - live, 0)}
+
+    def _remove_stale(self, generation):
+        """删除非当前代数的打包文件（仍被映射时删除失败，留到下次）"""
+        root, ext = os.path.splitext(self.base_path)
+        candidates = [self.base_path] + glob.glob(glob.escape(root) + ".*" + ext)
+        for path in candidates:
+            middle = path[len(root) + 1:len(path) - len(ext)] if path != self.base_path else "0"
+            if not middle.isdigit() or int(middle) == generation or not os.path.exists(path):
+                continue
+            try:
+                os.remove(path)
+            except OSError as e:
+                print(f"旧打包文件暂时无法删除: {path} ({e})")
+
+    def compact(self):
+        """
+        把仍被索引且对应 Audio 仍存在的段写进下一代文件，与新偏移一起提交后才切换。
+        正在播放的旧视图仍指向旧映射，不受影响。
+        """
+        if not self.enabled:
+            return 0
+        with self._lock:
+            with auto_session() as session:
+                session.execute(delete(AudioPackEntry).where(
+                    ~AudioPackEntry.audio_id.in_(select(Audio.id))
+                ))
+            self._index = None
+            entries = sorted(self._load_index().items(), key=lambda kv: kv[1][0])
+            old_path = self._path_for(self._generation)
+            generation = self._generation + 1
+            new_path = self._path_for(generation)
+            with open(old_path, "rb") as src:
+                mm = mmap.mmap(src.fileno(), 0, access=mmap.ACCESS_READ)
+                try:
+                    rows = []
+                    with open(new_path, "wb") as dst:
+                        dst.write(PACK_MAGIC)
+                        for audio_id, (offset, frames, channels, frame_rate) in entries:
+                            new_offset = dst.tell()
+                            dst.write(mm[offset:offset + frames * channels * _SAMPLE_BYTES])
+                            rows.append({"audio_id": audio_id, "offset": new_offset})
+                        dst.flush()
+                        os.fsync(dst.fileno())
+                finally:
+                    mm.close()
+            # 新偏移与新代数同一事务提交：提交即切换到新文件
+            table = AudioPackEntry.__table__
+            with auto_session() as session:
+                if rows:
+                    session.execute(
+                        table.update().where(table.c.audio_id == bindparam("b_id"))
+                        .values(offset=bindparam("b_offset")),
+                        [{"b_id": r["audio_id"], "b_offset": r["offset"]} for r in rows],
+                    )
+                session.merge(AudioPackFile(id=1, generation=generation))
+            self._mm = None
+            self._mm_size = 0
+            self._index = None
+            self._generation = None
+            self._remove_stale(generation)
+        return len(rows)
+
+
+audio_pack = AudioPack()
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "stats"
+    if command == "build":
+        print(f"新增 {audio_pack.build()} 段")
+    elif command == "compact":
+        before = audio_pack.stats()
+        kept = audio_pack.compact()
+        print(f"保留 {kept} 段，回收 {before['dead_bytes']} 字节")
+    print(audio_pack.stats())
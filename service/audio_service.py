@@ -1,33 +1,166 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
-from io import BytesIO
-from pydub import AudioSegment
-import sounddevice as sd
+from service.audio_engine import get_engine
+from util.audio_decode import decode, pcm_to_float32
+from util.instrument import span, timed
+
+PCM_CACHE_BUDGET = 64 * 1024 * 1024  # 解码缓存的字节预算
+
+
+class PCMCache:
+    """进程级解码结果 LRU：键为音频标识，值为 (int16 样本, 采样率)，按字节预算淘汰"""
+
+    def __init__(self, budget_bytes=PCM_CACHE_BUDGET):
+        self.budget_bytes = budget_bytes
+        self.used_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return item
+
+    def put(self, key, samples, frame_rate):
+        size = samples.nbytes
+        if size > self.budget_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.used_bytes -= old[0].nbytes
+            self._items[key] = (samples, frame_rate)
+            self.used_bytes += size
+            self._evict()
+
+    def set_budget(self, budget_bytes):
+        with self._lock:
+            self.budget_bytes = budget_bytes
+            self._evict()
+
+    def _evict(self):
+        while self.used_bytes > self.budget_bytes and self._items:
+            _, (samples, _) = self._items.popitem(last=False)
+            self.used_bytes -= samples.nbytes
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.used_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "items": len(self._items),
+                "used_bytes": self.used_bytes,
+                "budget_bytes": self.budget_bytes,
+            }
+
+
+pcm_cache = PCMCache()
+
 
 class AudioPlayer:
-    """负责播放 MP3 音频"""
+    """
+    负责播放 MP3 音频。
+    给定 key 时解码结果进入进程级 pcm_cache，任何地方重放同一音频都无需再次解码；
+    loader 用于在缓存未命中时才读取音频字节，返回 (data, format)；
+    pcm_source 返回已解码的 (样本, 采样率)（如打包文件的 mmap 视图），命中时完全跳过解码。
+    """
 
-    def __init__(self, mp3_bytes: bytes, format="mp3"):
+    def __init__(self, mp3_bytes: bytes = None, format="mp3", key=None, loader=None, pcm_source=None):
         self.mp3_bytes = mp3_bytes
         self.format = format
+        self.key = key
+        self.loader = loader
+        self.pcm_source = pcm_source
         self.is_converted = False
-        self.samples = np.empty(shape=(1,))
+        self.samples = np.empty(shape=(1,), dtype=np.int16)
         self.frame_rate = 0
 
     def _convert_to_array(self, audio):
-        samples = np.array(audio.get_array_of_samples())
-        if audio.channels == 2:
-            samples = samples.reshape((-1, 2))
-        return samples / 2**15
+        return pcm_to_float32(audio.raw_data, audio.sample_width, audio.channels)
+
+    def _load_bytes(self):
+        if self.mp3_bytes is None and self.loader is not None:
+            loaded = self.loader()
+            if loaded:
+                self.mp3_bytes, self.format = loaded
+        return self.mp3_bytes
 
     def convert_audio(self):
-        if not self.is_converted and self.mp3_bytes:
-            audio = AudioSegment.from_file(BytesIO(self.mp3_bytes), format=self.format)
-            self.samples = self._convert_to_array(audio)
-            self.frame_rate = audio.frame_rate
+        if self.is_converted:
+            return
+        if self.pcm_source is not None:
+            segment = self.pcm_source()
+            if segment is not None:
+                self.samples, self.frame_rate = segment
+                self.is_converted = True
+                return
+        if self.key is not None:
+            cached = pcm_cache.get(self.key)
+            if cached is not None:
+                self.samples, self.frame_rate = cached
+                self.is_converted = True
+                return
+        if self._load_bytes():
+            with span("audio.decode"):
+                # 保持解码器输出的 int16，与打包文件视图一样直接交给输出引擎
+                samples, self.frame_rate, channels = decode(self.mp3_bytes, self.format)
+                self.samples = samples.reshape((-1, channels)) if channels > 1 else samples
             self.is_converted = True
+            if self.key is not None:
+                pcm_cache.put(self.key, self.samples, self.frame_rate)
 
-    def play(self, wait=False):
+    @timed("audio.play")
+    def play(self, wait=False, chain=False):
+        """
+        交给常驻输出引擎播放：默认打断正在播放的单词；
+        chain=True 时接在当前内容之后（如先读单词再读例句）。
+        延迟从调用时刻算起，包含缓存查找 / 解码耗时。
+        """
+        requested = time.perf_counter()
         self.convert_audio()
-        sd.play(self.samples, samplerate=self.frame_rate)
+        if not self.is_converted:
+            return
+        engine = get_engine()
+        if chain:
+            engine.enqueue(self.samples, self.frame_rate, requested)
+        else:
+            engine.play(self.samples, self.frame_rate, requested)
         if wait:
-            sd.wait()
+            engine.wait()
+
+
+_predecode_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="audio-predecode")
+_predecode_token = [0]
+
+
+def predecode(players):
+    """后台依次解码一批音频以预热 pcm_cache；新的调用会让尚未完成的旧批次提前结束"""
+    _predecode_token[0] += 1
+    token = _predecode_token[0]
+    players = list(players)
+
+    def run():
+        for player in players:
+            if _predecode_token[0] != token:
+                return
+            try:
+                player.convert_audio()
+            except Exception as e:
+                print(f"预解码失败: {e}")
+
+    _predecode_executor.submit(run)
@@ -0,0 +1,98 @@
+from sqlalchemy import insert, select
+from model.orm_models import Audio, audio_key, normalize_spoken
+from service.db_utils import auto_session, read_session
+from service.tts_service import get_default_backend
+
+LOOKUP_CHUNK_SIZE = 500
+
+
+class AudioStore:
+    """共享音频存储：按朗读文本 + 语言/口音寻址，只在未命中时合成"""
+
+    @staticmethod
+    def key_for(text, backend=None):
+        backend = backend or get_default_backend()
+        return audio_key(text, backend.lang, backend.voice)
+
+    @staticmethod
+    def lookup_ids(session, keys):
+        """按块查询已存在的音频：{key: audio_id}"""
+        found = {}
+        keys = list(keys)
+        for i in range(0, len(keys), LOOKUP_CHUNK_SIZE):
+            chunk = keys[i:i + LOOKUP_CHUNK_SIZE]
+            found.update(session.execute(select(Audio.key, Audio.id).where(Audio.key.in_(chunk))).all())
+        return found
+
+    @staticmethod
+    def store_many(session, items, backend=None):
+        """
+        批量写入合成结果 items = [(key, text, data)]，空数据跳过。
+        返回 {key: audio_id}（已存在的键直接复用）。
+        """
+        backend = backend or get_default_backend()
+        items = [(key, text, data) for key, text, data in items if data]
+        if not items:
+            return {}
+        existing = AudioStore.lookup_ids(session, {key for key, _, _ in items})
+        rows, seen = [], set(existing)
+        for key, text, data in items:
+            if key in seen:
+                continue
+            seen.add(key)
+            rows.append({
+                "key": key, "text": normalize_spoken(text), "lang": backend.lang,
+                "voice": backend.voice, "format": backend.format, "data": data,
+            })
+        if rows:
+            session.execute(insert(Audio), rows)
+            existing.update(AudioStore.lookup_ids(session, [row["key"] for row in rows]))
+        return existing
+
+    @staticmethod
+    def get_or_synthesize(session, text, backend=None):
+        """返回 text 对应的 audio_id；未命中才调用合成，失败返回 None"""
+        backend = backend or get_default_backend()
+        key = AudioStore.key_for(text, backend)
+        audio_id = session.execute(select(Audio.id).where(Audio.key == key)).scalar()
+        if audio_id is not None:
+            return audio_id
+        try:
+            data = backend.synthesize(text)
+        except Exception as e:
+            print(f"TTS 生成失败: {text} ({e})")
+            return None
+        return AudioStore.store_many(session, [(key, text, data)], backend).get(key)
+
+    @staticmethod
+    def resolve_ids(texts, backend=None):
+        """
+        返回 {text: audio_id}：先查共享音频表，未命中的在任何会话之外合成（可能访问网络），
+        再用一个短事务写入；合成失败的 text 不出现在结果里。
+        """
+        backend = backend or get_default_backend()
+        keys = {text: AudioStore.key_for(text, backend) for text in texts}
+        with read_session() as session:
+            found = AudioStore.lookup_ids(session, set(keys.values()))
+        results, seen = [], set(found)
+        for text, key in keys.items():
+            if key in seen:
+                continue
+            seen.add(key)
+            try:
+                results.append((key, text, backend.synthesize(text)))
+            except Exception as e:
+                print(f"TTS 生成失败: {text} ({e})")
+        if results:
+            with auto_session() as session:
+                found.update(AudioStore.store_many(session, results, backend))
+        return {text: found[key] for text, key in keys.items() if key in found}
+
+    @staticmethod
+    def load(audio_id):
+        """按需读取音频，返回 (data, format)；不存在时返回 None"""
+        if audio_id is None:
+            return None
+        with read_session() as session:
+            row = session.execute(select(Audio.data, Audio.format).where(Audio.id == audio_id)).first()
+            return tuple(row) if row else None
@@ -1,15 +1,29 @@
 from contextlib import contextmanager
-from model.orm_models import Session
+from model.orm_models import Session, ReadSession, ensure_db
+from util.instrument import span
 
 @contextmanager
 def auto_session():
     """自动提交/回滚/关闭 session"""
-    session = Session()
-    try:
-        yield session
-        session.commit()
-    except Exception:
-        session.rollback()
-        raise
-    finally:
-        session.close()
+    ensure_db()
+    with span("db.auto_session"):
+        session = Session()
+        try:
+            yield session
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+@contextmanager
+def read_session():
+    """只读 session：走独立的读连接池，不与写入者争用连接"""
+    ensure_db()
+    with span("db.read_session"):
+        session = ReadSession()
+        try:
+            yield session
+        finally:
+            session.close()
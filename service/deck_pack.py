@@ -0,0 +1,372 @@
+"""
+卡组打包文件（.wlpack）：把一个文件的单词、音标、学习状态与音频打成一个二进制文件，
+在另一台机器上整体导入，无需重新解析 TSV，也不调用 TTS。
+
+布局（小端）：
+    WLDECK01 | u32 头部长度 | 头部 JSON | 各段数据
+头部 JSON 记录行数与各段在数据区内的 [偏移, 长度]：
+- 文本列（word / trans / ipa 及音频元数据）：u32 长度数组（0xFFFFFFFF 表示 NULL）+ 连续的 UTF-8 字节
+- 数值列（学习状态、音频下标）：定长数组
+- audio_data：逐段 u32 长度 + 原始音频字节，导出时逐块从数据库流式写出
+
+用法：
+    python cli.py export deck.tsv deck.wlpack
+    python cli.py import-pack deck.wlpack
+"""
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+
+from sqlalchemy import bindparam, func, insert, select, update
+
+from model.orm_models import Audio, Display, File, Word
+from service.db_utils import auto_session, read_session
+from service.file_service import FileService
+from service.page_cache import page_cache
+from util.instrument import instrument_class
+
+PACK_MAGIC = b"WLDECK01"
+PACK_VERSION = 1
+PACK_SUFFIX = ".wlpack"
+AUDIO_CHUNK_SIZE = 200   # 导出时每次从库里取的音频条数 / 导入时每批写入的音频条数
+LOOKUP_CHUNK_SIZE = 400
+
+_NULL_LEN = 0xFFFFFFFF
+_NO_AUDIO = -1
+_NO_DUE = -1
+_PREAMBLE = struct.Struct("<8sI")
+_SEGMENT = struct.Struct("<I")
+
+_WORD_TEXT = ("word", "trans", "ipa")
+_WORD_NUMERIC = (("is_unlearned", "B"), ("ease", "d"), ("interval_days", "i"),
+                 ("repetitions", "i"), ("due_at", "q"), ("audio", "i"))
+_AUDIO_TEXT = ("key", "text", "lang", "voice", "format")
+_SECTIONS = (_WORD_TEXT + tuple(name for name, _ in _WORD_NUMERIC)
+             + tuple(f"audio_{name}" for name in _AUDIO_TEXT) + ("audio_data",))
+
+
+class DeckPackError(ValueError):
+    """不是有效的卡组打包文件"""
+
+
+def _little_endian(values):
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values
+
+
+def encode_text(values):
+    lengths, parts = array("I"), []
+    for value in values:
+        if value is None:
+            lengths.append(_NULL_LEN)
+            continue
+        data = value.encode("utf-8")
+        lengths.append(len(data))
+        parts.append(data)
+    return _little_endian(lengths).tobytes() + b"".join(parts)
+
+
+def decode_text(buf, count):
+    if len(buf) < count * 4:
+        raise DeckPackError("文本段短于长度数组")
+    lengths = array("I")
+    lengths.frombytes(bytes(buf[:count * 4]))
+    lengths = _little_endian(lengths)
+    data = bytes(buf[count * 4:])
+    if sum(n for n in lengths if n != _NULL_LEN) != len(data):
+        raise DeckPackError("文本段长度与长度数组不符")
+    out, pos = [], 0
+    try:
+        for n in lengths:
+            if n == _NULL_LEN:
+                out.append(None)
+            else:
+                out.append(data[pos:pos + n].decode("utf-8"))
+                pos += n
+    except UnicodeDecodeError as e:
+        raise DeckPackError(f"文本段不是有效的 UTF-8: {e}") from e
+    return out
+
+
+def encode_numeric(values, typecode):
+    return _little_endian(array(typecode, values)).tobytes()
+
+
+def decode_numeric(buf, typecode):
+    values = array(typecode)
+    values.frombytes(bytes(buf))
+    return _little_endian(values)
+
+
+def _is_count(value):
+    return isinstance(value, int) and not isinstance(value, bool) and value >= 0
+
+
+def _check_header(header, data_size):
+    """头部的行数与段索引必须齐全且自洽：每段都在文件范围内，定长段的长度与行数一致"""
+    count, audio, sections = header.get("words"), header.get("audio"), header.get("sections")
+    if not (_is_count(count) and _is_count(audio) and isinstance(header.get("name"), str)
+            and isinstance(sections, dict)):
+        raise DeckPackError("头部缺少行数、文件名或段索引")
+    for name in _SECTIONS:
+        entry = sections.get(name)
+        if not (isinstance(entry, list) and len(entry) == 2 and all(_is_count(v) for v in entry)):
+            raise DeckPackError(f"缺少段 {name}")
+        offset, length = entry
+        if offset + length > data_size:
+            raise DeckPackError(f"段 {name} 超出文件范围")
+    for name, typecode in _WORD_NUMERIC:
+        if sections[name][1] != count * array(typecode).itemsize:
+            raise DeckPackError(f"段 {name} 的长度与行数 {count} 不符")
+    if sections["audio_data"][1] < audio * _SEGMENT.size:
+        raise DeckPackError(f"音频段短于 {audio} 个段头")
+
+
+def read_header(mm):
+    """返回 (头部, 数据区起始偏移)；头部不完整或与文件大小不符时抛出 DeckPackError"""
+    if len(mm) < _PREAMBLE.size:
+        raise DeckPackError("文件过短")
+    magic, header_len = _PREAMBLE.unpack_from(mm, 0)
+    if magic != PACK_MAGIC:
+        raise DeckPackError("不是卡组打包文件")
+    base = _PREAMBLE.size + header_len
+    if base > len(mm):
+        raise DeckPackError("头部超出文件范围")
+    try:
+        header = json.loads(bytes(mm[_PREAMBLE.size:base]).decode("utf-8"))
+    except ValueError as e:     # 含 UnicodeDecodeError / JSONDecodeError
+        raise DeckPackError(f"头部无法解析: {e}") from e
+    if not isinstance(header, dict):
+        raise DeckPackError("头部无法解析")
+    if header.get("version") != PACK_VERSION:
+        raise DeckPackError(f"不支持的打包版本: {header.get('version')}")
+    _check_header(header, len(mm) - base)
+    return header, base
+
+
+class DeckPack:
+    """卡组的导出与导入"""
+
+    @staticmethod
+    def _load_rows(file_id):
+        """按展示顺序读取单词列与学习状态，以及所引用音频的元数据与大小"""
+        with read_session() as session:
+            rows = session.execute(
+                select(Word.word, Word.trans, Word.ipa, Word.is_unlearned, Word.ease, Word.interval_days,
+                       Word.repetitions, Word.due_at, Word.audio_id)
+                .join(Display, Display.word_id == Word.id)
+                .where(Display.file_id == file_id)
+                .order_by(Display.id)
+            ).all()
+            audio_ids = sorted({row.audio_id for row in rows if row.audio_id is not None})
+            audio = []
+            for i in range(0, len(audio_ids), LOOKUP_CHUNK_SIZE):
+                audio.extend(session.execute(
+                    select(Audio.id, Audio.key, Audio.text, Audio.lang, Audio.voice, Audio.format,
+                           func.length(Audio.data).label("size"))
+                    .where(Audio.id.in_(audio_ids[i:i + LOOKUP_CHUNK_SIZE]))
+                    .order_by(Audio.id)
+                ).all())
+        return rows, audio
+
+    @staticmethod
+    def _stream_audio(f, audio_ids):
+        """按 audio_ids 的顺序逐块读出音频并写成长度前缀段，返回写入字节数"""
+        written = 0
+        for i in range(0, len(audio_ids), AUDIO_CHUNK_SIZE):
+            chunk = audio_ids[i:i + AUDIO_CHUNK_SIZE]
+            with read_session() as session:
+                data = dict(session.execute(select(Audio.id, Audio.data).where(Audio.id.in_(chunk))).all())
+            for audio_id in chunk:
+                blob = data.get(audio_id)
+                if blob is None:
+                    raise RuntimeError("导出期间音频发生变化，请重试")
+                f.write(_SEGMENT.pack(len(blob)))
+                f.write(blob)
+                written += _SEGMENT.size + len(blob)
+        return written
+
+    @staticmethod
+    def export(filename, path):
+        """把已导入的文件 filename 导出为打包文件，返回 {"words", "audio", "bytes"}"""
+        with read_session() as session:
+            file_id = session.execute(select(File.id).where(File.filename == filename)).scalar()
+        if file_id is None:
+            raise ValueError(f"文件不存在: {filename}")
+        rows, audio = DeckPack._load_rows(file_id)
+        audio_index = {row.id: i for i, row in enumerate(audio)}
+
+        sections = {column: encode_text([getattr(row, column) for row in rows]) for column in _WORD_TEXT}
+        numeric = {
+            "is_unlearned": [int(row.is_unlearned) for row in rows],
+            "ease": [row.ease for row in rows],
+            "interval_days": [row.interval_days for row in rows],
+            "repetitions": [row.repetitions for row in rows],
+            "due_at": [_NO_DUE if row.due_at is None else row.due_at for row in rows],
+            "audio": [audio_index.get(row.audio_id, _NO_AUDIO) for row in rows],
+        }
+        for column, typecode in _WORD_NUMERIC:
+            sections[column] = encode_numeric(numeric[column], typecode)
+        for column in _AUDIO_TEXT:
+            sections[f"audio_{column}"] = encode_text([getattr(row, column) for row in audio])
+
+        index, offset = {}, 0
+        for name, data in sections.items():
+            index[name] = [offset, len(data)]
+            offset += len(data)
+        audio_bytes = sum(_SEGMENT.size + row.size for row in audio)
+        index["audio_data"] = [offset, audio_bytes]
+        header = json.dumps({
+            "version": PACK_VERSION, "name": filename, "words": len(rows), "audio": len(audio),
+            "exported_at": int(time.time()), "sections": index,
+        }, ensure_ascii=False).encode("utf-8")
+
+        tmp_path = path + ".tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(_PREAMBLE.pack(PACK_MAGIC, len(header)))
+                f.write(header)
+                for data in sections.values():
+                    f.write(data)
+                if DeckPack._stream_audio(f, [row.id for row in audio]) != audio_bytes:
+                    raise RuntimeError("导出期间音频发生变化，请重试")
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return {"words": len(rows), "audio": len(audio), "bytes": os.path.getsize(path)}
+
+    @staticmethod
+    def _import_audio(session, mm, base, header, audio_meta):
+        """写入库中还没有的音频（分批流式读段），返回每个音频下标对应的 audio_id"""
+        keys = audio_meta["key"]
+        existing = {}
+        for i in range(0, len(keys), LOOKUP_CHUNK_SIZE):
+            chunk = keys[i:i + LOOKUP_CHUNK_SIZE]
+            existing.update(session.execute(select(Audio.key, Audio.id).where(Audio.key.in_(chunk))).all())
+
+        offset, length = header["sections"]["audio_data"]
+        pos, end = base + offset, base + offset + length
+        batch, seen = [], set(existing)
+        for i, key in enumerate(keys):
+            if pos + _SEGMENT.size > end:
+                raise DeckPackError("音频段越界")
+            (size,) = _SEGMENT.unpack_from(mm, pos)
+            start = pos + _SEGMENT.size
+            pos = start + size
+            if pos > end:
+                raise DeckPackError("音频段越界")
+            if key in seen:
+                continue
+            seen.add(key)
+            batch.append({
+                "key": key, "text": audio_meta["text"][i], "lang": audio_meta["lang"][i],
+                "voice": audio_meta["voice"][i], "format": audio_meta["format"][i], "data": mm[start:pos],
+            })
+            if len(batch) >= AUDIO_CHUNK_SIZE:
+                session.execute(insert(Audio.__table__), batch)
+                batch = []
+        if pos != end:
+            raise DeckPackError("音频段长度与头部不符")
+        if batch:
+            session.execute(insert(Audio.__table__), batch)
+
+        inserted = [key for key in keys if key not in existing]
+        for i in range(0, len(inserted), LOOKUP_CHUNK_SIZE):
+            chunk = inserted[i:i + LOOKUP_CHUNK_SIZE]
+            existing.update(session.execute(select(Audio.key, Audio.id).where(Audio.key.in_(chunk))).all())
+        return [existing[key] for key in keys]
+
+    @staticmethod
+    def import_pack(path, filename=None):
+        """
+        导入打包文件为新文件（默认沿用导出时的文件名），全部在一个事务内批量写入。
+        库中已有的单词保留本地学习状态，只补上缺失的音频；同名文件已存在时跳过并返回 None。
+        返回 {"file_id", "words", "new_words", "audio"}。
+        """
+        with open(path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            header, base = read_header(mm)
+            count, sections = header["words"], header["sections"]
+
+            def section(name):
+                offset, length = sections[name]
+                # 复制成 bytes：出错时不留指向 mmap 的视图，finally 里才能关闭映射
+                return mm[base + offset:base + offset + length]
+
+            columns = {name: decode_text(section(name), count) for name in _WORD_TEXT}
+            for name, typecode in _WORD_NUMERIC:
+                columns[name] = decode_numeric(section(name), typecode)
+            audio_meta = {name: decode_text(section(f"audio_{name}"), header["audio"]) for name in _AUDIO_TEXT}
+            if any(value is None for name in ("word", "trans") for value in columns[name]) \
+                    or any(value is None for values in audio_meta.values() for value in values):
+                raise DeckPackError("必填列含有空值")
+            if any(i != _NO_AUDIO and not 0 <= i < header["audio"] for i in columns["audio"]):
+                raise DeckPackError("音频下标超出范围")
+            filename = filename or header["name"]
+
+            with auto_session() as session:
+                if session.execute(select(File.id).where(File.filename == filename)).scalar() is not None:
+                    print(f"文件 {filename} 已存在，跳过。")
+                    return None
+                file_obj = File(filename=filename)
+                session.add(file_obj)
+                session.flush()
+                file_id = file_obj.id
+
+                audio_ids = DeckPack._import_audio(session, mm, base, header, audio_meta)
+
+                keys = [(word.lower(), trans) for word, trans in zip(columns["word"], columns["trans"])]
+                word_ids = FileService._prefetch_word_ids(session, set(keys))
+                new_rows, fill_audio = {}, {}
+                for i, key in enumerate(keys):
+                    audio_id = audio_ids[columns["audio"][i]] if columns["audio"][i] != _NO_AUDIO else None
+                    if key in word_ids:
+                        if audio_id is not None:
+                            fill_audio[word_ids[key]] = audio_id
+                        continue
+                    if key in new_rows:
+                        continue
+                    due_at = columns["due_at"][i]
+                    new_rows[key] = {
+                        "word": columns["word"][i], "word_lower": key[0], "trans": key[1],
+                        "ipa": columns["ipa"][i], "audio_id": audio_id,
+                        "is_unlearned": bool(columns["is_unlearned"][i]), "ease": columns["ease"][i],
+                        "interval_days": columns["interval_days"][i], "repetitions": columns["repetitions"][i],
+                        "due_at": None if due_at == _NO_DUE else due_at,
+                    }
+                if new_rows:
+                    session.execute(insert(Word.__table__), list(new_rows.values()))
+                    word_ids.update(FileService._prefetch_word_ids(session, set(new_rows)))
+                if fill_audio:
+                    table = Word.__table__
+                    session.execute(
+                        update(table)
+                        .where(table.c.id == bindparam("b_id"), table.c.audio_id.is_(None))
+                        .values(audio_id=bindparam("b_audio")),
+                        [{"b_id": word_id, "b_audio": audio_id} for word_id, audio_id in fill_audio.items()],
+                    )
+
+                displays = {}
+                for key in keys:
+                    iid = f"{file_id}_{word_ids[key]}"
+                    displays.setdefault(iid, {"iid": iid, "word_id": word_ids[key], "file_id": file_id})
+                if displays:
+                    session.execute(insert(Display.__table__), list(displays.values()))
+                file_obj.display_count = len(displays)
+        finally:
+            mm.close()
+        page_cache.invalidate(file_id)
+        return {"file_id": file_id, "words": len(displays), "new_words": len(new_rows), "audio": header["audio"]}
+
+
+
+instrument_class(DeckPack, "deck_pack")
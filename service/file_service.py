@@ -1,28 +1,114 @@
+import multiprocessing
 import os
-from model.orm_models import File, Word, Display
-from service.db_utils import auto_session
-from util.audio_util import token2voice
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from sqlalchemy import bindparam, insert, select, update
+from model.orm_models import File, Word, Display, ImportCheckpoint
+from service.audio_store import AudioStore
+from service.db_utils import auto_session, read_session
+from service.page_cache import page_cache
+from service.tts_service import TTSPipeline, TTS_WORKERS, TTS_RATE_LIMIT
+from util.instrument import instrument_class
+from util.tsv_reader import CHUNK_BYTES, expand_paths, iter_lines, parse_range, split_ranges
+
+# 批量导入：每批提交的行数，以及预取时单条 IN 查询的参数个数（SQLite 变量上限 999）
+IMPORT_BATCH_SIZE = 2000
+PREFETCH_CHUNK_SIZE = 500
+# 跨批次的单词/音频 id 缓存上限，超过后清空，保证内存不随文件大小增长
+IMPORT_CACHE_LIMIT = 200_000
+# 多文件导入时的解析进程数：写入者是单线程的 SQLite，解析进程再多也只会排队
+PARSE_WORKERS = max(1, min(4, (os.cpu_count() or 1) - 1))
+
+
+def _report_rate(label, total, start):
+    elapsed = time.perf_counter() - start
+    rate = total / elapsed if elapsed > 0 else float("inf")
+    print(f"{label}: {total} 条记录，用时 {elapsed:.2f}s，{rate:.0f} 行/秒")
+    return rate
+
+
+def _attach_audio(session, results, waiting, texts, backend):
+    """
+    把合成结果存入共享音频表，并批量写回等待该音频的 Word.audio_id（Core executemany）。
+    results: [(audio_key, data)]；waiting: {audio_key: [word_id]}；texts: {audio_key: 朗读文本}
+    waiting / texts 中已有结果的键随即移除，只保留仍在合成中的任务。
+    """
+    results = list(results)
+    if not results:
+        return {}
+    audio_ids = AudioStore.store_many(session, [(key, texts[key], data) for key, data in results], backend)
+    rows = []
+    for key, _ in results:
+        texts.pop(key, None)
+        word_ids = waiting.pop(key, [])
+        if key in audio_ids:
+            rows.extend({"b_id": word_id, "b_audio": audio_ids[key]} for word_id in word_ids)
+    if rows:
+        stmt = (
+            update(Word.__table__)
+            .where(Word.__table__.c.id == bindparam("b_id"))
+            .values(audio_id=bindparam("b_audio"))
+        )
+        session.execute(stmt, rows)
+    return audio_ids
+
 
 class FileService:
     """处理文件导入与文件数据加载"""
 
     @staticmethod
     def file_exists(filename: str) -> bool:
-        with auto_session() as session:
+        with read_session() as session:
             return session.query(File).filter_by(filename=filename).first() is not None
 
     @staticmethod
     def read_file(path: str):
-        data = []
-        with open(path, "r", encoding="utf-8") as f:
-            for line in f:
-                parts = line.strip().split("\t")
-                if len(parts) >= 2:
-                    word, trans = parts[:2]
-                    ipa = parts[2] if len(parts) > 2 else None
-                    data.append((word, trans, ipa))
+        data = [row for _, _, row in iter_lines(path)]
         return data, len(data)
 
+    @staticmethod
+    def _existing_iids(session, iids):
+        """按块查询已存在的 Display.iid"""
+        found = set()
+        iids = list(iids)
+        for i in range(0, len(iids), PREFETCH_CHUNK_SIZE):
+            chunk = iids[i:i + PREFETCH_CHUNK_SIZE]
+            found.update(session.scalars(select(Display.iid).where(Display.iid.in_(chunk))))
+        return found
+
+    @staticmethod
+    def _open_import(session, path: str, size: int):
+        """
+        取得本次导入的 (File, ImportCheckpoint)：
+        新文件建立两者（随第一批数据一起提交）；上次中断的文件返回其检查点；
+        已完成或旧版导入（没有检查点）的文件返回 None。
+        """
+        filename = os.path.basename(path)
+        file_obj = session.query(File).filter_by(filename=filename).first()
+        if file_obj is None:
+            file_obj = File(filename=filename)
+            session.add(file_obj)
+            session.flush()
+            checkpoint = ImportCheckpoint(file_id=file_obj.id, path=os.path.abspath(path), size=size,
+                                          line_no=0, offset=0, done=False)
+            session.add(checkpoint)
+            return file_obj, checkpoint
+
+        checkpoint = session.get(ImportCheckpoint, file_obj.id)
+        if checkpoint is None or checkpoint.done:
+            print(f"文件 {filename} 已存在，跳过。")
+            return None
+        if checkpoint.size != size:
+            # 源文件变了：从头扫描，已导入的行按 iid 去重跳过
+            print(f"文件 {filename} 在中断后发生变化，从头重新扫描。")
+            checkpoint.line_no, checkpoint.offset, checkpoint.size = 0, 0, size
+        else:
+            print(f"文件 {filename} 上次导入中断，从第 {checkpoint.line_no + 1} 行继续。")
+        checkpoint.path = os.path.abspath(path)
+        return file_obj, checkpoint
+
     @staticmethod
     def import_file(path: str):
         filename = os.path.basename(path)
@@ -32,6 +118,7 @@ class FileService:
 
         data, total = FileService.read_file(path)
         print(f"读取到 {total} 条记录，准备导入数据库...")
+        start = time.perf_counter()
 
         with auto_session() as session:
             file_obj = File(filename=filename)
@@ -47,39 +134,306 @@ class FileService:
                 if not word_obj:
                     existing = session.query(Word).filter_by(word_lower=word.lower(), trans=trans).first()
                     if not existing:
-                        try:
-                            gtts_bin = token2voice(word)
-                        except Exception as e:
-                            print(f"TTS 生成失败: {word} ({e})")
-                            gtts_bin = None
-                        existing = Word(word=word, word_lower=word.lower(), trans=trans, ipa=ipa, gtts=gtts_bin)
+                        audio_id = AudioStore.get_or_synthesize(session, word)
+                        existing = Word(word=word, word_lower=word.lower(), trans=trans, ipa=ipa, audio_id=audio_id)
                         session.add(existing)
                         session.flush()
                     word_cache[key] = existing
                     word_obj = existing
 
                 iid = f"{file_obj.id}_{word_obj.id}"
-                if not session.query(Display).filter_by(iid=iid).first():
+                # 本批尚未写入的重复行也要跳过，否则提交时违反 iid 唯一约束
+                pending = any(d.iid == iid for d in display_batch)
+                if not pending and not session.query(Display).filter_by(iid=iid).first():
                     display_batch.append(Display(iid=iid, word_ref=word_obj, file=file_obj))
 
                 if idx % 5 == 0:
                     session.add_all(display_batch)
+                    file_obj.display_count += len(display_batch)
                     session.commit()
                     display_batch.clear()
                     yield idx, total  # 用于进度反馈
 
             if display_batch:
                 session.add_all(display_batch)
+                file_obj.display_count += len(display_batch)
             session.commit()
+            page_cache.invalidate(file_obj.id)
+            _report_rate("逐行导入", total, start)
             yield total, total
 
+    @staticmethod
+    def _prefetch_word_ids(session, keys):
+        """按块预取已存在单词：{(word_lower, trans): word_id}"""
+        found = {}
+        lowers = sorted({word_lower for word_lower, _ in keys})
+        for i in range(0, len(lowers), PREFETCH_CHUNK_SIZE):
+            chunk = lowers[i:i + PREFETCH_CHUNK_SIZE]
+            rows = session.execute(
+                select(Word.id, Word.word_lower, Word.trans).where(Word.word_lower.in_(chunk))
+            )
+            for word_id, word_lower, trans in rows:
+                if (word_lower, trans) in keys:
+                    found[(word_lower, trans)] = word_id
+        return found
+
+    @staticmethod
+    def import_file_bulk(path: str, batch_size: int = IMPORT_BATCH_SIZE, tts_backend=None,
+                         tts_workers: int = TTS_WORKERS, tts_rate_limit=TTS_RATE_LIMIT):
+        """
+        流式批量导入：逐行惰性解析，按批预取已有 (word_lower, trans)，
+        用 Core executemany 插入 Word / Display，每 batch_size 行提交一次。
+        每批与导入检查点（已提交的行号与字节偏移）同一事务提交，
+        中断后再次导入同一文件会从检查点继续，而不是当作“已存在”跳过。
+        新单词的语音先查共享音频表，未命中的朗读文本才交给 TTSPipeline 并发合成，
+        本线程作为唯一写入者把结果写回。
+        yield (已处理字节数, 文件总字节数) 作为进度反馈。
+        """
+        start = time.perf_counter()
+        with auto_session() as session, TTSPipeline(tts_backend, tts_workers, tts_rate_limit) as tts:
+            writer = _ImportWriter(session, tts, batch_size)
+            state = writer.begin(path)
+            if state is None:
+                return
+            rows = iter_lines(path, state.checkpoint.offset, state.checkpoint.line_no)
+            while True:
+                chunk = list(islice(rows, batch_size))
+                if not chunk:
+                    break
+                yield writer.write(state, chunk), state.size  # 用于进度反馈
+            writer.finish_file(state)
+            writer.close()
+            yield state.size, state.size
+        _report_rate("批量导入", writer.imported, start)
+
+    @staticmethod
+    def import_many(specs, batch_size: int = IMPORT_BATCH_SIZE, parse_workers: int = None,
+                    tts_backend=None, tts_workers: int = TTS_WORKERS, tts_rate_limit=TTS_RATE_LIMIT):
+        """
+        批量导入多个文件：specs 可以是文件、目录或通配符（见 tsv_reader.expand_paths）。
+        文件按行对齐切成区间交给进程池解析，结果按提交顺序交给唯一的写入者，
+        所有文件共享同一个单词/音频去重缓存和 TTS 流水线；每个文件各自有检查点，可续传。
+        yield (已处理字节数, 全部文件总字节数) 作为总体进度。
+        """
+        paths = expand_paths(specs)
+        start = time.perf_counter()
+        with auto_session() as session, TTSPipeline(tts_backend, tts_workers, tts_rate_limit) as tts:
+            writer = _ImportWriter(session, tts, batch_size)
+            states = []
+            names = set()
+            total = done = 0
+            for path in paths:
+                # File 以文件名区分，不同目录下的同名文件只导入第一个
+                name = os.path.basename(path)
+                if name in names:
+                    print(f"文件 {name} 重名，跳过 {path}")
+                    continue
+                names.add(name)
+                state = writer.begin(path)
+                if state is None:
+                    continue
+                state.ranges = split_ranges(path, state.checkpoint.offset)
+                states.append(state)
+                total += state.size
+                done += state.checkpoint.offset
+
+            tasks = [(state, begin, end) for state in states for begin, end in state.ranges]
+            if parse_workers is None:
+                parse_workers = PARSE_WORKERS if total > CHUNK_BYTES else 1
+            pending = {id(state): len(state.ranges) for state in states}
+            for state in states:
+                if not state.ranges:
+                    writer.finish_file(state)
+
+            for (state, begin, end), (rows, lines) in zip(tasks, _parse_ordered(tasks, parse_workers)):
+                base = state.checkpoint.line_no
+                previous = begin
+                for i in range(0, len(rows), batch_size):
+                    chunk = [(base + n, offset, row) for n, offset, row in rows[i:i + batch_size]]
+                    offset = writer.write(state, chunk)
+                    done += offset - previous
+                    previous = offset
+                    yield done, total
+                # 区间末尾的无效行也要计入检查点与进度
+                state.checkpoint.line_no = base + lines
+                state.checkpoint.offset = end
+                done += end - previous
+                pending[id(state)] -= 1
+                if pending[id(state)] == 0:
+                    writer.finish_file(state)
+                    print(f"文件 {os.path.basename(state.path)} 导入完成。")
+                yield done, total
+
+            writer.close()
+            yield total, total
+        _report_rate(f"批量导入 {len(states)} 个文件", writer.imported, start)
+
     @staticmethod
     def list_files():
-        with auto_session() as session:
+        with read_session() as session:
             return [f.filename for f in session.query(File).order_by(File.id).all()]
 
     @staticmethod
     def get_file_id(filename):
-        with auto_session() as session:
+        with read_session() as session:
             file = session.query(File).filter_by(filename=filename).first()
             return file.id if file else None
+
+
+instrument_class(FileService, "file")
+
+
+def _parse_ordered(tasks, workers):
+    """
+    按提交顺序产出每个区间的解析结果 (rows, 行数)。
+    workers > 1 时在进程池中解析，同时在途的任务数有上限，避免解析远远跑在写入前面。
+    进程池固定用 spawn：调用方通常已有 TTS / 写后队列等线程，fork 可能继承被持有的锁而死锁；
+    spawn 的子进程会重新导入 __main__，入口模块须把启动逻辑放在 if __name__ == "__main__" 之后。
+    """
+    if workers <= 1:
+        for state, begin, end in tasks:
+            yield parse_range(state.path, begin, end)
+        return
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        window = deque()
+        tasks = iter(tasks)
+        for state, begin, end in islice(tasks, workers * 2):
+            window.append(pool.submit(parse_range, state.path, begin, end))
+        while window:
+            result = window.popleft().result()
+            for state, begin, end in islice(tasks, 1):
+                window.append(pool.submit(parse_range, state.path, begin, end))
+            yield result
+
+
+class _FileImport:
+    """单个文件的导入状态"""
+
+    def __init__(self, path, size, file_id, checkpoint):
+        self.path = path
+        self.size = size
+        self.file_id = file_id
+        self.checkpoint = checkpoint
+        self.ranges = []
+
+
+class _ImportWriter:
+    """
+    导入的唯一写入者：持有写 session 与 TTS 流水线，
+    跨批次、跨文件共享单词 / 音频去重缓存。
+    """
+
+    def __init__(self, session, tts, batch_size=IMPORT_BATCH_SIZE):
+        self.session = session
+        self.tts = tts
+        self.backend = tts.backend
+        self.batch_size = batch_size
+        self.imported = 0
+        self.word_cache = {}   # {(word_lower, trans): word_id}
+        self.audio_cache = {}  # {audio_key: audio_id}
+        self.waiting = {}      # {audio_key: [word_id]}，合成中的音频及等待它的单词
+        self.texts = {}        # {audio_key: 朗读文本}，只含仍在合成中的任务
+        self.file_ids = []
+
+    def begin(self, path):
+        """开始导入一个文件；已完成的文件返回 None"""
+        size = os.path.getsize(path)
+        opened = FileService._open_import(self.session, path, size)
+        if opened is None:
+            return None
+        file_obj, checkpoint = opened
+        self.file_ids.append(file_obj.id)
+        return _FileImport(path, size, file_obj.id, checkpoint)
+
+    def write(self, state, chunk):
+        """
+        写入一批 chunk = [(行号, 行结束偏移, (word, trans, ipa))]，
+        与检查点一起提交，返回已提交到的字节偏移。
+        新的合成任务在提交之后才投递：流水线满时 submit 会阻塞，不能占着写锁等待。
+        """
+        session = self.session
+        word_cache, audio_cache, waiting = self.word_cache, self.audio_cache, self.waiting
+        batch = [row for _, _, row in chunk]
+        if len(word_cache) > IMPORT_CACHE_LIMIT:
+            word_cache.clear()
+        if len(audio_cache) > IMPORT_CACHE_LIMIT:
+            audio_cache.clear()
+
+        missing = {(word.lower(), trans) for word, trans, _ in batch} - word_cache.keys()
+        if missing:
+            word_cache.update(FileService._prefetch_word_ids(session, missing))
+
+        new_words, new_audio, submits = {}, {}, []
+        for word, trans, ipa in batch:
+            key = (word.lower(), trans)
+            if key in word_cache or key in new_words:
+                continue
+            new_audio[key] = AudioStore.key_for(word, self.backend)
+            new_words[key] = {
+                "word": word, "word_lower": key[0], "trans": trans,
+                "ipa": ipa, "audio_id": None, "is_unlearned": True,
+            }
+        if new_words:
+            unknown = set(new_audio.values()) - audio_cache.keys() - waiting.keys()
+            if unknown:
+                audio_cache.update(AudioStore.lookup_ids(session, unknown))
+            for key, row in new_words.items():
+                row["audio_id"] = audio_cache.get(new_audio[key])
+            session.execute(insert(Word), list(new_words.values()))
+            word_cache.update(FileService._prefetch_word_ids(session, set(new_words)))
+            for key, row in new_words.items():
+                akey = new_audio[key]
+                if row["audio_id"] is not None:
+                    continue
+                if akey not in waiting:
+                    waiting[akey] = []
+                    self.texts[akey] = row["word"]
+                    submits.append((akey, row["word"]))
+                waiting[akey].append(word_cache[key])
+
+        file_id = state.file_id
+        display_rows = {}
+        for word, trans, _ in batch:
+            word_id = word_cache[(word.lower(), trans)]
+            iid = f"{file_id}_{word_id}"
+            display_rows.setdefault(iid, {"iid": iid, "word_id": word_id, "file_id": file_id})
+        for iid in FileService._existing_iids(session, display_rows):
+            del display_rows[iid]
+        display_rows = list(display_rows.values())
+        if display_rows:
+            session.execute(insert(Display), display_rows)
+            session.execute(
+                update(File.__table__)
+                .where(File.__table__.c.id == file_id)
+                .values(display_count=File.__table__.c.display_count + len(display_rows))
+            )
+
+        audio_cache.update(_attach_audio(session, self.tts.drain(), waiting, self.texts, self.backend))
+        line_no, offset, _ = chunk[-1]
+        state.checkpoint.line_no, state.checkpoint.offset = line_no, offset
+        session.commit()
+        for akey, text in submits:
+            self.tts.submit(akey, text)
+        self.imported += len(batch)
+        return offset
+
+    def finish_file(self, state):
+        """文件的数据已全部写入：标记检查点完成"""
+        state.checkpoint.offset = state.size
+        state.checkpoint.done = True
+        self.session.commit()
+        page_cache.invalidate(state.file_id)
+
+    def close(self):
+        """等待剩余合成任务，按批写回"""
+        done = []
+        for item in self.tts.drain(wait=True):
+            done.append(item)
+            if len(done) >= self.batch_size:
+                _attach_audio(self.session, done, self.waiting, self.texts, self.backend)
+                self.session.commit()
+                done.clear()
+        _attach_audio(self.session, done, self.waiting, self.texts, self.backend)
+        self.session.commit()
+        for file_id in self.file_ids:
+            page_cache.invalidate(file_id)
@@ -0,0 +1,147 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+PAGE_CACHE_CAPACITY = 16
+
+
+class PageCache:
+    """
+    有界 LRU 页缓存：键 (file_id, page, page_size)，值 {iid: WordDisplay}。
+    写操作通过 update_word 直写到所有缓存页，保证缓存不陈旧；
+    后台预取用 generation 判断加载期间是否发生过写入，过期结果直接丢弃。
+    """
+
+    def __init__(self, capacity=PAGE_CACHE_CAPACITY):
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self._pages = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._inflight = set()
+        self._overlays = []
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="page-prefetch")
+
+    def get(self, key):
+        with self._lock:
+            page = self._pages.get(key)
+            if page is None:
+                self.misses += 1
+                return None
+            self._pages.move_to_end(key)
+            self.hits += 1
+            return page
+
+    def peek(self, key):
+        """只查内存、不计入命中统计；供 Tk 线程渲染虚拟窗口使用"""
+        with self._lock:
+            page = self._pages.get(key)
+            if page is not None:
+                self._pages.move_to_end(key)
+            return page
+
+    def put(self, key, page, generation=None):
+        """写入一页；generation 与当前不一致（加载期间有写入）时放弃"""
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return False
+            self._pages[key] = page
+            self._pages.move_to_end(key)
+            while len(self._pages) > self.capacity:
+                self._pages.popitem(last=False)
+            return True
+
+    def add_overlay(self, overlay):
+        """
+        注册叠加函数 overlay(page)：从库里读出的页在入缓存前先经过它，
+        用于叠加尚未落库的乐观更新，避免读到旧值。
+        """
+        self._overlays.append(overlay)
+
+    def apply_overlays(self, page):
+        """把已注册的叠加函数应用到一组刚从库里读出的 {iid: WordDisplay}"""
+        for overlay in self._overlays:
+            overlay(page)
+        return page
+
+    def _fresh(self, loader):
+        return self.apply_overlays(loader())
+
+    def load(self, key, loader):
+        """缓存未命中时调用 loader() 加载并写入"""
+        page = self.get(key)
+        if page is None:
+            generation = self._generation
+            page = self._fresh(loader)
+            self.put(key, page, generation)
+        return page
+
+    def prefetch(self, key, loader):
+        """后台预取一页（已缓存或正在加载则跳过）"""
+        with self._lock:
+            if key in self._pages or key in self._inflight:
+                return
+            self._inflight.add(key)
+            generation = self._generation
+        self._executor.submit(self._prefetch, key, loader, generation)
+
+    def _prefetch(self, key, loader, generation):
+        try:
+            self.put(key, self._fresh(loader), generation)
+        except Exception as e:
+            print(f"页面预取失败: {key} ({e})")
+        finally:
+            with self._lock:
+                self._inflight.discard(key)
+
+    def update_word(self, word_display):
+        """
+        直写：用最新的 WordDisplay 替换同 iid 的缓存项，
+        并同步其它文件中引用同一 Word 的缓存项。
+        """
+        with self._lock:
+            self._generation += 1
+            for page in self._pages.values():
+                for iid, cached in page.items():
+                    if iid == word_display.iid:
+                        page[iid] = word_display
+                    elif cached.word_id == word_display.word_id:
+                        cached.word = word_display.word
+                        cached.trans = word_display.trans
+                        cached.ipa = word_display.ipa
+                        cached.is_unlearned = word_display.is_unlearned
+                        cached.set_audio_id(word_display.audio_id)
+
+    def update_audio(self, word_id, audio_id):
+        """直写：某个单词关联了新音频"""
+        with self._lock:
+            self._generation += 1
+            for page in self._pages.values():
+                for cached in page.values():
+                    if cached.word_id == word_id:
+                        cached.set_audio_id(audio_id)
+
+    def invalidate(self, file_id=None):
+        """丢弃某文件（或全部）的缓存页"""
+        with self._lock:
+            self._generation += 1
+            if file_id is None:
+                self._pages.clear()
+                return
+            for key in [k for k in self._pages if k[0] == file_id]:
+                del self._pages[key]
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "size": len(self._pages),
+                "capacity": self.capacity,
+            }
+
+
+page_cache = PageCache()
@@ -0,0 +1,114 @@
+import time
+from sqlalchemy import func, insert, select, update
+from model.orm_models import Word, ReviewLog
+from service.db_utils import auto_session, read_session
+from service.word_service import WordService
+from util.instrument import instrument_class
+
+DAY_SECONDS = 24 * 60 * 60
+RELEARN_SECONDS = 10 * 60   # 答错的卡片 10 分钟后再出现
+MIN_EASE = 1.3
+REVIEW_BATCH = 30
+
+# SM-2 评分（0-5），界面上的四个按钮
+GRADE_AGAIN, GRADE_HARD, GRADE_GOOD, GRADE_EASY = 1, 3, 4, 5
+
+
+def schedule(ease, interval_days, repetitions, grade, now):
+    """
+    SM-2：根据评分计算新的 (ease, interval_days, repetitions, due_at)。
+    评分 < 3 视为遗忘：重复次数清零，短时间后重新学习。
+    """
+    if grade < 3:
+        repetitions = 0
+        interval_days = 1
+        due_at = now + RELEARN_SECONDS
+    else:
+        if repetitions == 0:
+            interval_days = 1
+        elif repetitions == 1:
+            interval_days = 6
+        else:
+            interval_days = max(1, round(interval_days * ease))
+        repetitions += 1
+        due_at = now + interval_days * DAY_SECONDS
+    ease = max(MIN_EASE, ease + 0.1 - (5 - grade) * (0.08 + (5 - grade) * 0.02))
+    return ease, interval_days, repetitions, due_at
+
+
+class ReviewService:
+    """SM-2 复习调度：到期队列与评分"""
+
+    @staticmethod
+    def review(word_id, grade, now=None):
+        """记录一次复习并更新调度，返回 (ease, interval_days, repetitions, due_at)"""
+        if not 0 <= grade <= 5:
+            raise ValueError(f"评分必须在 0-5 之间: {grade}")
+        now = int(now if now is not None else time.time())
+        with auto_session() as session:
+            row = session.execute(
+                select(Word.ease, Word.interval_days, Word.repetitions).where(Word.id == word_id)
+            ).first()
+            if row is None:
+                raise ValueError(f"单词不存在: {word_id}")
+            state = schedule(row.ease, row.interval_days, row.repetitions, grade, now)
+            ease, interval_days, repetitions, due_at = state
+            session.execute(
+                update(Word).where(Word.id == word_id)
+                .values(ease=ease, interval_days=interval_days, repetitions=repetitions, due_at=due_at)
+            )
+            session.execute(insert(ReviewLog).values(
+                word_id=word_id, reviewed_at=now, grade=grade, ease=ease, interval_days=interval_days,
+            ))
+        return state
+
+    @staticmethod
+    def next_due_ids(n=REVIEW_BATCH, now=None, include_new=True):
+        """
+        全部文件中最早到期的 n 张卡片的 Word.id：先是已到期的复习卡，不足时补充新卡片
+        （从未复习且未标记为已学会）。两段查询都是 (due_at, id) 索引上的范围扫描。
+        """
+        now = int(now if now is not None else time.time())
+        with read_session() as session:
+            ids = list(session.scalars(
+                select(Word.id)
+                .where(Word.due_at.is_not(None), Word.due_at <= now)
+                .order_by(Word.due_at, Word.id)
+                .limit(n)
+            ))
+            if include_new and len(ids) < n:
+                ids.extend(session.scalars(
+                    select(Word.id)
+                    .where(Word.due_at.is_(None), Word.is_unlearned.is_(True))
+                    .order_by(Word.id)
+                    .limit(n - len(ids))
+                ))
+        return ids
+
+    @staticmethod
+    def next_due(n=REVIEW_BATCH, now=None, include_new=True):
+        """最早到期的 n 张卡片，返回 {iid: WordDisplay}（按到期顺序）"""
+        return WordService.displays_for_words(ReviewService.next_due_ids(n, now, include_new))
+
+    @staticmethod
+    def due_count(now=None):
+        """已到期的复习卡数量（不含新卡片）"""
+        now = int(now if now is not None else time.time())
+        with read_session() as session:
+            return session.scalar(
+                select(func.count()).select_from(Word)
+                .where(Word.due_at.is_not(None), Word.due_at <= now)
+            )
+
+    @staticmethod
+    def history(word_id):
+        """单词的复习记录，按时间先后"""
+        with read_session() as session:
+            return session.execute(
+                select(ReviewLog.reviewed_at, ReviewLog.grade, ReviewLog.ease, ReviewLog.interval_days)
+                .where(ReviewLog.word_id == word_id)
+                .order_by(ReviewLog.reviewed_at)
+            ).all()
+
+
+instrument_class(ReviewService, "review")
@@ -0,0 +1,89 @@
+from sqlalchemy import select, text
+from model.orm_models import SEARCH_TABLE, Word, search_tokenizer
+from service.db_utils import read_session
+from service.word_service import WordService
+from util.instrument import instrument_class
+
+SEARCH_LIMIT = 50
+_TRIGRAM_MIN = 3  # trigram 分词至少 3 个字符才能走索引
+
+
+def _fts_phrase(query):
+    """把用户输入转成 FTS5 短语，避免引号、运算符被当作查询语法"""
+    return '"' + query.replace('"', '""') + '"'
+
+
+def _like_pattern(query):
+    escaped = query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+class SearchService:
+    """跨文件搜索单词、翻译与音标"""
+
+    _tokenizer = False  # False 表示尚未检测
+
+    @staticmethod
+    def tokenizer():
+        if SearchService._tokenizer is False:
+            SearchService._tokenizer = search_tokenizer()
+        return SearchService._tokenizer
+
+    @staticmethod
+    def _prefix_ids(session, query, limit):
+        """单词前缀匹配：word_lower 上的索引范围扫描，按字母序"""
+        return session.scalars(
+            select(Word.id)
+            .where(Word.word_lower >= query, Word.word_lower < query + "\U0010ffff")
+            .order_by(Word.word_lower, Word.id)
+            .limit(limit)
+        ).all()
+
+    @staticmethod
+    def _substring_ids(session, query, limit):
+        """word / trans / ipa 子串匹配：优先走全文索引，查询过短或没有索引时退回 LIKE 扫描"""
+        tokenizer = SearchService.tokenizer()
+        if tokenizer == "trigram" and len(query) >= _TRIGRAM_MIN:
+            sql = f"SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH :q LIMIT :n"
+            return session.scalars(text(sql), {"q": _fts_phrase(query), "n": limit}).all()
+        if tokenizer == "unicode61":
+            # 按词前缀匹配（unicode61 不支持任意子串）
+            sql = f"SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH :q LIMIT :n"
+            return session.scalars(text(sql), {"q": _fts_phrase(query) + "*", "n": limit}).all()
+        pattern = _like_pattern(query)
+        return session.scalars(
+            select(Word.id)
+            .where(Word.word_lower.like(pattern, escape="\\")
+                   | Word.trans.like(pattern, escape="\\")
+                   | Word.ipa.like(pattern, escape="\\"))
+            .limit(limit)
+        ).all()
+
+    @staticmethod
+    def search_word_ids(query, limit=SEARCH_LIMIT):
+        """返回匹配的 Word.id：完全匹配与前缀匹配在前，其余子串匹配在后"""
+        query = " ".join(query.split()).lower()
+        if not query:
+            return []
+        with read_session() as session:
+            ids = list(SearchService._prefix_ids(session, query, limit))
+            if len(ids) < limit:
+                seen = set(ids)
+                for word_id in SearchService._substring_ids(session, query, limit):
+                    if word_id not in seen:
+                        seen.add(word_id)
+                        ids.append(word_id)
+                        if len(ids) >= limit:
+                            break
+        return ids
+
+    @staticmethod
+    def search(query, limit=SEARCH_LIMIT):
+        """
+        搜索所有文件，返回 {iid: WordDisplay}（按相关度排序）。
+        每个单词取其最早导入的那一行展示记录，切换/编辑与分页中的行为一致。
+        """
+        return WordService.displays_for_words(SearchService.search_word_ids(query, limit))
+
+
+instrument_class(SearchService, "search")
@@ -0,0 +1,54 @@
+import os
+import time
+from sqlalchemy import case, func, select
+from model.migrations import current_version
+from model.orm_models import Audio, Display, File, ReviewLog, Word
+from model.storage import DB_FILE
+from service.audio_backfill import AudioBackfill
+from service.db_utils import read_session
+from util.instrument import instrument_class
+
+
+class StatsService:
+    """库的概况统计（命令行 stats 使用）"""
+
+    @staticmethod
+    def collect(now=None):
+        """返回 {名称: 值}；计数都走索引或单次聚合，不加载音频数据"""
+        now = int(now if now is not None else time.time())
+        with read_session() as session:
+            words, unlearned, due, new = session.execute(
+                select(
+                    func.count(),
+                    func.sum(case((Word.is_unlearned, 1), else_=0)),
+                    func.sum(case((Word.due_at <= now, 1), else_=0)),
+                    func.sum(case((Word.due_at.is_(None), 1), else_=0)),
+                ).select_from(Word)
+            ).one()
+            audio, audio_bytes = session.execute(
+                select(func.count(), func.sum(func.length(Audio.data))).select_from(Audio)
+            ).one()
+            stats = {
+                "schema_version": current_version(session.connection()),
+                "files": session.scalar(select(func.count()).select_from(File)),
+                "displays": session.scalar(select(func.count()).select_from(Display)),
+                "words": words,
+                "learned": words - (unlearned or 0),
+                "unlearned": unlearned or 0,
+                "due": due or 0,
+                "new": new or 0,
+                "reviews": session.scalar(select(func.count()).select_from(ReviewLog)),
+                "audio_clips": audio,
+                "audio_bytes": audio_bytes or 0,
+                "missing_audio": session.scalar(
+                    select(func.count()).select_from(Word).where(Word.audio_id.is_(None))
+                ),
+            }
+        stats["db_bytes"] = sum(
+            os.path.getsize(path) for path in (DB_FILE, DB_FILE + "-wal") if os.path.exists(path)
+        )
+        stats["backfill"] = AudioBackfill.checkpoint()
+        return stats
+
+
+instrument_class(StatsService, "stats")
@@ -0,0 +1,255 @@
+"""
+批量语音合成：把多个单词用停顿分隔符连成一句，一次请求合成，再按静音切回每个单词的片段。
+
+短单词的合成耗时主要在请求本身（gTTS 每句还会按 100 字符再切分请求），
+一批 20 个单词通常只需 2~3 次请求而不是 20 次。
+切分用 NumPy 按 10ms 帧计算能量，足够长的静音段才算单词之间的间隔；
+间隔数与单词数对不上（单词内部有长停顿、分隔符没读出停顿等）时整批退回逐词合成。
+切出的片段在 ffmpeg 可用时（pydub）重新编码为 mp3，体积与逐词合成相当；
+否则存为 16 位 PCM wav，体积约为同样时长 mp3 的 10 倍（24kHz 单声道约 48KB/s，mp3 约 4KB/s）。
+
+SyntheticTTSBackend 是本地的合成音频生成器（分隔符处插入长静音），
+用于在不访问网络的情况下测试切分与基准（python -m bench.bench_tts_batch）。
+"""
+import re
+import shutil
+import threading
+import time
+import wave
+import zlib
+from io import BytesIO
+
+import numpy as np
+
+from service.tts_service import TTSBackend, get_default_backend
+from util import audio_decode
+
+BATCH_WORDS = 20            # 每次请求最多合成的单词数
+BATCH_MAX_CHARS = 300       # 每次请求的文本长度上限
+BATCH_SEPARATOR = ". "      # 句号让合成引擎在单词之间停顿
+FRAME_MS = 10
+MIN_GAP_MS = 150            # 单词之间的静音至少这么长，单词内部的停顿应短于它
+SILENCE_DB = -35.0          # 低于峰值帧能量这么多分贝的帧视为静音
+PAD_MS = 40                 # 切出的片段两端保留的静音，需小于 MIN_GAP_MS / 2
+MP3_BITRATE = "32k"         # 与 gTTS 输出的码率相同
+
+
+def encode_wav(samples, frame_rate, channels=1):
+    """int16 交错样本 -> wav 字节"""
+    buf = BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(channels)
+        w.setsampwidth(2)
+        w.setframerate(frame_rate)
+        w.writeframes(np.ascontiguousarray(samples, dtype=np.int16).tobytes())
+    return buf.getvalue()
+
+
+def mp3_encoder(bitrate=MP3_BITRATE):
+    """pydub 与 ffmpeg 都可用时返回 encode(samples, frame_rate, channels) -> mp3 字节，否则返回 None"""
+    if not (shutil.which("ffmpeg") or shutil.which("avconv")):
+        return None
+    try:
+        from pydub import AudioSegment
+    except ImportError:
+        return None
+
+    def encode(samples, frame_rate, channels=1):
+        segment = AudioSegment(
+            np.ascontiguousarray(samples, dtype=np.int16).tobytes(),
+            frame_rate=frame_rate, sample_width=2, channels=channels,
+        )
+        buf = BytesIO()
+        segment.export(buf, format="mp3", bitrate=bitrate)
+        return buf.getvalue()
+    return encode
+
+
+def frame_energy_db(mono, frame):
+    """每帧的平均能量（dB，相对满幅），不足一帧的尾部补零"""
+    pad = -len(mono) % frame
+    if pad:
+        mono = np.concatenate([mono, np.zeros(pad, dtype=mono.dtype)])
+    frames = mono.reshape(-1, frame)
+    energy = np.einsum("ij,ij->i", frames, frames) / frame
+    return 10 * np.log10(np.maximum(energy, 1e-12))
+
+
+def split_on_silence(samples, frame_rate, count, channels=1, min_gap_ms=MIN_GAP_MS,
+                     silence_db=SILENCE_DB, pad_ms=PAD_MS):
+    """
+    把 int16 交错样本按静音切成 count 段，返回 [(起始帧, 结束帧)]（样本帧，非能量帧）；
+    长度不少于 min_gap_ms 的静音间隔数不等于 count - 1 时返回 None。
+    """
+    mono = samples.reshape(-1, channels).astype(np.float32).mean(axis=1) / 32768.0
+    frame = max(1, frame_rate * FRAME_MS // 1000)
+    energy = frame_energy_db(mono, frame)
+    if energy.max() <= -100:
+        return None
+    voiced = np.flatnonzero(energy > energy.max() + silence_db)
+
+    # 相邻有声帧之间的距离 > 1 即为一段静音；只有足够长的静音算单词间隔
+    steps = np.diff(voiced)
+    min_gap = max(1, min_gap_ms // FRAME_MS)
+    gaps = np.flatnonzero(steps > min_gap)
+    if len(gaps) != count - 1:
+        return None
+    starts = np.concatenate([voiced[:1], voiced[gaps + 1]])
+    ends = np.concatenate([voiced[gaps], voiced[-1:]]) + 1
+
+    pad = frame_rate * pad_ms // 1000
+    total = len(mono)
+    return [(max(0, int(s) * frame - pad), min(total, int(e) * frame + pad)) for s, e in zip(starts, ends)]
+
+
+def _chunks(texts, batch_words, max_chars, separator):
+    chunk, size = [], 0
+    for text in texts:
+        if chunk and (len(chunk) >= batch_words or size + len(separator) + len(text) > max_chars):
+            yield chunk
+            chunk, size = [], 0
+        chunk.append(text)
+        size += len(text) + len(separator)
+    if chunk:
+        yield chunk
+
+
+class BatchTTSBackend(TTSBackend):
+    """
+    包装一个逐句合成的后端：synthesize_batch(texts) 每批只发一次请求，按静音切回单词；
+    切分失败时整批逐词合成。lang / voice 与被包装的后端相同，共享音频表按同一键复用。
+    compress=True 且有 mp3 编码器时片段存为 mp3（format = "mp3"），否则存为 wav。
+    """
+    format = "wav"
+
+    def __init__(self, backend=None, batch_words=BATCH_WORDS, max_chars=BATCH_MAX_CHARS,
+                 separator=BATCH_SEPARATOR, min_gap_ms=MIN_GAP_MS, compress=True):
+        self.backend = backend or get_default_backend()
+        self._encode = (mp3_encoder() if compress else None) or encode_wav
+        if self._encode is not encode_wav:
+            self.format = "mp3"
+        self.lang = self.backend.lang
+        self.voice = self.backend.voice
+        self.batch_size = batch_words
+        self.max_chars = max_chars
+        self.separator = separator
+        self.min_gap_ms = min_gap_ms
+        self.requests = 0       # 对被包装后端的请求次数
+        self.fallbacks = 0      # 切分失败、退回逐词合成的批数
+        self._lock = threading.Lock()
+
+    def _request(self, text, throttle):
+        if throttle:
+            throttle()
+        with self._lock:
+            self.requests += 1
+        return self.backend.synthesize(text)
+
+    def _decode(self, data):
+        return audio_decode.decode(data, self.backend.format)
+
+    def synthesize(self, text: str) -> bytes:
+        return self._single(text, None)
+
+    def _single(self, text, throttle):
+        """逐词合成并转成 self.format；失败返回空字节"""
+        data = self._request(text, throttle)
+        if not data:
+            return b""
+        if self.backend.format == self.format:
+            return data
+        samples, frame_rate, channels = self._decode(data)
+        return self._encode(samples, frame_rate, channels)
+
+    def _split(self, texts, throttle):
+        """一次请求合成一批并切分，失败返回 None"""
+        data = self._request(self.separator.join(texts), throttle)
+        if not data:
+            return None
+        samples, frame_rate, channels = self._decode(data)
+        bounds = split_on_silence(samples, frame_rate, len(texts), channels, self.min_gap_ms)
+        if bounds is None:
+            return None
+        return [self._encode(samples[s * channels:e * channels], frame_rate, channels) for s, e in bounds]
+
+    def synthesize_batch(self, texts, throttle=None):
+        """合成一组单词，返回与 texts 一一对应的音频字节（self.format，失败为空字节）；throttle 在每次请求前调用"""
+        out = []
+        for chunk in _chunks(list(texts), self.batch_size, self.max_chars, self.separator):
+            clips = None
+            if len(chunk) > 1:
+                try:
+                    clips = self._split(chunk, throttle)
+                except Exception as e:
+                    print(f"批量合成失败，逐词重试: {e}")
+                if clips is None:
+                    with self._lock:
+                        self.fallbacks += 1
+            if clips is None:
+                clips = []
+                for text in chunk:
+                    try:
+                        clips.append(self._single(text, throttle))
+                    except Exception as e:
+                        print(f"TTS 生成失败: {text} ({e})")
+                        clips.append(b"")
+            out.extend(clips)
+        return out
+
+
+class SyntheticTTSBackend(TTSBackend):
+    """
+    本地合成音频生成器：每个音节一段带包络的正弦音，单词内的音节 / 空格之间是短停顿，
+    标点（分隔符）处是长停顿，并叠加微弱噪声。输出确定性的 16 位单声道 wav。
+    """
+    voice = "synthetic"
+    format = "wav"
+
+    def __init__(self, frame_rate=16000, latency=0.0, fail_words=(), syllable_ms=110,
+                 short_pause_ms=50, long_pause_ms=350, noise=0.002):
+        self.frame_rate = frame_rate
+        self.latency = latency
+        self.fail_words = set(fail_words)
+        self.syllable_ms = syllable_ms
+        self.short_pause_ms = short_pause_ms
+        self.long_pause_ms = long_pause_ms
+        self.noise = noise
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _silence(self, ms):
+        return np.zeros(self.frame_rate * ms // 1000, dtype=np.float32)
+
+    def _word(self, word):
+        """单词的音节只由单词本身决定：批量切出的片段与单独合成的片段内容一致"""
+        rng = np.random.default_rng(zlib.crc32(word.encode("utf-8")))
+        t = np.arange(self.frame_rate * self.syllable_ms // 1000, dtype=np.float32) / self.frame_rate
+        envelope = np.sqrt(np.clip(np.sin(np.pi * t / t[-1]), 0, 1))
+        parts = []
+        for _ in range(max(1, len(word) // 3)):
+            freq = rng.uniform(150, 400)
+            parts.append(0.4 * envelope * np.sin(2 * np.pi * freq * t).astype(np.float32))
+            parts.append(self._silence(self.short_pause_ms // 2))
+        return parts[:-1]
+
+    def synthesize(self, text: str) -> bytes:
+        with self._lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        phrases = [p.split() for p in re.split(r"[.,;!?\n]+", text) if p.strip()]
+        if not phrases or any(" ".join(words) in self.fail_words for words in phrases):
+            return b""
+        rng = np.random.default_rng(zlib.crc32(text.encode("utf-8")))
+        parts = [self._silence(self.long_pause_ms // 2)]
+        for i, words in enumerate(phrases):
+            if i:
+                parts.append(self._silence(self.long_pause_ms))
+            for j, word in enumerate(words):
+                if j:
+                    parts.append(self._silence(self.short_pause_ms))
+                parts.extend(self._word(word))
+        parts.append(self._silence(self.long_pause_ms // 2))
+        audio = np.concatenate(parts)
+        audio += rng.normal(0, self.noise, len(audio)).astype(np.float32)
+        return encode_wav((np.clip(audio, -1, 1) * 32767).astype(np.int16), self.frame_rate)
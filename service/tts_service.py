@@ -0,0 +1,186 @@
+"""
+语音合成后端与并发合成流水线。
+
+导入时不再逐行阻塞在 gTTS 上：新单词先入库，合成请求交给有界线程池，
+结果由唯一的写入者（导入线程）取回并批量写回 Word 行。
+"""
+import hashlib
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+TTS_WORKERS = 4
+TTS_RATE_LIMIT = 5.0      # 每秒最多请求数，None/0 表示不限速
+TTS_MAX_PENDING = 64      # 同时在途的合成任务上限，超出时 submit 阻塞
+
+
+def token2voice(text, **kwargs):
+    """在线合成；gTTS / pydub 在第一次真正合成时才导入"""
+    from util.audio_util import token2voice as synthesize
+    return synthesize(text, **kwargs)
+
+
+class TTSBackend:
+    """语音合成后端接口：synthesize(text) -> bytes，失败返回空字节"""
+    lang = "en"
+    voice = ""
+    format = "mp3"
+
+    def synthesize(self, text: str) -> bytes:
+        raise NotImplementedError
+
+
+class GTTSBackend(TTSBackend):
+    """基于 gTTS 的在线合成"""
+
+    def __init__(self, lang="en", tld="co.uk"):
+        self.lang = lang
+        self.voice = tld
+
+    def synthesize(self, text: str) -> bytes:
+        return token2voice(text, lang=self.lang, tld=self.voice)
+
+
+class FakeTTSBackend(TTSBackend):
+    """本地假合成器：按文本生成确定性字节，可模拟网络延迟与失败，用于测试与基准"""
+    voice = "fake"
+
+    def __init__(self, latency=0.0, fail_words=()):
+        self.latency = latency
+        self.fail_words = set(fail_words)
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def synthesize(self, text: str) -> bytes:
+        with self._lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if text in self.fail_words:
+            return b""
+        return b"FAKE" + hashlib.sha1(text.encode("utf-8")).digest()
+
+
+_default_backend = GTTSBackend()
+
+
+def get_default_backend() -> TTSBackend:
+    return _default_backend
+
+
+def set_default_backend(backend: TTSBackend):
+    """替换全局默认后端（测试、基准或离线使用）"""
+    global _default_backend
+    _default_backend = backend
+
+
+class RateLimiter:
+    """按固定间隔发放请求许可，多个线程共享同一速率"""
+
+    def __init__(self, rate=None):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class TTSPipeline:
+    """
+    有界线程池并发合成。
+
+    submit(key, text) 投递任务，drain() 取回已完成的 (key, audio)；
+    写库由调用方在自己的线程里完成，保证只有一个写入者。
+    合成失败时 audio 为 None。
+    后端提供 synthesize_batch(texts, throttle) 时（见 service.tts_batch），任务先凑满 batch_size
+    再作为一个批次交给线程池；drain(wait=True) 会把不满一批的剩余任务也发出去。
+    """
+
+    def __init__(self, backend=None, workers=TTS_WORKERS, rate_limit=TTS_RATE_LIMIT,
+                 max_pending=TTS_MAX_PENDING):
+        self.backend = backend or get_default_backend()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tts")
+        self._limiter = RateLimiter(rate_limit)
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._done = queue.Queue()
+        self._pending = 0
+        self._batch = []     # 等待凑批的 (key, text)
+        self._batch_size = 1
+        if hasattr(self.backend, "synthesize_batch"):
+            self._batch_size = self.backend.batch_size
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def pending(self):
+        return self._pending
+
+    def submit(self, key, text):
+        if self._batch_size > 1:
+            self._pending += 1
+            self._batch.append((key, text))
+            if len(self._batch) >= self._batch_size:
+                self._flush_batch()
+            return
+        self._slots.acquire()
+        self._pending += 1
+        self._executor.submit(self._run, key, text)
+
+    def _flush_batch(self):
+        if not self._batch:
+            return
+        items, self._batch = self._batch, []
+        self._slots.acquire()
+        self._executor.submit(self._run_batch, items)
+
+    def _run(self, key, text):
+        audio = None
+        try:
+            self._limiter.acquire()
+            audio = self.backend.synthesize(text) or None
+        except Exception as e:
+            print(f"TTS 生成失败: {text} ({e})")
+        finally:
+            self._done.put((key, audio))
+            self._slots.release()
+
+    def _run_batch(self, items):
+        results = [None] * len(items)
+        try:
+            # 限速由后端在每次实际请求前调用 throttle，切分失败后的逐词重试同样受限
+            results = self.backend.synthesize_batch([text for _, text in items], throttle=self._limiter.acquire)
+        except Exception as e:
+            print(f"TTS 批量生成失败: {len(items)} 个单词 ({e})")
+        finally:
+            for (key, _), audio in zip(items, results):
+                self._done.put((key, audio or None))
+            self._slots.release()
+
+    def drain(self, wait=False):
+        """取出已完成的结果；wait=True 时先发出未凑满的批次，并阻塞直到全部任务完成"""
+        if wait:
+            self._flush_batch()
+        while self._pending:
+            try:
+                item = self._done.get(block=wait)
+            except queue.Empty:
+                return
+            self._pending -= 1
+            yield item
+
+    def close(self):
+        self._flush_batch()
+        self._executor.shutdown(wait=True)
@@ -1,45 +1,237 @@
+import threading
+from typing import TYPE_CHECKING
+from sqlalchemy import bindparam, func, select, tuple_, update
 from model.orm_models import Word, Display, File
-from service.db_utils import auto_session
-from service.audio_service import AudioPlayer
-from util.audio_util import token2voice
+from service.db_utils import auto_session, read_session
+from service.audio_store import AudioStore
+from service.page_cache import page_cache
+from util.instrument import instrument_class
+
+if TYPE_CHECKING:
+    from service.audio_service import AudioPlayer
+
+# 分页只取文本列与 audio_id（用作“有无音频”标记），不加载音频 BLOB
+_PAGE_COLUMNS = (
+    Display.id, Display.iid, Display.word_id, Display.file_id,
+    Word.word, Word.trans, Word.ipa, Word.is_unlearned, Word.audio_id,
+)
 
 class WordDisplay:
-    """UI 层显示所需的封装"""
+    """UI 层显示所需的封装（不持有音频字节，播放时按需加载）"""
     def __init__(self, display: Display):
         self.id = display.id
         self.iid = display.iid
         self.word_id = display.word_id
         self.file_id = display.file_id
         self.from_word(display.word_ref)
+
+    @classmethod
+    def from_row(cls, row):
+        """由分页查询的列元组构造，不经过 ORM 实体"""
+        wd = cls.__new__(cls)
+        wd.id = row.id
+        wd.iid = row.iid
+        wd.word_id = row.word_id
+        wd.file_id = row.file_id
+        wd.word = row.word
+        wd.trans = row.trans
+        wd.ipa = row.ipa
+        wd.is_unlearned = row.is_unlearned
+        wd.audio_id = row.audio_id
+        wd._audio = None
+        return wd
     
     def from_word(self, word: Word):
         self.word = word.word
         self.trans = word.trans
         self.ipa = word.ipa
-        self.gtts = word.gtts
         self.is_unlearned = word.is_unlearned
-        self.audio = AudioPlayer(self.gtts)
+        self.audio_id = word.audio_id
+        self._audio = None
+
+    def set_audio_id(self, audio_id):
+        """更换关联音频，丢弃旧播放器"""
+        if audio_id != self.audio_id:
+            self.audio_id = audio_id
+            self._audio = None
+
+    @property
+    def has_audio(self):
+        return self.audio_id is not None
+
+    @property
+    def audio(self) -> "AudioPlayer":
+        """优先使用打包文件中的预解码 PCM；否则按 audio_id 共享解码缓存，未命中时才读库解码"""
+        if self._audio is None:
+            from service.audio_pack import audio_pack
+            from service.audio_service import AudioPlayer
+            audio_id = self.audio_id
+            self._audio = AudioPlayer(
+                key=("audio", audio_id),
+                loader=lambda: AudioStore.load(audio_id),
+                pcm_source=lambda: audio_pack.lookup(audio_id),
+            )
+        return self._audio
+
+    def prefetch_audio(self):
+        """后台读取并解码音频，使随后的播放无需等待"""
+        if self.has_audio and self._audio is None:
+            threading.Thread(target=lambda: self.audio.convert_audio(), daemon=True).start()
+
+def _page_rows(session, file_id, page_size, after_id):
+    """键集分页：取 Display.id > after_id 的下一页"""
+    return session.execute(
+        select(*_PAGE_COLUMNS)
+        .join(Word, Display.word_id == Word.id)
+        .where(Display.file_id == file_id, Display.id > after_id)
+        .order_by(Display.id)
+        .limit(page_size)
+    ).all()
+
 
 class WordService:
     """管理单词的查询与状态更新"""
 
+    # 稀疏页边界索引：{(file_id, page_size): {页号: 锚点}}
+    # 锚点 = 上一页最后一行的 Display.id（第 0 页为 0）。Display 只追加不删除，锚点不会失效。
+    _page_anchors = {}
+    _anchor_lock = threading.Lock()
+
+    @staticmethod
+    def _page_anchor(session, file_id, page_size, page):
+        """
+        返回第 page 页的锚点，超出末页返回 None。
+        未知时从最近的较小已知锚点起做一次 OFFSET 查询（代价与直接 OFFSET 相同），
+        结果记入索引，之后再访问该页及其后相邻页都只需键集查询；查库时不持有锁。
+        """
+        key = (file_id, page_size)
+        with WordService._anchor_lock:
+            anchors = WordService._page_anchors.setdefault(key, {0: 0})
+            if page in anchors:
+                return anchors[page]
+            known = max(p for p in anchors if p < page)
+            after_id = anchors[known]
+        anchor = session.execute(
+            select(Display.id)
+            .where(Display.file_id == file_id, Display.id > after_id)
+            .order_by(Display.id)
+            .offset((page - known) * page_size - 1)
+            .limit(1)
+        ).scalar()
+        if anchor is not None:
+            with WordService._anchor_lock:
+                WordService._page_anchors.setdefault(key, {0: 0})[page] = anchor
+        return anchor
+
+    @staticmethod
+    def reset_page_index(file_id=None):
+        """清空页边界索引（删除 Display 时需要调用）"""
+        with WordService._anchor_lock:
+            if file_id is None:
+                WordService._page_anchors.clear()
+            else:
+                for key in [k for k in WordService._page_anchors if k[0] == file_id]:
+                    del WordService._page_anchors[key]
+
+    @staticmethod
+    def get_page(file_id, page, page_size, prefetch=True):
+        """
+        按页号取数据：优先读页缓存，未命中再查库；随后在后台预取相邻页。
+        返回字典的浅拷贝，调用方增删条目不会影响缓存。
+        """
+        key = (file_id, page, page_size)
+        result = page_cache.load(key, lambda: WordService._load_page(file_id, page, page_size))
+        if prefetch:
+            for neighbor in (page + 1, page - 1):
+                if neighbor >= 0:
+                    page_cache.prefetch(
+                        (file_id, neighbor, page_size),
+                        lambda n=neighbor: WordService._load_page(file_id, n, page_size),
+                    )
+        return dict(result)
+
+    @staticmethod
+    def displays_for_words(word_ids):
+        """
+        按 word_ids 的顺序返回 {iid: WordDisplay}，每个单词取其最早导入的那一行展示记录；
+        用于搜索、复习等跨文件列表，切换/编辑与分页中的行为一致。
+        """
+        word_ids = list(word_ids)
+        if not word_ids:
+            return {}
+        first_display = (
+            select(func.min(Display.id))
+            .where(Display.word_id.in_(word_ids))
+            .group_by(Display.word_id)
+        )
+        with read_session() as session:
+            rows = session.execute(
+                select(*_PAGE_COLUMNS)
+                .join(Word, Display.word_id == Word.id)
+                .where(Display.id.in_(first_display))
+            ).all()
+        by_word = {row.word_id: WordDisplay.from_row(row) for row in rows}
+        result = {by_word[i].iid: by_word[i] for i in word_ids if i in by_word}
+        return page_cache.apply_overlays(result)
+
+    @staticmethod
+    def peek_page(file_id, page, page_size):
+        """只读页缓存，不查库；未缓存返回 None（返回的是缓存本身，调用方不要修改）"""
+        return page_cache.peek((file_id, page, page_size))
+
+    @staticmethod
+    def warm_audio(displays):
+        """后台预解码一页音频"""
+        from service.audio_service import predecode
+        predecode(d.audio for d in displays if d.has_audio)
+
+    @staticmethod
+    def load_audio_modules():
+        """导入音频解码 / 播放模块（numpy 等）；启动后在后台调用，避免第一次播放时在界面线程里导入"""
+        import service.audio_pack  # noqa: F401
+        import service.audio_service  # noqa: F401
+
+    @staticmethod
+    def page_cache_stats():
+        return page_cache.stats()
+
+    @staticmethod
+    def _load_page(file_id, page, page_size):
+        """按页号查库：第 N 页与第 1 页代价相同"""
+        with read_session() as session:
+            after_id = WordService._page_anchor(session, file_id, page_size, page)
+            if after_id is None:
+                return {}
+            rows = _page_rows(session, file_id, page_size, after_id)
+            return {row.iid: WordDisplay.from_row(row) for row in rows}
+
+    @staticmethod
+    def get_displays_after(file_id, page_size, after_id=0):
+        """键集分页：返回 Display.id > after_id 的下一页"""
+        with read_session() as session:
+            rows = _page_rows(session, file_id, page_size, after_id)
+            return {row.iid: WordDisplay.from_row(row) for row in rows}
+
     @staticmethod
     def get_displays_by_page(file_id, page_size, offset):
-        with auto_session() as session:
-            displays = (
-                session.query(Display)
-                .filter(Display.file_id == file_id) # pyright: ignore[reportOptionalCall]
+        """兼容旧接口：按页对齐的 offset 走键集分页，否则退回 OFFSET 查询"""
+        if offset % page_size == 0:
+            return WordService.get_page(file_id, offset // page_size, page_size)
+        with read_session() as session:
+            rows = session.execute(
+                select(*_PAGE_COLUMNS)
+                .join(Word, Display.word_id == Word.id)
+                .where(Display.file_id == file_id)
                 .order_by(Display.id)
                 .offset(offset)
                 .limit(page_size)
-                .all()
-            )
-            return {d.iid: WordDisplay(d) for d in displays}
+            ).all()
+            return {row.iid: WordDisplay.from_row(row) for row in rows}
 
     @staticmethod
     def count_displays(file_id):
-        with auto_session() as session:
-            return session.query(Display).filter(Display.file_id == file_id).count() # pyright: ignore[reportOptionalCall]
+        with read_session() as session:
+            return session.execute(select(File.display_count).where(File.id == file_id)).scalar() or 0
 
     @staticmethod
     def toggle_unlearned(word_display: WordDisplay) -> WordDisplay:
@@ -48,7 +240,9 @@ class WordService:
             d = session.query(Display).filter_by(iid=word_display.iid).first()
             d.word_ref.is_unlearned = new_status
             session.flush()
-            return WordDisplay(d)
+            result = WordDisplay(d)
+        page_cache.update_word(result)
+        return result
         
     @staticmethod
     def update_display(word_display: WordDisplay, field: str):
@@ -66,13 +260,135 @@ class WordService:
             if not d:
                 return None
 
-            # 特殊逻辑：修改 word 时生成 gtts
-            if field == "word":
-                try:
-                    d.word_ref.gtts = token2voice(field_val)
-                except Exception as e:
-                    print(f"TTS 生成失败: {field_val} ({e})")
-
             setattr(d.word_ref, field, field_val)
+            if field == "word":
+                d.word_ref.word_lower = field_val.lower()  # 保持去重键同步
             session.flush()
-            return WordDisplay(d)
+            result = WordDisplay(d)
+
+        # 特殊逻辑：修改 word 时关联对应音频。合成可能访问网络，放在写事务之外，
+        # 成功后再用一个短事务关联；合成失败时保留原有 audio_id，不用 None 覆盖
+        if field == "word":
+            audio_id = AudioStore.resolve_ids([field_val]).get(field_val)
+            if audio_id is not None:
+                WordService._attach_audio({result.word_id: (field_val, audio_id)})
+                result.set_audio_id(audio_id)
+        page_cache.update_word(result)
+        return result
+
+    EDITABLE_FIELDS = ("word", "trans", "ipa", "is_unlearned")
+    KEY_FIELDS = ("word", "trans")      # 参与去重键 (word_lower, trans) 的字段
+    KEY_CHUNK_SIZE = 400
+
+    @staticmethod
+    def _key_collisions(session, by_field):
+        """
+        计算修改 word / trans 后的去重键 (word_lower, trans)，返回会违反唯一索引的 word_id 集合：
+        与库中其他单词重复，或与本批中其他单词改成同一个键。
+        库中占用该键的单词即使本批也在修改，也按冲突处理（唯一索引逐行检查，不等整批写完）。
+        """
+        changed = {}
+        for field in WordService.KEY_FIELDS:
+            for word_id, value in by_field.get(field, []):
+                changed.setdefault(word_id, {})[field] = value
+        if not changed:
+            return set()
+
+        chunk_size = WordService.KEY_CHUNK_SIZE
+        ids = list(changed)
+        current = {}
+        for i in range(0, len(ids), chunk_size):
+            current.update(
+                (row.id, (row.word_lower, row.trans)) for row in session.execute(
+                    select(Word.id, Word.word_lower, Word.trans).where(Word.id.in_(ids[i:i + chunk_size]))
+                )
+            )
+
+        rejected, owners = set(), {}
+        for word_id, fields in changed.items():
+            if word_id not in current:
+                continue    # 单词已删除，UPDATE 不影响任何行
+            word_lower, trans = current[word_id]
+            key = (fields["word"].lower() if "word" in fields else word_lower, fields.get("trans", trans))
+            if key == current[word_id]:
+                continue    # 只改了大小写之外的部分或改回原值，键不变
+            if key in owners:
+                rejected.add(word_id)
+            else:
+                owners[key] = word_id
+
+        keys = list(owners)
+        for i in range(0, len(keys), chunk_size):
+            rows = session.execute(
+                select(Word.id, Word.word_lower, Word.trans)
+                .where(tuple_(Word.word_lower, Word.trans).in_(keys[i:i + chunk_size]))
+            )
+            for row in rows:
+                owner = owners[(row.word_lower, row.trans)]
+                if row.id != owner:
+                    rejected.add(owner)
+        return rejected
+
+    @staticmethod
+    def _attach_audio(items):
+        """items = {word_id: (合成时的单词, audio_id)}；单词在合成期间又被改过的行不关联"""
+        table = Word.__table__
+        with auto_session() as session:
+            session.execute(
+                update(table)
+                .where(table.c.id == bindparam("b_id"), table.c.word == bindparam("b_word"))
+                .values(audio_id=bindparam("b_audio")),
+                [{"b_id": word_id, "b_word": word, "b_audio": audio_id}
+                 for word_id, (word, audio_id) in items.items()],
+            )
+
+    @staticmethod
+    def apply_updates(updates):
+        """
+        在一个事务里批量写入 updates = [(word_id, field, value)]（每个字段一次 executemany）。
+        修改后与其他单词 (word_lower, trans) 重复的单词，其 word / trans 修改被单独拒绝，其余照常写入。
+        修改 word 时在事务提交后合成并关联对应音频。
+        返回 (new_audio, failures)：new_audio = {word_id: 新 audio_id}（合成失败的不含在内），
+        failures = [(word_id, field, value, error)]。
+        """
+        by_field = {}
+        for word_id, field, value in updates:
+            if field not in WordService.EDITABLE_FIELDS:
+                raise ValueError(f"不支持更新字段: {field}")
+            by_field.setdefault(field, []).append((word_id, value))
+
+        table = Word.__table__
+        failures = []
+        with auto_session() as session:
+            # 冲突逐行预先检查：一行冲突不应让整批回滚
+            rejected = WordService._key_collisions(session, by_field)
+            if rejected:
+                error = ValueError("修改后与已有单词重复（单词 + 释义）")
+                for field in WordService.KEY_FIELDS:
+                    items = by_field.get(field, [])
+                    failures.extend((word_id, field, value, error) for word_id, value in items if word_id in rejected)
+                    by_field[field] = [(word_id, value) for word_id, value in items if word_id not in rejected]
+            for field, items in by_field.items():
+                if not items:
+                    continue
+                rows = [{"b_id": word_id, "b_value": value} for word_id, value in items]
+                values = {field: bindparam("b_value")}
+                if field == "word":
+                    # 去重键随单词一起更新
+                    values["word_lower"] = bindparam("b_lower")
+                    for row in rows:
+                        row["b_lower"] = row["b_value"].lower()
+                session.execute(update(table).where(table.c.id == bindparam("b_id")).values(values), rows)
+
+        # 文本修改已提交；合成放在写事务之外，不占用唯一的写连接
+        words = dict(by_field.get("word", []))
+        if not words:
+            return {}, failures
+        audio_ids = AudioStore.resolve_ids(set(words.values()))
+        attach = {word_id: (word, audio_ids[word]) for word_id, word in words.items() if word in audio_ids}
+        if attach:
+            WordService._attach_audio(attach)
+        return {word_id: audio_id for word_id, (_, audio_id) in attach.items()}, failures
+
+
+instrument_class(WordService, "word")
@@ -0,0 +1,138 @@
+import atexit
+import threading
+from collections import OrderedDict
+
+from service.page_cache import page_cache
+from service.word_service import WordService
+
+FLUSH_INTERVAL = 0.5  # 秒
+
+
+class WriteBehindQueue:
+    """
+    写后队列：UI 线程只做乐观更新（直接修改 WordDisplay 与页缓存）并登记待写，
+    后台线程定期把合并后的更新在一个事务里批量写库。
+
+    同一单词同一字段的多次修改只保留最终值；最终值等于已落库的值时（如连按两次切换）直接丢弃。
+    on_error(failures) 在后台线程回调，failures = [(word_id, field, value, error)]：
+    整批写入失败时是整批，修改后与其他单词去重键重复时只是被拒绝的那几项；
+    on_flushed(new_audio) 在修改 word 并关联新音频后回调，new_audio = {word_id: audio_id}。
+    """
+
+    def __init__(self, flush_interval=FLUSH_INTERVAL, on_error=None, on_flushed=None):
+        self.flush_interval = flush_interval
+        self.on_error = on_error
+        self.on_flushed = on_flushed
+        self.stats = {"submitted": 0, "coalesced": 0, "written": 0, "batches": 0, "failed": 0}
+        self._pending = OrderedDict()   # {(word_id, field): [value, 已落库的原值]}
+        self._inflight = {}             # 正在写库的批次 {(word_id, field): value}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, daemon=True, name="write-behind")
+        self._thread.start()
+        page_cache.add_overlay(self.overlay)
+        atexit.register(self.close)
+
+    # ------------------- 乐观更新 -------------------
+    def toggle_unlearned(self, word_display):
+        """切换学习状态：立即修改内存对象，稍后写库"""
+        return self.update_field(word_display, "is_unlearned", not word_display.is_unlearned)
+
+    def update_field(self, word_display, field, value):
+        if field not in WordService.EDITABLE_FIELDS:
+            raise ValueError(f"不支持更新字段: {field}")
+        original = getattr(word_display, field)
+        setattr(word_display, field, value)
+        page_cache.update_word(word_display)
+        self.submit(word_display.word_id, field, value, original)
+        return word_display
+
+    def submit(self, word_id, field, value, original):
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("写后队列已关闭")
+            self.stats["submitted"] += 1
+            key = (word_id, field)
+            entry = self._pending.get(key)
+            if entry is None:
+                self._pending[key] = [value, original]
+                return
+            self.stats["coalesced"] += 1
+            if value == entry[1]:
+                del self._pending[key]     # 改回原值，无需写库
+            else:
+                entry[0] = value
+
+    def overlay(self, page):
+        """把尚未落库的值叠加到刚从库里读出的页上"""
+        with self._lock:
+            if not self._pending and not self._inflight:
+                return
+            values = dict(self._inflight)
+            values.update((key, entry[0]) for key, entry in self._pending.items())
+        for display in page.values():
+            for field in WordService.EDITABLE_FIELDS:
+                value = values.get((display.word_id, field), display)
+                if value is not display:
+                    setattr(display, field, value)
+
+    # ------------------- 批量落库 -------------------
+    @property
+    def pending(self):
+        with self._lock:
+            return len(self._pending)
+
+    def _run(self):
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def flush(self):
+        """把当前待写内容写库（可在任意线程调用，与后台线程串行）"""
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return 0
+                batch = [(word_id, field, entry[0]) for (word_id, field), entry in self._pending.items()]
+                self._inflight = {(word_id, field): value for word_id, field, value in batch}
+                self._pending.clear()
+            try:
+                new_audio, failures = WordService.apply_updates(batch)
+            except Exception as e:
+                with self._lock:
+                    self._inflight = {}
+                print(f"[ERROR] 批量写入失败: {e}")
+                self.stats["failed"] += len(batch)
+                page_cache.invalidate()   # 缓存里是未落库的乐观值
+                if self.on_error:
+                    self.on_error([(word_id, field, value, e) for word_id, field, value in batch])
+                return 0
+            with self._lock:
+                self._inflight = {}
+            self.stats["written"] += len(batch) - len(failures)
+            self.stats["batches"] += 1
+            if failures:
+                # 只有去重键冲突的修改被拒绝，其余已落库
+                print(f"[ERROR] {len(failures)} 项修改与已有单词重复，未写入")
+                self.stats["failed"] += len(failures)
+                page_cache.invalidate()
+                if self.on_error:
+                    self.on_error(failures)
+            for word_id, audio_id in new_audio.items():
+                page_cache.update_audio(word_id, audio_id)
+            if new_audio and self.on_flushed:
+                self.on_flushed(new_audio)
+            return len(batch) - len(failures)
+
+    def close(self):
+        """停止后台线程并写完剩余内容（退出时调用）"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        self._wakeup.set()
+        self._thread.join()
+        self.flush()
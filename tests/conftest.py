@@ -0,0 +1,29 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# model.storage 导入时按 WORDLEARNER_DB 建引擎：测试不碰工作目录下的 words.db
+_TEST_DB = os.path.join(tempfile.mkdtemp(prefix="wordlearner-"), "words.db")
+os.environ.setdefault("WORDLEARNER_DB", _TEST_DB)
+
+
+@pytest.fixture
+def db():
+    """共享的临时库（按需建表迁移）；用例结束后清空数据表、页缓存与页边界索引"""
+    from model.orm_models import DB_FILE, Base, engine, ensure_db
+    from service.page_cache import page_cache
+    from service.word_service import WordService
+
+    if DB_FILE != _TEST_DB:
+        pytest.skip("WORDLEARNER_DB 指向外部数据库，不运行会清空数据的用例")
+    ensure_db()
+    yield engine
+    with engine.begin() as conn:
+        for table in reversed(Base.metadata.sorted_tables):
+            conn.execute(table.delete())
+    page_cache.invalidate()
+    WordService.reset_page_index()
@@ -0,0 +1,57 @@
+"""PCM 转 float32 与 wav 解码的位宽处理"""
+import wave
+from io import BytesIO
+
+import numpy as np
+import pytest
+
+from util import audio_decode
+from util.audio_decode import pcm_to_float32
+
+INT24 = np.array([0, 1, -1, 2 ** 23 - 1, -2 ** 23, 12345], dtype=np.int32)
+
+
+def _int24_bytes(values):
+    return b"".join(int(v).to_bytes(3, "little", signed=True) for v in values)
+
+
+def _wav(raw, width, channels=1, frame_rate=8000):
+    buf = BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(channels)
+        w.setsampwidth(width)
+        w.setframerate(frame_rate)
+        w.writeframes(raw)
+    return buf.getvalue()
+
+
+@pytest.mark.parametrize("width, values, scale", [
+    (1, np.array([0, 128, 255], dtype=np.uint8), None),
+    (2, np.array([0, 1, -1, 32767, -32768], dtype=np.int16), 2 ** 15),
+    (4, np.array([0, 1, -1, 2 ** 31 - 1], dtype=np.int32), 2 ** 31),
+])
+def test_pcm_to_float32_widths(width, values, scale):
+    out = pcm_to_float32(values.tobytes(), width)
+    expected = (values.astype(np.float64) - 128) / 128 if scale is None else values / scale
+    assert out.dtype == np.float32
+    assert np.allclose(out, expected)
+
+
+def test_pcm_to_float32_24_bit():
+    out = pcm_to_float32(_int24_bytes(INT24), 3)
+    assert np.allclose(out, INT24 / 2 ** 23)
+    assert pcm_to_float32(_int24_bytes(INT24), 3, channels=2).shape == (3, 2)
+
+
+def test_pcm_to_float32_rejects_unsupported_width():
+    with pytest.raises(ValueError):
+        pcm_to_float32(b"\0" * 10, 5)
+    with pytest.raises(ValueError):
+        pcm_to_float32(b"\0" * 4, 3)
+
+
+def test_wave_decoder_converts_24_bit_to_int16():
+    samples, frame_rate, channels = audio_decode.decode(_wav(_int24_bytes(INT24), 3), "wav")
+    assert (frame_rate, channels) == (8000, 1)
+    assert samples.dtype == np.int16
+    assert list(samples) == [0, 0, 0, 32767, -32768, 12345 // 256]
@@ -0,0 +1,117 @@
+"""常驻输出引擎：打断、串联、排空与样本预处理（无声 / 文件输出，不需要声卡）"""
+import time
+import wave
+
+import numpy as np
+import pytest
+
+from service.audio_engine import AudioEngine, FileSink, NullSink
+
+RATE = 8000
+BLOCK = 80
+
+
+class RecordingSink(NullSink):
+    """记录每个输出块的无声输出"""
+
+    def __init__(self, realtime=False):
+        super().__init__(realtime)
+        self.blocks = []
+
+    def consume(self, block):
+        super().consume(block)
+        self.blocks.append(block.copy())
+
+    def played(self):
+        """已输出的非静音样本"""
+        if not self.blocks:
+            return np.empty(0, dtype=np.int16)
+        out = np.concatenate(self.blocks)
+        return out[out != 0]
+
+
+def _clip(value, frames):
+    return np.full(frames, value, dtype=np.int16)
+
+
+@pytest.fixture
+def engine_for():
+    engines = []
+
+    def make(sink):
+        engine = AudioEngine(sink=sink, rate=RATE, block=BLOCK, ring_seconds=2).start()
+        engines.append(engine)
+        return engine
+
+    yield make
+    for engine in engines:
+        engine.stop()
+
+
+def test_play_preempts_current_clip(engine_for):
+    sink = RecordingSink(realtime=True)
+    engine = engine_for(sink)
+    engine.play(_clip(1, RATE), RATE)   # 1 秒
+    deadline = time.monotonic() + 2
+    while not (sink.played() == 1).any():
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+    engine.play(_clip(2, RATE // 10), RATE)
+    assert engine.wait(timeout=5)
+
+    played = sink.played()
+    first = np.flatnonzero(played == 2)[0]
+    # 旧片段被截断，新片段完整播放，之后不再出现旧片段的样本
+    assert (played[:first] == 1).all() and first < RATE // 2
+    assert (played[first:] == 2).all() and len(played) - first == RATE // 10
+    assert engine.latency_stats()["count"] == 2
+
+
+def test_chain_and_enqueue_play_in_order(engine_for):
+    sink = RecordingSink()
+    engine = engine_for(sink)
+    engine.chain((_clip(1, 300), RATE), (_clip(2, 200), RATE))
+    engine.enqueue(_clip(3, 100), RATE)
+    assert engine.wait(timeout=5)
+
+    expected = np.concatenate([_clip(1, 300), _clip(2, 200), _clip(3, 100)])
+    np.testing.assert_array_equal(sink.played(), expected)
+
+
+def test_wait_drains_ring_and_stop_is_clean(engine_for, tmp_path):
+    path = tmp_path / "out.wav"
+    engine = engine_for(FileSink(str(path)))
+    # 超过环形缓冲容量的片段需要 feeder 多次补写
+    clip = (np.arange(RATE * 3) % 1000 + 1).astype(np.int16)
+    engine.play(clip, RATE)
+    assert engine.wait(timeout=10)
+    assert engine.ring.available() == 0
+
+    engine.stop()
+    assert not engine._feeder.is_alive()
+    assert not engine.sink._thread.is_alive()
+    engine.stop()   # 重复停止不报错
+
+    with wave.open(str(path), "rb") as wav:
+        assert wav.getsampwidth() == 2 and wav.getframerate() == RATE
+        data = np.frombuffer(wav.readframes(wav.getnframes()), dtype=np.int16)
+    np.testing.assert_array_equal(data[data != 0], clip)
+
+
+def test_prepare_keeps_int16_and_converts_float():
+    engine = AudioEngine(sink=NullSink(), rate=RATE, block=BLOCK)
+
+    pcm = np.arange(1, 101, dtype=np.int16)
+    out = engine._prepare(pcm, RATE)
+    assert out.dtype == np.int16 and np.shares_memory(out, pcm)
+
+    out = engine._prepare(np.array([0.0, 0.5, -0.5, 1.0, -2.0], dtype=np.float32), RATE)
+    assert out.dtype == np.int16
+    np.testing.assert_array_equal(out, [0, 16383, -16383, 32767, -32767])
+
+    stereo = np.array([[100, 300], [-200, -400]], dtype=np.int16)
+    np.testing.assert_array_equal(engine._prepare(stereo, RATE), [200, -300])
+
+    out = engine._prepare(np.zeros(RATE // 2, dtype=np.float64), RATE // 2)
+    assert out.dtype == np.int16 and len(out) == RATE
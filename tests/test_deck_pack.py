@@ -0,0 +1,61 @@
+"""卡组打包文件头部与文本段的校验"""
+import json
+
+import pytest
+
+from service.deck_pack import (
+    PACK_MAGIC, PACK_VERSION, _PREAMBLE, _SECTIONS, DeckPackError, decode_text, encode_text, read_header,
+)
+
+
+def _pack(header, data=b""):
+    raw = json.dumps(header).encode("utf-8")
+    return _PREAMBLE.pack(PACK_MAGIC, len(raw)) + raw + data
+
+
+def _empty_header(**changes):
+    header = {"version": PACK_VERSION, "name": "deck.tsv", "words": 0, "audio": 0,
+              "sections": {name: [0, 0] for name in _SECTIONS}}
+    header.update(changes)
+    return header
+
+
+def test_read_header_accepts_empty_deck():
+    header, base = read_header(_pack(_empty_header()))
+    assert header["words"] == 0
+    assert base == len(_pack(_empty_header()))
+
+
+@pytest.mark.parametrize("header, reason", [
+    (_empty_header(sections={name: [0, 0] for name in _SECTIONS if name != "ipa"}), "缺少段 ipa"),
+    (_empty_header(sections={**{name: [0, 0] for name in _SECTIONS}, "word": [0, 10]}), "超出文件范围"),
+    (_empty_header(words=3), "与行数 3 不符"),
+    (_empty_header(audio=1), "段头"),
+    (_empty_header(words=-1), "缺少行数"),
+])
+def test_read_header_rejects_inconsistent_sections(header, reason):
+    with pytest.raises(DeckPackError, match=reason):
+        read_header(_pack(header))
+
+
+def test_read_header_rejects_bad_preamble():
+    with pytest.raises(DeckPackError):
+        read_header(b"WLDECK")
+    with pytest.raises(DeckPackError):
+        read_header(b"NOTADECK" + b"\0" * 8)
+    with pytest.raises(DeckPackError, match="超出文件范围"):
+        read_header(_PREAMBLE.pack(PACK_MAGIC, 1000) + b"{}")
+    with pytest.raises(DeckPackError, match="无法解析"):
+        read_header(_PREAMBLE.pack(PACK_MAGIC, 2) + b"\xff\xfe")
+
+
+def test_text_round_trip_and_corruption():
+    values = ["apple", None, "苹果", ""]
+    data = encode_text(values)
+    assert decode_text(data, len(values)) == values
+    with pytest.raises(DeckPackError):
+        decode_text(data[:-1], len(values))
+    with pytest.raises(DeckPackError):
+        decode_text(data[:8], len(values))
+    with pytest.raises(DeckPackError, match="UTF-8"):
+        decode_text(encode_text(["ab"])[:-2] + b"\xff\xff", 1)
@@ -0,0 +1,120 @@
+"""生成器埋点：yield 出去期间挂起计时，不占用当前线程的操作栈"""
+import time
+
+import pytest
+from sqlalchemy import create_engine
+
+from util import instrument
+
+
+@pytest.fixture
+def enabled():
+    was_enabled = instrument.enabled()
+    instrument.enable()
+    instrument.reset()
+    yield
+    instrument.reset()
+    if not was_enabled:
+        instrument.disable()
+
+
+def _ops():
+    return instrument.snapshot()["ops"]
+
+
+def test_generator_time_excludes_consumer(enabled):
+    @instrument.timed("test.gen")
+    def produce():
+        for i in range(3):
+            time.sleep(0.01)
+            yield i
+
+    seen = []
+    for item in produce():
+        # 调用方在两次迭代之间不在生成器的 span 里
+        seen.append((item, list(instrument._stack())))
+        time.sleep(0.05)
+
+    assert seen == [(0, []), (1, []), (2, [])]
+    op = _ops()["test.gen"]
+    assert op["count"] == 1 and op["errors"] == 0
+    assert 25 <= op["total_ms"] < 100
+
+
+def test_generator_send_return_and_errors(enabled):
+    @instrument.timed("test.echo")
+    def echo():
+        total = 0
+        while True:
+            value = yield total
+            if value is None:
+                return total
+            total += value
+
+    gen = echo()
+    assert next(gen) == 0
+    assert gen.send(2) == 2
+    assert gen.send(3) == 5
+    with pytest.raises(StopIteration) as stop:
+        gen.send(None)
+    assert stop.value.value == 5
+
+    @instrument.timed("test.fail")
+    def fail():
+        yield 1
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        list(fail())
+    ops = _ops()
+    assert ops["test.echo"]["errors"] == 0
+    assert ops["test.fail"]["errors"] == 1
+
+
+def test_generator_close_runs_cleanup_inside_span(enabled):
+    inside = []
+
+    @instrument.timed("test.close")
+    def produce():
+        try:
+            yield 1
+            yield 2
+        finally:
+            inside.append(list(instrument._stack()))
+
+    gen = produce()
+    assert next(gen) == 1
+    assert instrument._stack() == []
+    gen.close()
+
+    assert inside == [["test.close"]]
+    assert _ops()["test.close"]["count"] == 1
+    assert _ops()["test.close"]["errors"] == 0
+
+
+def test_generator_suspends_inner_spans(enabled):
+    engine = create_engine("sqlite://")
+    instrument.register_engine(engine, "test")
+    try:
+        with engine.connect() as conn:
+            @instrument.timed("test.outer")
+            def produce():
+                # 跨 yield 打开的 span：挂起期间不能把调用方的 SQL 算进来
+                with instrument.span("test.inner"):
+                    conn.exec_driver_sql("SELECT 1")
+                    yield 1
+                    yield 2
+
+            seen = []
+            for item in produce():
+                seen.append(list(instrument._stack()))
+                conn.exec_driver_sql("SELECT 2")
+                conn.exec_driver_sql("SELECT 3")
+    finally:
+        instrument._engines.remove((engine, "test"))
+
+    assert seen == [[], []]
+    assert instrument._stack() == []
+    ops = _ops()
+    assert ops["test.inner"]["count"] == 1 and ops["test.inner"]["sql"] == 1
+    assert ops["test.outer"]["count"] == 1 and ops["test.outer"]["sql"] == 1
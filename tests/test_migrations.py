@@ -0,0 +1,113 @@
+"""从引入版本表之前的旧库（版本 0）升级到最新版本"""
+import pytest
+from sqlalchemy import create_engine, text
+
+from model import migrations
+
+# 基线版本的表结构：words.gtts 存音频，没有 audio_id / 复习调度列，files 没有 display_count
+BASELINE_SCHEMA = (
+    "CREATE TABLE files (id INTEGER PRIMARY KEY AUTOINCREMENT, filename VARCHAR NOT NULL UNIQUE)",
+    "CREATE TABLE words (id INTEGER PRIMARY KEY AUTOINCREMENT, word VARCHAR NOT NULL, "
+    "word_lower VARCHAR NOT NULL, trans VARCHAR NOT NULL, ipa VARCHAR, gtts BLOB, "
+    "is_unlearned BOOLEAN NOT NULL)",
+    "CREATE INDEX ix_words_word_lower ON words (word_lower)",
+    "CREATE TABLE display (id INTEGER PRIMARY KEY AUTOINCREMENT, iid VARCHAR UNIQUE, "
+    "word_id INTEGER NOT NULL REFERENCES words(id), file_id INTEGER NOT NULL REFERENCES files(id))",
+)
+
+# (id, word, word_lower, trans, gtts, is_unlearned)
+BASELINE_WORDS = (
+    (1, "Apple", "apple", "苹果", b"mp3-apple", True),
+    (2, "apple", "apple", "苹果", None, False),       # 与 1 重复，已学会
+    (3, "Pear", "pear", "梨", b"mp3-pear", True),
+    (4, "PEAR", "PEAR", "梨", None, True),            # 编辑单词后 word_lower 未同步，修正后与 3 重复
+    (5, "Plum", "plum", "李子", None, True),
+)
+# (id, iid, word_id, file_id)
+BASELINE_DISPLAYS = (
+    (1, "1_1", 1, 1),
+    (2, "1_3", 3, 1),
+    (3, "2_2", 2, 2),    # 合并后改指向单词 1
+    (4, "1_4", 4, 1),    # 文件 1 已有单词 3 的展示行，合并后删除
+    (5, "2_4", 4, 2),    # 合并后改指向单词 3
+    (6, "2_5", 5, 2),
+)
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'baseline.db'}")
+    with engine.begin() as conn:
+        for ddl in BASELINE_SCHEMA:
+            conn.execute(text(ddl))
+        conn.execute(text("INSERT INTO files (id, filename) VALUES (1, 'a.txt'), (2, 'b.txt')"))
+        conn.execute(
+            text("INSERT INTO words (id, word, word_lower, trans, gtts, is_unlearned) "
+                 "VALUES (:id, :word, :lower, :trans, :gtts, :unlearned)"),
+            [dict(zip(("id", "word", "lower", "trans", "gtts", "unlearned"), row)) for row in BASELINE_WORDS],
+        )
+        conn.execute(
+            text("INSERT INTO display (id, iid, word_id, file_id) VALUES (:id, :iid, :word_id, :file_id)"),
+            [dict(zip(("id", "iid", "word_id", "file_id"), row)) for row in BASELINE_DISPLAYS],
+        )
+    yield engine
+    engine.dispose()
+
+
+def _upgrade_with_reviews(engine):
+    """先升级到去重之前，给将被合并的单词写入复习记录，再升级到最新版本"""
+    with engine.connect() as conn:
+        assert migrations.current_version(conn) == 0
+    assert migrations.upgrade(engine, target=4) == [1, 2, 3, 4]
+    with engine.begin() as conn:
+        conn.execute(text(
+            "INSERT INTO review_log (word_id, reviewed_at, grade, interval_days, ease) "
+            "VALUES (2, 100, 4, 1, 2.5), (4, 200, 3, 1, 2.5), (5, 300, 5, 1, 2.5)"
+        ))
+    return migrations.upgrade(engine)
+
+
+def test_upgrade_from_baseline_merges_duplicates(engine):
+    applied = _upgrade_with_reviews(engine)
+    assert applied == list(range(5, migrations.LATEST_VERSION + 1))
+
+    with engine.connect() as conn:
+        assert migrations.current_version(conn) == migrations.LATEST_VERSION
+        words = conn.execute(text(
+            "SELECT id, word, word_lower, is_unlearned, audio_id IS NOT NULL FROM words ORDER BY id"
+        )).all()
+        displays = conn.execute(text("SELECT id, iid, word_id, file_id FROM display ORDER BY id")).all()
+        reviews = conn.execute(text("SELECT word_id, reviewed_at FROM review_log ORDER BY reviewed_at")).all()
+        counts = dict(conn.execute(text("SELECT id, display_count FROM files")).all())
+        gtts = conn.execute(text("SELECT COUNT(*) FROM words WHERE gtts IS NOT NULL")).scalar()
+
+    # 重复行并入 id 最小的一行：任一行已学会即已学会，音频取第一个非空
+    assert [tuple(row) for row in words] == [
+        (1, "Apple", "apple", False, True),
+        (3, "Pear", "pear", True, True),
+        (5, "Plum", "plum", True, False),
+    ]
+    assert [tuple(row) for row in displays] == [
+        (1, "1_1", 1, 1),
+        (2, "1_3", 3, 1),
+        (3, "2_1", 1, 2),
+        (5, "2_3", 3, 2),
+        (6, "2_5", 5, 2),
+    ]
+    assert [tuple(row) for row in reviews] == [(1, 100), (3, 200), (5, 300)]
+    assert counts == {1: 2, 2: 3}
+    assert gtts == 0
+
+
+def test_upgrade_is_idempotent(engine):
+    _upgrade_with_reviews(engine)
+    assert migrations.upgrade(engine) == []
+    with engine.connect() as conn:
+        assert migrations.current_version(conn) == migrations.LATEST_VERSION
+
+
+def test_hot_queries_use_indexes_after_upgrade(engine):
+    migrations.upgrade(engine)
+    with engine.connect() as conn:
+        problems = {name: found for name, _plan, found in migrations.explain_hot_queries(conn) if found}
+    assert problems == {}
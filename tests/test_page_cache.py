@@ -0,0 +1,93 @@
+"""页缓存：LRU 淘汰、写入后的代数检查与写后队列的叠加"""
+from types import SimpleNamespace
+
+import pytest
+
+from service.page_cache import PageCache, page_cache
+from service.word_service import WordDisplay, WordService
+from service.write_behind import WriteBehindQueue
+
+
+def _display(iid, word_id, word="apple", is_unlearned=True, audio_id=None):
+    return WordDisplay.from_row(SimpleNamespace(
+        id=word_id, iid=iid, word_id=word_id, file_id=1, word=word, trans="苹果", ipa=None,
+        is_unlearned=is_unlearned, audio_id=audio_id,
+    ))
+
+
+def _page(*displays):
+    return {d.iid: d for d in displays}
+
+
+def test_lru_evicts_least_recently_used():
+    cache = PageCache(capacity=2)
+    a, b, c = (1, 0, 10), (1, 1, 10), (1, 2, 10)
+    cache.put(a, _page(_display("a", 1)))
+    cache.put(b, _page(_display("b", 2)))
+    assert cache.get(a) is not None      # a 变为最近使用
+    cache.put(c, _page(_display("c", 3)))
+
+    assert cache.get(b) is None
+    assert cache.get(a) is not None and cache.get(c) is not None
+    stats = cache.stats()
+    assert stats["size"] == 2 and stats["hits"] == 3 and stats["misses"] == 1
+
+
+@pytest.mark.parametrize("write", [
+    lambda cache: cache.update_word(_display("x", 9)),
+    lambda cache: cache.update_audio(9, 5),
+    lambda cache: cache.invalidate(2),
+])
+def test_writes_bump_generation_and_reject_stale_loads(write):
+    cache = PageCache()
+    key = (1, 0, 10)
+
+    def loader():
+        write(cache)     # 加载期间发生写入
+        return _page(_display("a", 1))
+
+    page = cache.load(key, loader)
+    assert list(page) == ["a"]
+    assert cache.peek(key) is None       # 过期结果不进缓存
+
+    generation = cache._generation
+    write(cache)
+    assert cache.put(key, page, generation) is False
+    assert cache.put(key, page, cache._generation) is True
+
+
+def test_update_word_writes_through_to_every_page():
+    cache = PageCache()
+    cache.put((1, 0, 10), _page(_display("1_7", 7)))
+    cache.put((2, 0, 10), _page(_display("2_7", 7)))
+
+    cache.update_word(_display("1_7", 7, word="Apple", is_unlearned=False, audio_id=3))
+    other = cache.peek((2, 0, 10))["2_7"]
+    assert (other.word, other.is_unlearned, other.audio_id) == ("Apple", False, 3)
+    cache.update_audio(7, 4)
+    assert cache.peek((1, 0, 10))["1_7"].audio_id == 4 and other.audio_id == 4
+
+
+def test_overlay_applies_until_flushed(monkeypatch):
+    written = []
+
+    def apply_updates(updates):
+        written.extend(updates)
+        return {}, []
+
+    monkeypatch.setattr(WordService, "apply_updates", staticmethod(apply_updates))
+    queue = WriteBehindQueue(flush_interval=60)
+    try:
+        queue.submit(7, "is_unlearned", False, True)
+        # 尚未落库：从库里读出的旧值被叠加为乐观值
+        page = page_cache.apply_overlays(_page(_display("1_7", 7, is_unlearned=True)))
+        assert page["1_7"].is_unlearned is False
+
+        assert queue.flush() == 1
+        assert written == [(7, "is_unlearned", False)]
+        # 落库之后不再叠加：以库里读出的值为准
+        page = page_cache.apply_overlays(_page(_display("1_7", 7, is_unlearned=True)))
+        assert page["1_7"].is_unlearned is True
+    finally:
+        queue.close()
+        page_cache._overlays.remove(queue.overlay)
@@ -0,0 +1,74 @@
+"""按静音切分批量合成的音频"""
+import numpy as np
+
+from service.tts_batch import BatchTTSBackend, SyntheticTTSBackend, encode_wav, split_on_silence
+from util import audio_decode
+
+WORDS = ["alpha", "beta", "gamma", "delta"]
+
+
+def _decode(data):
+    return audio_decode.decode(data, "wav")
+
+
+def test_split_exact_count():
+    backend = SyntheticTTSBackend()
+    samples, frame_rate, channels = _decode(backend.synthesize(". ".join(WORDS)))
+    bounds = split_on_silence(samples, frame_rate, len(WORDS), channels)
+
+    assert len(bounds) == len(WORDS)
+    assert all(start < end for start, end in bounds)
+    assert all(prev[1] <= start for prev, (start, _) in zip(bounds, bounds[1:]))
+    # 切出的每段与单独合成的同一单词有声时长一致（误差在一帧 10ms 之内）
+    for (start, end), word in zip(bounds, WORDS):
+        single, _, _ = _decode(backend.synthesize(word))
+        (s0, e0), = split_on_silence(single, frame_rate, 1, pad_ms=0)
+        (s1, e1), = split_on_silence(samples[start:end], frame_rate, 1, pad_ms=0)
+        assert abs((e1 - s1) - (e0 - s0)) <= frame_rate // 100
+
+
+def test_split_count_mismatch_returns_none():
+    samples, frame_rate, channels = _decode(SyntheticTTSBackend().synthesize(". ".join(WORDS)))
+    assert split_on_silence(samples, frame_rate, len(WORDS) + 1, channels) is None
+    assert split_on_silence(samples, frame_rate, len(WORDS) - 1, channels) is None
+
+
+def test_split_all_silent_returns_none():
+    samples = np.zeros(16000, dtype=np.int16)
+    assert split_on_silence(samples, 16000, 1) is None
+    assert split_on_silence(samples, 16000, 3) is None
+
+
+def test_split_stereo_uses_sample_frames():
+    mono, frame_rate, _ = _decode(SyntheticTTSBackend().synthesize(". ".join(WORDS)))
+    stereo = np.repeat(mono, 2)
+    assert split_on_silence(stereo, frame_rate, len(WORDS), channels=2) == \
+        split_on_silence(mono, frame_rate, len(WORDS))
+
+
+def test_batch_splits_with_one_request():
+    inner = SyntheticTTSBackend()
+    backend = BatchTTSBackend(inner, batch_words=len(WORDS), compress=False)
+    clips = backend.synthesize_batch(WORDS)
+
+    assert inner.calls == 1
+    assert backend.requests == 1 and backend.fallbacks == 0
+    assert len(clips) == len(WORDS) and all(clips)
+
+
+def test_batch_falls_back_to_single_on_mismatch():
+    # 空格分隔不产生长停顿：间隔数对不上，整批逐词合成
+    inner = SyntheticTTSBackend(fail_words={"gamma"})
+    backend = BatchTTSBackend(inner, batch_words=len(WORDS), separator=" ", compress=False)
+    clips = backend.synthesize_batch(WORDS)
+
+    assert backend.fallbacks == 1
+    assert backend.requests == 1 + len(WORDS)
+    assert clips == [b"" if word == "gamma" else inner.synthesize(word) for word in WORDS]
+
+
+def test_wav_clip_round_trip():
+    samples = (np.sin(np.arange(1600) / 10) * 10000).astype(np.int16)
+    decoded, frame_rate, channels = _decode(encode_wav(samples, 16000))
+    assert (frame_rate, channels) == (16000, 1)
+    assert np.array_equal(decoded, samples)
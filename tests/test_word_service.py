@@ -0,0 +1,62 @@
+"""键集分页：任意顺序跳页的结果与 OFFSET 分页一致"""
+import pytest
+from sqlalchemy import delete, insert, select
+
+from model.orm_models import Display, File, Word
+from service.db_utils import read_session
+from service.word_service import WordService
+
+PAGE_SIZE = 5
+
+
+@pytest.fixture
+def files(db):
+    with db.begin() as conn:
+        conn.execute(insert(File), [{"id": 1, "filename": "a.tsv"}, {"id": 2, "filename": "b.tsv"}])
+    return db
+
+
+def _add_words(engine, start, count):
+    """交替给两个文件追加展示行，使同一文件的 Display.id 不连续"""
+    with engine.begin() as conn:
+        for i in range(start, start + count):
+            word_id = conn.execute(
+                insert(Word).values(word=f"w{i}", word_lower=f"w{i}", trans=f"t{i}", is_unlearned=True)
+            ).inserted_primary_key[0]
+            for file_id in (1, 2):
+                conn.execute(insert(Display).values(iid=f"{file_id}_{word_id}", word_id=word_id, file_id=file_id))
+
+
+def _offset_page(file_id, page):
+    with read_session() as session:
+        return session.scalars(
+            select(Display.iid).where(Display.file_id == file_id).order_by(Display.id)
+            .offset(page * PAGE_SIZE).limit(PAGE_SIZE)
+        ).all()
+
+
+def _assert_jumps_match(file_id, pages):
+    for page in pages:
+        assert list(WordService._load_page(file_id, page, PAGE_SIZE)) == _offset_page(file_id, page), page
+
+
+def test_page_jumps_match_offset_after_inserts(files):
+    _add_words(files, 0, 53)
+    _assert_jumps_match(1, [7, 2, 10, 0, 9, 3, 11, 5, 1])
+    _assert_jumps_match(2, [4, 10, 0])
+
+    # 追加的展示行排在已有锚点之后，已记住的锚点继续有效
+    _add_words(files, 53, 20)
+    _assert_jumps_match(1, [14, 8, 11, 13, 2, 12, 0])
+
+
+def test_page_jumps_match_offset_after_deletes(files):
+    _add_words(files, 0, 40)
+    _assert_jumps_match(1, [6, 3, 7, 1])
+
+    with files.begin() as conn:
+        ids = conn.execute(select(Display.id).where(Display.file_id == 1).order_by(Display.id)).scalars().all()
+        conn.execute(delete(Display).where(Display.id.in_(ids[3:9] + ids[20:22])))
+    WordService.reset_page_index(1)
+    _assert_jumps_match(1, [6, 3, 7, 0, 5, 1, 4])
+    assert WordService._load_page(1, 7, PAGE_SIZE) == {}
@@ -0,0 +1,137 @@
+"""写后队列：合并修改、冲突逐项拒绝、关闭时落库与整批失败回调"""
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import insert, select
+
+from model.orm_models import Word
+from service.db_utils import read_session
+from service.page_cache import page_cache
+from service.tts_service import FakeTTSBackend, get_default_backend, set_default_backend
+from service.word_service import WordService
+from service.write_behind import WriteBehindQueue
+
+
+@pytest.fixture
+def words(db):
+    """插入三个单词，返回 {word_lower: word_id}"""
+    with db.begin() as conn:
+        conn.execute(insert(Word), [
+            {"word": w, "word_lower": w.lower(), "trans": t, "is_unlearned": True}
+            for w, t in (("Apple", "苹果"), ("Pear", "梨"), ("Plum", "李子"))
+        ])
+        rows = conn.execute(select(Word.id, Word.word_lower)).all()
+    # 修改单词会合成新音频：测试里不访问网络
+    backend = get_default_backend()
+    set_default_backend(FakeTTSBackend())
+    yield {lower: word_id for word_id, lower in rows}
+    set_default_backend(backend)
+
+
+@pytest.fixture
+def make_queue():
+    queues = []
+
+    def make(**kwargs):
+        # 间隔足够长，只在测试显式 flush / close 时写库
+        queue = WriteBehindQueue(flush_interval=60, **kwargs)
+        queues.append(queue)
+        return queue
+
+    yield make
+    for queue in queues:
+        queue.close()
+        page_cache._overlays.remove(queue.overlay)
+
+
+@pytest.fixture
+def batches(monkeypatch):
+    """记录每次 apply_updates 收到的批次"""
+    calls = []
+    apply_updates = WordService.apply_updates
+
+    def recording(updates):
+        calls.append(list(updates))
+        return apply_updates(updates)
+
+    monkeypatch.setattr(WordService, "apply_updates", staticmethod(recording))
+    return calls
+
+
+def _column(word_id, column):
+    with read_session() as session:
+        return session.scalar(select(column).where(Word.id == word_id))
+
+
+def _display(word_id, **fields):
+    return SimpleNamespace(iid=f"t_{word_id}", word_id=word_id, **fields)
+
+
+def test_toggle_three_times_is_one_write(words, make_queue, batches):
+    queue = make_queue()
+    display = _display(words["apple"], is_unlearned=True)
+    for _ in range(3):
+        queue.toggle_unlearned(display)
+    assert display.is_unlearned is False
+    assert queue.pending == 1
+
+    assert queue.flush() == 1
+    assert batches == [[(words["apple"], "is_unlearned", False)]]
+    assert _column(words["apple"], Word.is_unlearned) is False
+    assert queue.stats["submitted"] == 3 and queue.stats["written"] == 1
+
+
+def test_key_collision_rejects_only_that_item(words, make_queue):
+    failures = []
+    queue = make_queue(on_error=failures.extend)
+    queue.submit(words["pear"], "word", "APPLE", "Pear")
+    queue.submit(words["pear"], "trans", "苹果", "梨")
+    queue.submit(words["plum"], "word", "Damson", "Plum")
+    queue.submit(words["plum"], "ipa", "/plʌm/", None)
+
+    assert queue.flush() == 2
+    assert sorted((word_id, field) for word_id, field, _, _ in failures) == [
+        (words["pear"], "trans"), (words["pear"], "word"),
+    ]
+    assert _column(words["pear"], Word.word) == "Pear"
+    assert _column(words["plum"], Word.word_lower) == "damson"
+    assert _column(words["plum"], Word.ipa) == "/plʌm/"
+    assert _column(words["plum"], Word.audio_id) is not None
+    assert queue.stats["failed"] == 2
+
+
+def test_close_flushes_pending(words, make_queue):
+    queue = make_queue()
+    queue.submit(words["apple"], "ipa", "/ˈæp.əl/", None)
+    queue.close()
+    assert queue.pending == 0
+    assert _column(words["apple"], Word.ipa) == "/ˈæp.əl/"
+    with pytest.raises(RuntimeError):
+        queue.submit(words["apple"], "ipa", "x", None)
+
+
+def test_batch_failure_reports_batch_and_keeps_later_items(words, make_queue, monkeypatch):
+    failures = []
+    queue = make_queue(on_error=failures.extend)
+    apply_updates = WordService.apply_updates
+
+    def fail_once(updates):
+        monkeypatch.setattr(WordService, "apply_updates", staticmethod(apply_updates))
+        # 写库期间 UI 线程又提交了修改：不属于失败的批次，下一次照常落库
+        queue.submit(words["plum"], "ipa", "/plʌm/", None)
+        raise RuntimeError("database is locked")
+
+    monkeypatch.setattr(WordService, "apply_updates", staticmethod(fail_once))
+    queue.submit(words["apple"], "ipa", "/ˈæp.əl/", None)
+    queue.submit(words["pear"], "ipa", "/peər/", None)
+
+    assert queue.flush() == 0
+    assert [(word_id, field, value) for word_id, field, value, _ in failures] == [
+        (words["apple"], "ipa", "/ˈæp.əl/"), (words["pear"], "ipa", "/peər/"),
+    ]
+    assert all(isinstance(error, RuntimeError) for *_, error in failures)
+    assert queue.pending == 1
+
+    assert queue.flush() == 1
+    assert _column(words["plum"], Word.ipa) == "/plʌm/"
+    assert _column(words["apple"], Word.ipa) is None
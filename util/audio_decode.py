@@ -0,0 +1,181 @@
+"""
+可替换的音频解码后端。
+
+默认优先使用进程内解码器（miniaudio / soundfile，wav 用标准库 wave），
+都不可用或解码失败时退回 pydub（每个片段启动一次 ffmpeg 子进程）。
+所有后端统一输出交错排列的 int16 样本，转 float32 只走 pcm_to_float32 一条路径。
+"""
+import wave
+from io import BytesIO
+
+import numpy as np
+
+_INT_DTYPES = {1: np.uint8, 2: np.int16, 4: np.int32}
+
+
+def _int24_to_int32(raw):
+    """24 位小端 PCM 放到 int32 的高 3 字节（低字节补零），按 32 位满幅缩放即可"""
+    packed = np.frombuffer(raw, dtype=np.uint8)
+    if packed.size % 3:
+        raise ValueError("24 位 PCM 数据长度不是 3 的倍数")
+    padded = np.zeros((packed.size // 3, 4), dtype=np.uint8)
+    padded[:, 1:] = packed.reshape(-1, 3)
+    return padded.view("<i4").reshape(-1)
+
+
+def pcm_to_float32(raw, sample_width=2, channels=1):
+    """
+    把交错 PCM（bytes / array / ndarray）转成 [-1, 1) 的 float32，
+    多声道返回 (frames, channels) 形状。8 位 PCM 为无符号，需先去掉偏置；24 位先展开为 int32。
+    不支持的位宽抛出 ValueError（解码器链据此换下一个解码器）。
+    """
+    if isinstance(raw, np.ndarray):
+        samples = raw
+    elif sample_width == 3:
+        samples = _int24_to_int32(raw)
+    elif sample_width in _INT_DTYPES:
+        samples = np.frombuffer(raw, dtype=_INT_DTYPES[sample_width])
+    else:
+        raise ValueError(f"不支持的 PCM 位宽: {sample_width} 字节")
+    scale = np.float32(2 ** (8 * samples.dtype.itemsize - 1))
+    if samples.dtype == np.uint8:
+        out = (samples.astype(np.float32) - scale) / scale
+    else:
+        out = samples.astype(np.float32) / scale
+    if channels > 1:
+        out = out.reshape((-1, channels))
+    return out
+
+
+class AudioDecoder:
+    """解码器接口：decode(data, format) -> (int16 交错样本, frame_rate, channels)"""
+    name = ""
+    formats = ()        # 支持的格式，空表示不限
+    in_process = True
+
+    def available(self) -> bool:
+        return True
+
+    def supports(self, format) -> bool:
+        return not self.formats or format in self.formats
+
+    def decode(self, data: bytes, format="mp3"):
+        raise NotImplementedError
+
+
+class WaveDecoder(AudioDecoder):
+    """标准库 wave，处理 8 / 16 / 24 / 32 位整数 PCM wav（其余位宽交给下一个解码器）"""
+    name = "wave"
+    formats = ("wav",)
+
+    def decode(self, data, format="wav"):
+        with wave.open(BytesIO(data), "rb") as w:
+            width = w.getsampwidth()
+            frames = w.readframes(w.getnframes())
+            frame_rate, channels = w.getframerate(), w.getnchannels()
+        if width == 2:
+            return np.frombuffer(frames, dtype=np.int16), frame_rate, channels
+        samples = pcm_to_float32(frames, width)
+        return (np.clip(samples * 32768, -32768, 32767).astype(np.int16), frame_rate, channels)
+
+
+class MiniaudioDecoder(AudioDecoder):
+    """pyminiaudio：内置 dr_mp3 / dr_wav / dr_flac，进程内解码"""
+    name = "miniaudio"
+    formats = ("mp3", "wav", "flac", "ogg")
+
+    def available(self):
+        try:
+            import miniaudio  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    def decode(self, data, format="mp3"):
+        import miniaudio
+        decoded = miniaudio.decode(data, output_format=miniaudio.SampleFormat.SIGNED16)
+        return np.frombuffer(decoded.samples, dtype=np.int16), decoded.sample_rate, decoded.nchannels
+
+
+class SoundfileDecoder(AudioDecoder):
+    """soundfile（libsndfile >= 1.1 支持 mp3），进程内解码"""
+    name = "soundfile"
+    formats = ("mp3", "wav", "flac", "ogg")
+
+    def available(self):
+        try:
+            import soundfile  # noqa: F401
+        except (ImportError, OSError):
+            return False
+        return True
+
+    def decode(self, data, format="mp3"):
+        import soundfile
+        samples, frame_rate = soundfile.read(BytesIO(data), dtype="int16", always_2d=True)
+        return samples.reshape(-1), frame_rate, samples.shape[1]
+
+
+class PydubDecoder(AudioDecoder):
+    """pydub + ffmpeg 子进程，兜底"""
+    name = "pydub"
+    in_process = False
+
+    def available(self):
+        try:
+            import pydub  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    def decode(self, data, format="mp3"):
+        from pydub import AudioSegment
+        audio = AudioSegment.from_file(BytesIO(data), format=format).set_sample_width(2)
+        return np.frombuffer(audio.raw_data, dtype=np.int16), audio.frame_rate, audio.channels
+
+
+DECODERS = [WaveDecoder(), MiniaudioDecoder(), SoundfileDecoder(), PydubDecoder()]
+_preferred = None   # 指定后只使用该名称的解码器（基准测试用）
+_available = {}
+
+
+def _is_available(decoder):
+    if decoder.name not in _available:
+        _available[decoder.name] = decoder.available()
+    return _available[decoder.name]
+
+
+def available_decoders():
+    return [d.name for d in DECODERS if _is_available(d)]
+
+
+def set_decoder(name=None):
+    """强制使用某个解码器；None 恢复自动选择"""
+    global _preferred
+    if name is not None and name not in {d.name for d in DECODERS}:
+        raise ValueError(f"未知解码器: {name}")
+    _preferred = name
+
+
+def _candidates(format):
+    for decoder in DECODERS:
+        if _preferred is not None and decoder.name != _preferred:
+            continue
+        if decoder.supports(format) and _is_available(decoder):
+            yield decoder
+
+
+def decode(data: bytes, format="mp3"):
+    """按优先级尝试解码器，返回 (int16 交错样本, frame_rate, channels)"""
+    error = None
+    for decoder in _candidates(format):
+        try:
+            return decoder.decode(data, format)
+        except Exception as e:
+            error = e
+    raise RuntimeError(f"无可用解码器处理 {format} 音频") from error
+
+
+def decode_float32(data: bytes, format="mp3"):
+    """解码为 float32 样本，返回 (samples, frame_rate)"""
+    samples, frame_rate, channels = decode(data, format)
+    return pcm_to_float32(samples, channels=channels), frame_rate
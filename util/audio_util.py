@@ -1,9 +1,11 @@
 
 from io import BytesIO
 
-import numpy as np
 import time
 
+from util.audio_decode import decode_float32, pcm_to_float32
+from util.instrument import timed
+
 # Optional: TTS and audio playback helpers
 try:
     from gtts import gTTS, gTTSError
@@ -17,7 +19,8 @@ except Exception:
     raise "pydub lib is found"
 
 
-def token2voice(text, retries=3, base_sleep=1) -> bytes:
+@timed("tts.token2voice")
+def token2voice(text, retries=3, base_sleep=1, lang='en', tld='co.uk') -> bytes:
     """Return mp3 bytes for the given text using gTTS if available.
     If gTTS isn't available or fails, return None.
     """
@@ -26,7 +29,7 @@ def token2voice(text, retries=3, base_sleep=1) -> bytes:
     mp3_io = BytesIO()
     for attempt in range(1, retries + 1):
         try:
-            tts = gTTS(text=text.strip(), lang='en', tld='co.uk')
+            tts = gTTS(text=text.strip(), lang=lang, tld=tld)
             for decoded in tts.stream():
                 mp3_io.write(decoded)
             mp3_io.flush()
@@ -46,9 +49,8 @@ def play_voice(mp3_bytes:bytes, format="mp3", is_wait=False):
     if not mp3_bytes:
         return
     
-    audio = AudioSegment.from_file(BytesIO(mp3_bytes), format=format)
-    samples = _voice2np(audio)
-    sd.play(samples, samplerate=audio.frame_rate)
+    samples, frame_rate = decode_float32(mp3_bytes, format)
+    sd.play(samples, samplerate=frame_rate)
     if is_wait:
         sd.wait()
 
@@ -56,7 +58,4 @@ def _voice2np(audio:AudioSegment):
     if not audio:
         return
     
-    samples = np.frombuffer(audio.get_array_of_samples(), dtype=np.float32)
-    if audio.channels == 2:
-        samples = samples.reshape((-1,2))
-    return samples / 2**15
\ No newline at end of file
+    return pcm_to_float32(audio.raw_data, audio.sample_width, audio.channels)
\ No newline at end of file
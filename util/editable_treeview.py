@@ -9,6 +9,11 @@ def _empty_callback(row_id, col_name, new_value):
 class EditableTreeview(ttk.Treeview):
     """
     扩展 Treeview，实现双击编辑单元格（支持 Enter 保存、Esc 取消、保存后触发回调）。
+
+    另外支持：
+    - sync_rows / update_row：按差异更新，只重新配置值有变化的行；
+    - 虚拟模式 set_virtual：只实例化可见窗口内的行，数据来自 row_provider(start, count)，
+      滚动时按差异替换，行数不受 Tk 性能限制。
     """
 
     def __init__(self, master=None, editable_columns=None, on_edit_done=None, **kw):
@@ -30,12 +35,170 @@ class EditableTreeview(ttk.Treeview):
             ]
         else:
             self.editable_columns = []
-        print(self.editable_columns)
-        print(on_edit_done)
         self._on_edit_done = on_edit_done or _empty_callback
 
+        # 差异更新：记录每行最近一次写入的值，避免读取 Tk 和重复配置
+        self._row_values = {}
+
+        # 虚拟模式状态
+        self._provider = None
+        self._virtual_total = 0
+        self._virtual_top = 0
+        self._scrollbar = None
+        self._saved_scroll = ("", "")
+
         # 绑定双击事件
         self.bind("<Double-1>", self._start_edit)
+        self.bind("<MouseWheel>", self._on_mousewheel)
+        self.bind("<Button-4>", lambda e: self._on_wheel_steps(-3))
+        self.bind("<Button-5>", lambda e: self._on_wheel_steps(3))
+        self.bind("<Up>", self._on_key_up)
+        self.bind("<Down>", self._on_key_down)
+
+    # ------------------- 差异更新 -------------------
+    def update_row(self, iid, values):
+        """值有变化才重新配置该行；行不存在时追加"""
+        values = tuple(values)
+        if not self.exists(iid):
+            self.insert("", "end", iid=iid, values=values)
+        elif self._row_values.get(iid) == values:
+            return False
+        else:
+            self.item(iid, values=values)
+        self._row_values[iid] = values
+        return True
+
+    def sync_rows(self, rows):
+        """
+        让表格内容与 rows = [(iid, values), ...] 一致：
+        删除多余行、插入缺失行、只更新变化的值，并按 rows 的顺序排列。
+        """
+        wanted = [iid for iid, _ in rows]
+        wanted_set = set(wanted)
+        stale = [iid for iid in self.get_children() if iid not in wanted_set]
+        if stale:
+            self.delete(*stale)
+            for iid in stale:
+                self._row_values.pop(iid, None)
+        for iid, values in rows:
+            self.update_row(iid, values)
+        if list(self.get_children()) != wanted:
+            for index, iid in enumerate(wanted):
+                self.move(iid, "", index)
+
+    def clear_rows(self):
+        children = self.get_children()
+        if children:
+            self.delete(*children)
+        self._row_values.clear()
+
+    # ------------------- 虚拟模式 -------------------
+    @property
+    def virtual(self):
+        return self._provider is not None
+
+    def set_virtual(self, row_provider, total, scrollbar=None):
+        """
+        进入虚拟模式。row_provider(start, count) -> [(iid, values), ...]
+        scrollbar 为可选的 ttk.Scrollbar，由本控件驱动。
+        """
+        self._provider = row_provider
+        self._virtual_total = total
+        self._virtual_top = 0
+        if scrollbar is not None and self._scrollbar is None:
+            # 虚拟模式下滚动条由本控件按总行数驱动，退出时恢复原有绑定
+            self._saved_scroll = (self.cget("yscrollcommand"), scrollbar.cget("command"))
+            self._scrollbar = scrollbar
+            self.configure(yscrollcommand="")
+            scrollbar.configure(command=self._on_scrollbar)
+        self.refresh_virtual()
+
+    def clear_virtual(self):
+        """退出虚拟模式"""
+        self._provider = None
+        self._virtual_total = 0
+        self._virtual_top = 0
+        if self._scrollbar is not None:
+            yscrollcommand, command = self._saved_scroll
+            self.configure(yscrollcommand=yscrollcommand)
+            self._scrollbar.configure(command=command)
+            self._scrollbar.set(0.0, 1.0)
+            self._scrollbar = None
+        self.clear_rows()
+
+    def _window_size(self):
+        return int(self["height"])
+
+    def set_virtual_total(self, total):
+        self._virtual_total = total
+        self.refresh_virtual()
+
+    def refresh_virtual(self):
+        """重新向 row_provider 取可见窗口并按差异更新"""
+        if not self.virtual:
+            return
+        size = self._window_size()
+        self._virtual_top = max(0, min(self._virtual_top, self._virtual_total - size))
+        count = max(0, min(size, self._virtual_total - self._virtual_top))
+        self.sync_rows(self._provider(self._virtual_top, count) if count else [])
+        if self._scrollbar is not None and self._virtual_total:
+            first = self._virtual_top / self._virtual_total
+            last = (self._virtual_top + count) / self._virtual_total
+            self._scrollbar.set(first, last)
+
+    def scroll_rows(self, delta):
+        self.scroll_to(self._virtual_top + delta)
+
+    def scroll_to(self, top):
+        if not self.virtual:
+            return
+        top = max(0, min(int(top), self._virtual_total - self._window_size()))
+        if top != self._virtual_top:
+            self._virtual_top = top
+            self.refresh_virtual()
+
+    def _on_scrollbar(self, action, value, unit=None):
+        if action == "moveto":
+            self.scroll_to(float(value) * self._virtual_total)
+        elif action == "scroll":
+            step = self._window_size() if unit == "pages" else 1
+            self.scroll_rows(int(value) * step)
+
+    def _on_mousewheel(self, event):
+        if self.virtual:
+            self._on_wheel_steps(-3 if event.delta > 0 else 3)
+            return "break"
+
+    def _on_wheel_steps(self, steps):
+        if self.virtual:
+            self.scroll_rows(steps)
+            return "break"
+
+    def _on_key_up(self, event):
+        return self._move_selection(-1)
+
+    def _on_key_down(self, event):
+        return self._move_selection(1)
+
+    def _move_selection(self, step):
+        """虚拟模式下选中行到达窗口边缘时滚动一行并保持选中位置"""
+        if not self.virtual:
+            return None
+        children = self.get_children()
+        selected = self.selection()
+        if not children or not selected:
+            return None
+        index = children.index(selected[0]) if selected[0] in children else 0
+        edge = index + step
+        if 0 <= edge < len(children):
+            return None
+        self.scroll_rows(step)
+        children = self.get_children()
+        if children:
+            target = children[0] if step < 0 else children[-1]
+            self.selection_set(target)
+            self.focus(target)
+        return "break"
 
     def _start_edit(self, event):
         """双击进入编辑模式：创建 Entry 覆盖到单元格位置"""
@@ -83,10 +246,8 @@ class EditableTreeview(ttk.Treeview):
 
     def _save_edit(self, event=None):
         """保存编辑（Enter 或失焦）"""
-        print("保存编辑")
         if not self._editor:
             return
-        print("保存编辑2")
         new_value = self._editor.get()
         row_id = self._edit_row_id
         col_name = self._edit_col_name
@@ -108,7 +269,6 @@ class EditableTreeview(ttk.Treeview):
             except Exception as e:
                 print("EditableTreeview: on_edit_done 回调异常", e)
                 success = False
-        print(f"编辑结果: {success}")
 
         # DB 更新成功 → 写入新值
         if success:
@@ -116,6 +276,8 @@ class EditableTreeview(ttk.Treeview):
         else:
             # ❗失败 → 回滚 UI
             self.set(row_id, col_name, old_value)
+        # 直接改过单元格，差异缓存作废
+        self._row_values.pop(row_id, None)
 
     def _cancel_edit(self, event=None):
         """Esc 取消编辑（不保存）"""
@@ -0,0 +1,332 @@
+"""
+内置性能埋点：按操作名统计耗时直方图与 SQL 语句数。
+
+    WORDLEARNER_INSTRUMENT=1 python main_app.py                # 启动即开启（界面 F12 打开调试面板）
+    WORDLEARNER_INSTRUMENT_JSON=stats.json python cli.py ...   # 开启并在退出时写出 JSON
+
+关闭时包装函数只多一次布尔判断，不注册 SQL 事件监听；开启后：
+- timed / instrument_class 包装的函数与 span 代码块记录耗时（对数分桶直方图）
+- 生成器只累计生成器体运行的时间：yield 出去后挂起（连同体内未关闭的 span），调用方在两次迭代之间的耗时与 SQL 不计入
+- 已注册引擎上的每条 SQL 计入当前线程中所有正在进行的操作（包含嵌套调用）
+"""
+import atexit
+import bisect
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+from contextlib import nullcontext
+
+# 直方图桶上界（毫秒），最后一个桶收纳更慢的调用
+BUCKETS_MS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+_enabled = False
+_lock = threading.Lock()
+_local = threading.local()
+_ops = {}       # {操作名: Histogram}
+_sql = {}       # {引擎标签: 语句数}
+_engines = []   # [(engine, 标签)]
+_attached = []  # 已注册监听的 (engine, 回调)
+_started = time.time()
+_NULL = nullcontext()
+
+
+class Histogram:
+    """单个操作的耗时分布与 SQL 计数"""
+
+    __slots__ = ("count", "errors", "total", "max", "sql", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.sql = 0
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+
+    def add(self, ms, failed=False):
+        self.count += 1
+        self.total += ms
+        if ms > self.max:
+            self.max = ms
+        if failed:
+            self.errors += 1
+        self.buckets[bisect.bisect_left(BUCKETS_MS, ms)] += 1
+
+    def percentile(self, q):
+        """按桶估计分位数：返回所在桶的上界（最后一个桶用最大值）"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= rank and n:
+                return min(BUCKETS_MS[i], self.max) if i < len(BUCKETS_MS) else self.max
+        return self.max
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "total_ms": self.total,
+            "mean_ms": self.total / self.count if self.count else 0.0,
+            "p50_ms": self.percentile(0.5),
+            "p95_ms": self.percentile(0.95),
+            "p99_ms": self.percentile(0.99),
+            "max_ms": self.max,
+            "sql": self.sql,
+            "sql_per_call": self.sql / self.count if self.count else 0.0,
+            "buckets": dict(zip([str(b) for b in BUCKETS_MS] + ["inf"], self.buckets)),
+        }
+
+
+def _stack():
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+def _histogram(name):
+    hist = _ops.get(name)
+    if hist is None:
+        hist = _ops[name] = Histogram()
+    return hist
+
+
+def record(name, seconds, failed=False):
+    """直接记录一次耗时（秒）"""
+    with _lock:
+        _histogram(name).add(seconds * 1000, failed)
+
+
+class _Span:
+    __slots__ = ("name", "t0")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        _stack().append(self.name)
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.t0
+        _pop(self.name)
+        record(self.name, elapsed, exc_type is not None)
+        return False
+
+
+def _pop(name):
+    """按名字移除当前线程栈中最近的一项"""
+    stack = _stack()
+    for i in range(len(stack) - 1, -1, -1):
+        if stack[i] == name:
+            del stack[i]
+            break
+
+
+class _GenSegment:
+    """
+    生成器的一段执行：进入时入栈，离开时出栈并累计耗时；整个迭代结束后才记录一次。
+    生成器体内打开、跨 yield 未关闭的 span（如 db.auto_session）在挂起时一并移出栈，恢复时放回。
+    """
+    __slots__ = ("name", "t0", "elapsed", "failed", "depth", "inner")
+
+    def __init__(self, name):
+        self.name = name
+        self.elapsed = 0.0
+        self.failed = False
+        self.depth = 0
+        self.inner = []
+
+    def __enter__(self):
+        stack = _stack()
+        self.depth = len(stack)
+        stack.append(self.name)
+        stack.extend(self.inner)
+        self.inner = []
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.elapsed += time.perf_counter() - self.t0
+        stack = _stack()
+        if self.depth < len(stack) and stack[self.depth] == self.name:
+            self.inner = stack[self.depth + 1:]
+            del stack[self.depth:]
+        else:
+            _pop(self.name)
+        if exc_type is not None and not issubclass(exc_type, (StopIteration, GeneratorExit)):
+            self.failed = True
+        return False
+
+
+def _timed_generator(gen, name):
+    """代理 gen（含 send / throw / close），只在生成器体运行期间计时与计 SQL"""
+    segment = _GenSegment(name)
+    try:
+        with segment:
+            item = next(gen)
+        while True:
+            try:
+                value = yield item
+            except GeneratorExit:
+                with segment:
+                    gen.close()
+                raise
+            except BaseException as e:
+                with segment:
+                    item = gen.throw(e)
+            else:
+                with segment:
+                    item = gen.send(value)
+    except StopIteration as stop:
+        return stop.value
+    finally:
+        record(name, segment.elapsed, segment.failed)
+
+
+def span(name):
+    """计时代码块：with span("ui.render"): ...；关闭时返回共享的空上下文"""
+    return _Span(name) if _enabled else _NULL
+
+
+def wrap(fn, name):
+    """包装函数；生成器函数记录一次完整迭代中生成器体自身的耗时（不含 yield 出去的时间）"""
+    if inspect.isgeneratorfunction(fn):
+        @functools.wraps(fn)
+        def gen_wrapper(*args, **kwargs):
+            if not _enabled:
+                return (yield from fn(*args, **kwargs))
+            return (yield from _timed_generator(fn(*args, **kwargs), name))
+        return gen_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not _enabled:
+            return fn(*args, **kwargs)
+        with _Span(name):
+            return fn(*args, **kwargs)
+    return wrapper
+
+
+def timed(name):
+    """装饰器形式的 wrap"""
+    return lambda fn: wrap(fn, name)
+
+
+def instrument_class(cls, prefix, names=None):
+    """
+    包装类中的方法（含 staticmethod / classmethod），操作名为 "prefix.方法名"。
+    names 为空时包装所有公开方法。
+    """
+    for attr, value in list(vars(cls).items()):
+        if names is not None:
+            if attr not in names:
+                continue
+        elif attr.startswith("_"):
+            continue
+        name = f"{prefix}.{attr}"
+        if isinstance(value, staticmethod):
+            setattr(cls, attr, staticmethod(wrap(value.__func__, name)))
+        elif isinstance(value, classmethod):
+            setattr(cls, attr, classmethod(wrap(value.__func__, name)))
+        elif inspect.isfunction(value):
+            setattr(cls, attr, wrap(value, name))
+    return cls
+
+
+# ------------------- SQL 计数 -------------------
+def _make_listener(label):
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        with _lock:
+            _sql[label] = _sql.get(label, 0) + 1
+            for name in set(_stack()):
+                _histogram(name).sql += 1
+    return before_cursor_execute
+
+
+def _attach(engine, label):
+    from sqlalchemy import event
+    listener = _make_listener(label)
+    event.listen(engine, "before_cursor_execute", listener)
+    _attached.append((engine, listener))
+
+
+def register_engine(engine, label):
+    """登记需要统计 SQL 的引擎；开启时才真正挂监听"""
+    _engines.append((engine, label))
+    if _enabled:
+        _attach(engine, label)
+
+
+# ------------------- 开关与导出 -------------------
+def enabled():
+    return _enabled
+
+
+def enable():
+    global _enabled
+    if _enabled:
+        return
+    for engine, label in _engines:
+        _attach(engine, label)
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    if not _enabled:
+        return
+    _enabled = False
+    from sqlalchemy import event
+    while _attached:
+        engine, listener = _attached.pop()
+        event.remove(engine, "before_cursor_execute", listener)
+
+
+def reset():
+    global _started
+    with _lock:
+        _ops.clear()
+        _sql.clear()
+        _started = time.time()
+
+
+def snapshot():
+    """当前统计：{"enabled", "seconds", "sql": {引擎: 语句数}, "ops": {操作名: 摘要}}"""
+    with _lock:
+        return {
+            "enabled": _enabled,
+            "seconds": time.time() - _started,
+            "sql": dict(_sql),
+            "ops": {name: hist.summary() for name, hist in sorted(_ops.items())},
+        }
+
+
+def dump_json(path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(snapshot(), f, indent=2, ensure_ascii=False)
+    return path
+
+
+def report(top=None):
+    """按总耗时排序的文本表"""
+    ops = sorted(snapshot()["ops"].items(), key=lambda item: item[1]["total_ms"], reverse=True)
+    lines = [f"{'操作':<36}{'次数':>8}{'平均ms':>10}{'p95ms':>10}{'最大ms':>10}{'SQL/次':>9}"]
+    for name, s in ops[:top]:
+        lines.append(f"{name:<36}{s['count']:>8}{s['mean_ms']:>10.2f}{s['p95_ms']:>10.2f}"
+                     f"{s['max_ms']:>10.2f}{s['sql_per_call']:>9.1f}")
+    return "\n".join(lines)
+
+
+if os.environ.get("WORDLEARNER_INSTRUMENT", "") not in ("", "0"):
+    enable()
+if os.environ.get("WORDLEARNER_INSTRUMENT_JSON"):
+    enable()
+    atexit.register(dump_json, os.environ["WORDLEARNER_INSTRUMENT_JSON"])
@@ -0,0 +1,103 @@
+"""
+TSV 单词表的流式解析。
+
+只依赖标准库，不导入数据库相关模块，便于在进程池中解析：
+子进程按字节区间解析一段文件，主进程按顺序把结果交给唯一的写入者。
+"""
+import glob
+import os
+
+DECK_PATTERNS = ("*.tsv", "*.txt")
+CHUNK_BYTES = 4 * 1024 * 1024   # 进程池中每个解析任务的字节数
+
+
+def parse_line(line: str):
+    """解析一行 TSV：word, trans[, ipa]；无效行返回 None"""
+    parts = line.strip().split("\t")
+    if len(parts) < 2:
+        return None
+    word, trans = parts[:2]
+    ipa = parts[2] if len(parts) > 2 else None
+    return word, trans, ipa
+
+
+def iter_lines(path: str, offset: int = 0, line_no: int = 0):
+    """
+    惰性逐行解析，yield (行号, 该行结束处的字节偏移, (word, trans, ipa))。
+    以二进制方式读取以得到准确的字节偏移；offset 必须位于行首。
+    """
+    with open(path, "rb") as f:
+        f.seek(offset)
+        for raw in f:
+            offset += len(raw)
+            line_no += 1
+            row = parse_line(raw.decode("utf-8"))
+            if row is not None:
+                yield line_no, offset, row
+
+
+def split_ranges(path: str, start: int = 0, chunk_bytes: int = CHUNK_BYTES):
+    """把 [start, 文件末尾) 切成约 chunk_bytes 大小、按行对齐的区间 [(begin, end)]"""
+    size = os.path.getsize(path)
+    ranges = []
+    with open(path, "rb") as f:
+        begin = start
+        while begin < size:
+            f.seek(min(begin + chunk_bytes, size))
+            if f.tell() < size:
+                f.readline()          # 对齐到下一行行首
+            end = min(f.tell(), size)
+            ranges.append((begin, end))
+            begin = end
+    return ranges
+
+
+def parse_range(path: str, begin: int, end: int):
+    """
+    进程池任务：解析 [begin, end) 区间，返回 (rows, 行数)。
+    rows = [(区间内相对行号, 行结束偏移, (word, trans, ipa))]
+    """
+    rows = []
+    line_no = 0
+    with open(path, "rb") as f:
+        f.seek(begin)
+        offset = begin
+        while offset < end:
+            raw = f.readline()
+            if not raw:
+                break
+            offset += len(raw)
+            line_no += 1
+            row = parse_line(raw.decode("utf-8"))
+            if row is not None:
+                rows.append((line_no, offset, row))
+    return rows, line_no
+
+
+def expand_paths(specs):
+    """
+    把文件、目录、通配符展开为有序去重的文件列表；
+    目录只取其中的 .tsv / .txt 文件（不递归）。
+    """
+    if isinstance(specs, str):
+        specs = [specs]
+    paths = []
+    for spec in specs:
+        if os.path.isdir(spec):
+            matches = []
+            for pattern in DECK_PATTERNS:
+                matches.extend(glob.glob(os.path.join(spec, pattern)))
+        elif glob.has_magic(spec):
+            matches = glob.glob(spec)
+        else:
+            paths.append(spec)   # 普通路径原样保留，不存在时由导入报错
+            continue
+        paths.extend(sorted(m for m in matches if os.path.isfile(m)))
+
+    result, seen = [], set()
+    for path in paths:
+        key = os.path.abspath(path)
+        if key not in seen:
+            seen.add(key)
+            result.append(path)
+    return result
@@ -0,0 +1,56 @@
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class DataWorker:
+    """
+    数据访问执行器：在后台线程调用 service，返回 Future，并用 root.after 把结果交回 Tk 线程。
+
+    submit 时指定 channel，同一 channel 只有最新一次请求的结果会被交付；
+    例如连续翻页时，先发出、后返回的旧页结果会被直接丢弃。
+    """
+
+    def __init__(self, root, max_workers=2):
+        self.root = root
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="data-worker")
+        self._tokens = itertools.count(1)
+        self._latest = {}
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    def submit(self, fn, *args, channel=None, on_done=None, on_error=None, **kwargs):
+        token = next(self._tokens)
+        if channel is not None:
+            with self._lock:
+                self._latest[channel] = token
+        future = self._executor.submit(fn, *args, **kwargs)
+        future.add_done_callback(lambda f: self._deliver(f, channel, token, on_done, on_error))
+        return future
+
+    def is_current(self, channel, token):
+        with self._lock:
+            return self._latest.get(channel) == token
+
+    def _deliver(self, future, channel, token, on_done, on_error):
+        """工作线程中调用：转交 Tk 线程"""
+        try:
+            self.root.after(0, self._dispatch, future, channel, token, on_done, on_error)
+        except RuntimeError:
+            pass  # 窗口已销毁
+
+    def _dispatch(self, future, channel, token, on_done, on_error):
+        if channel is not None and not self.is_current(channel, token):
+            self.dropped += 1
+            return
+        error = future.exception()
+        if error is not None:
+            if on_error:
+                on_error(error)
+            else:
+                print(f"[ERROR] 后台查询失败: {error}")
+        elif on_done:
+            on_done(future.result())
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,80 @@
+import tkinter as tk
+from tkinter import ttk, filedialog
+
+from util import instrument
+
+REFRESH_MS = 1000
+_COLUMNS = (
+    ("op", "操作", 220), ("count", "次数", 70), ("mean", "平均ms", 80), ("p50", "p50ms", 80),
+    ("p95", "p95ms", 80), ("max", "最大ms", 80), ("sql", "SQL/次", 70), ("errors", "失败", 60),
+)
+
+
+class DebugPanel:
+    """
+    调试面板：实时显示 util.instrument 的耗时与 SQL 统计，可开关埋点、清零与导出 JSON。
+    extra 返回额外的 {名称: 值}（如缓存命中率），显示在表格下方。
+    """
+
+    def __init__(self, root, extra=None):
+        self.extra = extra
+        self.window = tk.Toplevel(root)
+        self.window.title("调试面板")
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+        self._after = None
+
+        bar = ttk.Frame(self.window, padding=5)
+        bar.pack(fill="x")
+        self.enabled = tk.BooleanVar(value=instrument.enabled())
+        ttk.Checkbutton(bar, text="开启统计", variable=self.enabled,
+                        command=self.on_toggle).pack(side="left", padx=5)
+        ttk.Button(bar, text="清零", command=self.on_reset).pack(side="left", padx=5)
+        ttk.Button(bar, text="导出 JSON", command=self.on_dump).pack(side="left", padx=5)
+        self.summary = ttk.Label(bar, text="")
+        self.summary.pack(side="left", padx=10)
+
+        self.tree = ttk.Treeview(self.window, columns=[c[0] for c in _COLUMNS], show="headings", height=18)
+        for col, text, width in _COLUMNS:
+            self.tree.heading(col, text=text)
+            self.tree.column(col, width=width, anchor="w" if col == "op" else "e")
+        self.tree.pack(fill="both", expand=True, padx=5)
+        self.extra_label = ttk.Label(self.window, text="", justify="left", padding=5)
+        self.extra_label.pack(fill="x")
+        self.refresh()
+
+    def on_toggle(self):
+        if self.enabled.get():
+            instrument.enable()
+        else:
+            instrument.disable()
+
+    def on_reset(self):
+        instrument.reset()
+        self.refresh()
+
+    def on_dump(self):
+        path = filedialog.asksaveasfilename(parent=self.window, defaultextension=".json",
+                                            filetypes=[("JSON", "*.json")])
+        if path:
+            instrument.dump_json(path)
+
+    def refresh(self):
+        snap = instrument.snapshot()
+        ops = sorted(snap["ops"].items(), key=lambda item: item[1]["total_ms"], reverse=True)
+        self.tree.delete(*self.tree.get_children())
+        for name, s in ops:
+            self.tree.insert("", "end", values=(
+                name, s["count"], f"{s['mean_ms']:.2f}", f"{s['p50_ms']:.2f}", f"{s['p95_ms']:.2f}",
+                f"{s['max_ms']:.2f}", f"{s['sql_per_call']:.1f}", s["errors"],
+            ))
+        sql = ", ".join(f"{label} {n}" for label, n in sorted(snap["sql"].items())) or "0"
+        self.summary.config(text=f"SQL 语句: {sql}    统计时长 {snap['seconds']:.0f} 秒")
+        if self.extra:
+            self.extra_label.config(text="\n".join(f"{k}: {v}" for k, v in self.extra().items()))
+        self._after = self.window.after(REFRESH_MS, self.refresh)
+
+    def close(self):
+        if self._after is not None:
+            self.window.after_cancel(self._after)
+            self._after = None
+        self.window.destroy()
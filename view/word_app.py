@@ -1,13 +1,22 @@
-import copy
+import os
 import threading
+import time
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 
+from service.deck_pack import DeckPack, PACK_SUFFIX
 from service.file_service import FileService
+from service.search_service import SearchService
+from service.review_service import ReviewService, REVIEW_BATCH, GRADE_AGAIN, GRADE_HARD, GRADE_GOOD, GRADE_EASY
 from service.word_service import WordService, WordDisplay
+from service.write_behind import WriteBehindQueue
 from util.editable_treeview import EditableTreeview
+from util.instrument import instrument_class
+from view.debug_panel import DebugPanel
+from view.data_worker import DataWorker
 
 PAGE_SIZE = 30
+SEARCH_DEBOUNCE_MS = 150
 
 class WordApp:
     def __init__(self, root):
@@ -15,14 +24,40 @@ class WordApp:
         self.root.title("单词学习助手 (ORM)")
         self.current_file_id = None
         self.current_page = 0
+        self.total_pages = 1
         self.words_cache = {} # {iid: WordDisplay}
+        # 显示/隐藏状态由界面自己记录，不再从表格单元格里反读
+        self.shown = {}  # {iid: bool}
+        self.reveal_all = False
+        # 滚动浏览（虚拟表格）状态
+        self.virtual_file_id = None
+        self.virtual_total = 0
+        self._virtual_loading = set()
         # service层（全部为静态类）
         self.file_service = FileService
         self.word_service = WordService
-
-        # 初始化界面
+        self.search_service = SearchService
+        # 搜索：非空时表格显示搜索结果而不是当前文件
+        self.search_query = ""
+        self._search_after = None
+        # 复习：表格显示全部文件中最早到期的卡片
+        self.review_service = ReviewService
+        self._reviews_inflight = 0
+        self.debug_panel = None
+        self.files_loaded_at = None  # 文件列表第一次显示的时刻（启动耗时统计用）
+        # 所有数据库访问都在后台执行，结果经 root.after 回到 Tk 线程
+        self.data_worker = DataWorker(self.root)
+        # 切换/编辑先乐观更新，由后台线程合并后批量写库
+        self.writer = WriteBehindQueue(
+            on_error=lambda failures: self.root.after(0, self._on_write_failed, failures),
+            on_flushed=lambda new_audio: self.root.after(0, self._on_audio_updated, new_audio),
+        )
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+
+        # 初始化界面；首次查询在后台线程里完成建表 / 迁移检查，音频模块随后在后台导入
         self.setup_ui()
         self.load_file_list()
+        self.data_worker.submit(self.word_service.load_audio_modules)
 
     # ------------------- UI 初始化 -------------------
     def setup_ui(self):
@@ -34,6 +69,8 @@ class WordApp:
         top_frame.pack(pady=5, fill="x")
 
         ttk.Button(top_frame, text="导入文件", command=self.import_file).pack(side="left", padx=5)
+        ttk.Button(top_frame, text="导入目录", command=self.import_directory).pack(side="left", padx=5)
+        ttk.Button(top_frame, text="导出卡组", command=self.export_deck).pack(side="left", padx=5)
         ttk.Label(top_frame, text="选择文件:").pack(side="left", padx=5)
 
         self.file_combo = ttk.Combobox(top_frame, state="readonly")
@@ -45,23 +82,48 @@ class WordApp:
         self.page_label.pack(side="left", padx=5)
         ttk.Button(top_frame, text="下一页", command=self.next_page).pack(side="left", padx=5)
         ttk.Button(top_frame, text="显示全部已学会", command=self.show_all_learned).pack(side="left", padx=5)
+        self.scroll_mode = tk.BooleanVar(value=False)
+        ttk.Checkbutton(top_frame, text="滚动浏览", variable=self.scroll_mode,
+                        command=self.on_scroll_mode_changed).pack(side="left", padx=5)
+        ttk.Label(top_frame, text="搜索:").pack(side="left", padx=5)
+        self.search_var = tk.StringVar()
+        self.search_entry = ttk.Entry(top_frame, textvariable=self.search_var, width=20)
+        self.search_entry.pack(side="left", padx=5)
+        self.search_entry.bind("<KeyRelease>", self.on_search_changed)
+        self.search_entry.bind("<Escape>", self.clear_search)
+        self.review_mode = tk.BooleanVar(value=False)
+        ttk.Checkbutton(top_frame, text="复习", variable=self.review_mode,
+                        command=self.on_review_mode_changed).pack(side="left", padx=5)
 
         # 进度条
         self.progress = ttk.Progressbar(frame, length=400, mode="determinate")
         self.progress.pack(pady=5)
 
+        # 复习评分按钮（仅复习模式显示）
+        self.review_frame = ttk.Frame(frame)
+        for text, grade in (("重来 (3)", GRADE_AGAIN), ("困难 (4)", GRADE_HARD),
+                            ("良好 (5)", GRADE_GOOD), ("简单 (6)", GRADE_EASY)):
+            ttk.Button(self.review_frame, text=text,
+                       command=lambda g=grade: self.grade_selected(g)).pack(side="left", padx=5)
+
         # 表格显示
+        table_frame = ttk.Frame(frame)
+        table_frame.pack(fill="both", expand=True)
+        self.table_frame = table_frame
         columns = ("word", "trans", "ipa", "sound", "status", "learned")
         editable_cols = ("word", "trans", "ipa")
         self.tree = EditableTreeview(
-                        frame,
+                        table_frame,
                         columns=columns,
                         editable_columns=editable_cols,
                         show="headings",
                         height=20,
                         on_edit_done=self.on_cell_edited  # 绑定回调
                     )
-        self.tree.pack(fill="both", expand=True)
+        self.scrollbar = ttk.Scrollbar(table_frame, orient="vertical", command=self.tree.yview)
+        self.tree.configure(yscrollcommand=self.scrollbar.set)
+        self.scrollbar.pack(side="right", fill="y")
+        self.tree.pack(side="left", fill="both", expand=True)
         for col, text, width in zip(columns,
                                     ["单词/短语", "中文翻译", "音标", "🔊播放", "状态", "结果"],
                                     [200, 250, 150, 80, 100, 100]):
@@ -70,79 +132,371 @@ class WordApp:
 
         # 事件绑定
         self.tree.bind("<ButtonRelease-1>", self.on_click)
+        self.tree.bind("<<TreeviewSelect>>", self.on_select)
         self.root.bind("<space>", self.on_space_key)
         self.root.bind("<Key-1>", self.on_key_1)
         self.root.bind("<Key-2>", self.on_key_2)
         self.root.bind("<Left>", self.on_space_key)
         self.root.bind("<Right>", self.on_key_1)
+        for key, grade in (("3", GRADE_AGAIN), ("4", GRADE_HARD), ("5", GRADE_GOOD), ("6", GRADE_EASY)):
+            self.root.bind(f"<Key-{key}>", lambda e, g=grade: self.on_grade_key(e, g))
+        self.root.bind("<F12>", self.open_debug_panel)
 
     # ------------------- 文件导入 -------------------
     def import_file(self):
-        path = filedialog.askopenfilename(filetypes=[
+        paths = filedialog.askopenfilenames(filetypes=[
             ("TSV文件", "*.tsv"),
             ("TXT文件", "*.txt"),
+            ("卡组打包文件", f"*{PACK_SUFFIX}"),
             ("所有文件", "*.*")
         ])
+        if not paths:
+            return
+        threading.Thread(target=self._import_file_thread, args=(list(paths),), daemon=True).start()
+
+    def import_directory(self):
+        """导入目录下的全部 .tsv / .txt 文件"""
+        path = filedialog.askdirectory()
         if not path:
             return
-        threading.Thread(target=self._import_file_thread, args=(path,), daemon=True).start()
+        threading.Thread(target=self._import_file_thread, args=([path],), daemon=True).start()
 
-    def _import_file_thread(self, path):
+    def _import_file_thread(self, paths):
+        # 卡组打包文件整体导入（不调用 TTS），其余交给逐行解析的导入流程
+        packs = [p for p in paths if p.lower().endswith(PACK_SUFFIX)]
+        paths = [p for p in paths if p not in packs]
+        skipped = []
         try:
-            for idx, total in self.file_service.import_file(path):
-                self.root.after(0, lambda i=idx, t=total: self.progress.config(value=i, maximum=t))
+            for pack in packs:
+                if DeckPack.import_pack(pack) is None:
+                    skipped.append(os.path.basename(pack))
+            if paths:
+                for idx, total in self.file_service.import_many(paths):
+                    self.root.after(0, lambda i=idx, t=total: self.progress.config(value=i, maximum=t))
         except Exception as e:
-            self.root.after(0, lambda: messagebox.showerror("导入失败", str(e)))
+            self.root.after(0, lambda e=e: messagebox.showerror("导入失败", str(e)))
         else:
-            self.root.after(0, self._on_import_finished)
+            self.root.after(0, self._on_import_finished, skipped)
 
-    def _on_import_finished(self):
+    def _on_import_finished(self, skipped=()):
         self.load_file_list()
         self.progress.config(value=0)
-        messagebox.showinfo("完成", "文件导入完成！")
+        if skipped:
+            # 卡组同名文件已存在时 import_pack 跳过整个卡组
+            messagebox.showwarning("导入结束", "以下卡组的同名文件已存在，已跳过：\n" + "\n".join(skipped))
+        else:
+            messagebox.showinfo("完成", "文件导入完成！")
+
+    def export_deck(self):
+        """把当前选择的文件连同学习状态与音频导出为卡组打包文件"""
+        filename = self.file_combo.get()
+        if not filename:
+            messagebox.showwarning("提示", "请先选择要导出的文件")
+            return
+        path = filedialog.asksaveasfilename(defaultextension=PACK_SUFFIX,
+                                            initialfile=filename.rsplit(".", 1)[0] + PACK_SUFFIX,
+                                            filetypes=[("卡组打包文件", f"*{PACK_SUFFIX}")])
+        if not path:
+            return
+        threading.Thread(target=self._export_deck_thread, args=(filename, path), daemon=True).start()
+
+    def _export_deck_thread(self, filename, path):
+        try:
+            stats = DeckPack.export(filename, path)
+        except Exception as e:
+            self.root.after(0, lambda e=e: messagebox.showerror("导出失败", str(e)))
+        else:
+            self.root.after(0, lambda: messagebox.showinfo(
+                "完成", f"已导出 {stats['words']} 个单词、{stats['audio']} 段音频"))
 
     # ------------------- 文件列表 -------------------
     def load_file_list(self):
-        self.file_combo["values"] = self.file_service.list_files()
+        self.data_worker.submit(
+            self.file_service.list_files, channel="files", on_done=self._on_file_list,
+        )
+
+    def _on_file_list(self, names):
+        self.file_combo.configure(values=names)
+        if self.files_loaded_at is None:
+            self.files_loaded_at = time.perf_counter()
 
     def on_file_selected(self, event):
         filename = self.file_combo.get()
-        file_id = self.file_service.get_file_id(filename)
+        self.data_worker.submit(self.file_service.get_file_id, filename, channel="file",
+                                on_done=self._on_file_id)
+
+    def _on_file_id(self, file_id):
         if file_id:
             self.current_file_id = file_id
             self.current_page = 0
-            self.refresh_table()
+            # 选择文件即回到浏览：退出复习 / 清空搜索都会重新加载当前文件
+            if self.review_mode.get():
+                self.review_mode.set(False)
+                self.on_review_mode_changed()
+            elif self.search_query:
+                self.clear_search()
+            else:
+                self.refresh_table()
 
     # ------------------- 分页 -------------------
-    def refresh_table(self):
-        for row in self.tree.get_children():
-            self.tree.delete(row)
+    def _fetch_page(self, file_id, page):
+        """后台线程：读取一页及总数"""
+        displays = self.word_service.get_page(file_id, page, PAGE_SIZE)
+        total = self.word_service.count_displays(file_id)
+        return file_id, page, displays, total
 
+    def refresh_table(self):
+        if self.search_query:
+            self._run_search()
+            return
+        if self.review_mode.get():
+            self._load_review()
+            return
         if not self.current_file_id:
+            self.tree.clear_rows()
             return
+        if self.scroll_mode.get():
+            file_id = self.current_file_id
+            self.data_worker.submit(self.word_service.count_displays, file_id, channel="page",
+                                    on_done=lambda total: self._start_virtual(file_id, total))
+            return
+        self.data_worker.submit(self._fetch_page, self.current_file_id, self.current_page,
+                                channel="page", on_done=self._render_page)
 
-        offset = self.current_page * PAGE_SIZE
-        self.words_cache = self.word_service.get_displays_by_page(self.current_file_id, PAGE_SIZE, offset)
+    def _render_page(self, result):
+        file_id, page, displays, total = result
+        self.words_cache = displays
+        self.shown = {}
+        self.reveal_all = False
+        # 按差异更新：翻页时只替换变化的行
+        self.tree.sync_rows([(iid, self._row_values(d)) for iid, d in displays.items()])
+        self.word_service.warm_audio(self.words_cache.values())
 
-        for display in self.words_cache.values():
-            self.upsert_word_display(display, False)
+        self.total_pages = max((total - 1) // PAGE_SIZE + 1, 1)
+        self.page_label.config(text=f"第 {page + 1} / {self.total_pages} 页")
 
-        total = self.word_service.count_displays(self.current_file_id)
-        total_pages = max((total - 1) // PAGE_SIZE + 1, 1)
-        self.page_label.config(text=f"第 {self.current_page + 1} / {total_pages} 页")
+    def _browsing_file(self):
+        """是否在浏览当前文件（而不是搜索结果或复习队列）"""
+        return not self.search_query and not self.review_mode.get()
 
     def prev_page(self):
-        if self.current_page > 0:
+        if not self._browsing_file():
+            return
+        if self.tree.virtual:
+            self.tree.scroll_rows(-int(self.tree["height"]))
+        elif self.current_page > 0:
             self.current_page -= 1
             self.refresh_table()
 
     def next_page(self):
-        total = self.word_service.count_displays(self.current_file_id)
-        total_pages = max((total - 1) // PAGE_SIZE + 1, 1)
-        if self.current_page < total_pages - 1:
+        # 总页数来自最近一次加载的结果，无需在 Tk 线程查库
+        if not self._browsing_file():
+            return
+        if self.tree.virtual:
+            self.tree.scroll_rows(int(self.tree["height"]))
+        elif self.current_file_id and self.current_page < self.total_pages - 1:
             self.current_page += 1
             self.refresh_table()
 
+    # ------------------- 搜索 -------------------
+    def on_search_changed(self, event=None):
+        """输入停顿 SEARCH_DEBOUNCE_MS 后再查询，连续输入只执行最后一次"""
+        if self._search_after is not None:
+            self.root.after_cancel(self._search_after)
+        self._search_after = self.root.after(SEARCH_DEBOUNCE_MS, self._apply_search)
+
+    def clear_search(self, event=None):
+        self.search_var.set("")
+        self._apply_search()
+
+    def _apply_search(self):
+        self._search_after = None
+        query = self.search_var.get().strip()
+        if query == self.search_query:
+            return
+        was_searching = bool(self.search_query)
+        self.search_query = query
+        if query:
+            if self.review_mode.get():
+                self.review_mode.set(False)
+                self.review_frame.pack_forget()
+            if self.tree.virtual:
+                self.tree.clear_virtual()
+                self.virtual_file_id = None
+            self._run_search()
+        elif was_searching:
+            # 清空搜索：回到当前文件
+            self.words_cache = {}
+            self.tree.clear_rows()
+            self.refresh_table()
+
+    def _run_search(self):
+        query = self.search_query
+        self.data_worker.submit(self.search_service.search, query, channel="page",
+                                on_done=lambda results: self._render_search(query, results))
+
+    def _render_search(self, query, results):
+        if query != self.search_query:
+            return
+        self.words_cache = results
+        self.shown = {}
+        self.reveal_all = False
+        self.tree.sync_rows([(iid, self._row_values(d)) for iid, d in results.items()])
+        self.page_label.config(text=f"搜索结果 {len(results)} 条")
+
+    # ------------------- 复习 -------------------
+    def on_review_mode_changed(self):
+        """进入/退出复习模式"""
+        self.words_cache = {}
+        self.shown = {}
+        self.reveal_all = False
+        if self.tree.virtual:
+            self.tree.clear_virtual()
+            self.virtual_file_id = None
+        else:
+            self.tree.clear_rows()
+        if self.review_mode.get():
+            self.review_frame.pack(before=self.table_frame, pady=5)
+            self.search_var.set("")
+            self.search_query = ""
+        else:
+            self.review_frame.pack_forget()
+        self.refresh_table()
+
+    def _fetch_review(self):
+        """后台线程：取下一批到期卡片及到期总数"""
+        return self.review_service.next_due(REVIEW_BATCH), self.review_service.due_count()
+
+    def _load_review(self):
+        self.data_worker.submit(self._fetch_review, channel="page", on_done=self._render_review)
+
+    def _render_review(self, result):
+        if not self.review_mode.get():
+            return
+        displays, due = result
+        self.words_cache = displays
+        # 复习时先隐藏释义，按 1 显示后再评分
+        self.shown = {iid: False for iid in displays}
+        self.reveal_all = False
+        self.tree.sync_rows([(iid, self._row_values(d)) for iid, d in displays.items()])
+        children = self.tree.get_children()
+        if children:
+            self.tree.selection_set(children[0])
+            self.tree.focus(children[0])
+            self.page_label.config(text=f"待复习 {due} 条")
+        else:
+            self.page_label.config(text="暂无到期卡片")
+        self.word_service.warm_audio(displays.values())
+
+    def on_grade_key(self, event, grade):
+        if self._typing(event) or not self.review_mode.get():
+            return
+        self.grade_selected(grade)
+
+    def grade_selected(self, grade):
+        """给选中的卡片评分：从表格移除并在后台记录，本批复习完后取下一批"""
+        selected = self.tree.selection()
+        if not selected:
+            return
+        display = self.words_cache.pop(selected[0], None)
+        if display is None:
+            return
+        self.shown.pop(display.iid, None)
+        children = list(self.tree.get_children())
+        index = children.index(display.iid)
+        self.tree.sync_rows([(iid, self._row_values(d)) for iid, d in self.words_cache.items()])
+        children = self.tree.get_children()
+        if children:
+            following = children[min(index, len(children) - 1)]
+            self.tree.selection_set(following)
+            self.tree.focus(following)
+
+        self._reviews_inflight += 1
+        self.data_worker.submit(self.review_service.review, display.word_id, grade,
+                                on_done=self._on_reviewed, on_error=self._on_review_failed)
+
+    def _on_reviewed(self, _state):
+        self._reviews_inflight -= 1
+        # 等本批评分全部落库后再取下一批，避免刚评过的卡片再次出现
+        if self.review_mode.get() and not self.words_cache and self._reviews_inflight == 0:
+            self._load_review()
+
+    def _on_review_failed(self, error):
+        print(f"[ERROR] 记录复习失败: {error}")
+        self._on_reviewed(None)
+
+    # ------------------- 滚动浏览 -------------------
+    def on_scroll_mode_changed(self):
+        """在分页与滚动浏览之间切换"""
+        self.words_cache = {}
+        self.shown = {}
+        self.reveal_all = False
+        self.virtual_file_id = None
+        if self.tree.virtual:
+            self.tree.clear_virtual()
+        else:
+            self.tree.clear_rows()
+        self.refresh_table()
+
+    def _start_virtual(self, file_id, total):
+        if file_id != self.current_file_id or not self.scroll_mode.get() or not self._browsing_file():
+            return
+        self.virtual_total = total
+        if self.tree.virtual and self.virtual_file_id == file_id:
+            # 同一文件重新加载（如写库失败）：保持滚动位置
+            self.tree.set_virtual_total(total)
+            return
+        self.virtual_file_id = file_id
+        self.shown = {}
+        self.reveal_all = False
+        self._virtual_loading = set()
+        self.tree.set_virtual(self._virtual_rows, total, self.scrollbar)
+
+    def _virtual_rows(self, start, count):
+        """
+        虚拟表格的行来源（Tk 线程调用）：只读内存中的页缓存，
+        未缓存的页先显示占位行，并交给后台加载，加载完成后再刷新窗口。
+        """
+        file_id = self.current_file_id
+        pages = {}
+        rows = []
+        displays = {}
+        for index in range(start, start + count):
+            page, offset = divmod(index, PAGE_SIZE)
+            if page not in pages:
+                cached = self.word_service.peek_page(file_id, page, PAGE_SIZE)
+                pages[page] = list(cached.values()) if cached is not None else None
+                if cached is None:
+                    self._request_virtual_page(file_id, page)
+            items = pages[page]
+            if items is None or offset >= len(items):
+                rows.append((f"__loading_{index}", ("…", "", "", "", "", "")))
+                continue
+            display = items[offset]
+            displays[display.iid] = display
+            rows.append((display.iid, self._row_values(display)))
+
+        self.words_cache = displays
+        self.word_service.warm_audio(displays.values())
+        self.page_label.config(text=f"第 {start + 1}-{start + count} / {self.virtual_total} 条")
+        return rows
+
+    def _request_virtual_page(self, file_id, page):
+        key = (file_id, page)
+        if key in self._virtual_loading:
+            return
+        self._virtual_loading.add(key)
+        self.data_worker.submit(
+            self.word_service.get_page, file_id, page, PAGE_SIZE,
+            on_done=lambda _: self._on_virtual_page(key),
+            on_error=lambda e: self._virtual_loading.discard(key),
+        )
+
+    def _on_virtual_page(self, key):
+        self._virtual_loading.discard(key)
+        if key[0] == self.current_file_id and self.tree.virtual:
+            self.tree.refresh_virtual()
+
     # ------------------- 点击事件 -------------------
     def on_click(self, event):
         item = self.tree.identify_row(event.y)
@@ -153,19 +507,32 @@ class WordApp:
         if not display:
             return
 
-        if col == "#4" and display.gtts:
+        if col == "#4" and display.has_audio:
             # 播放音频
-            display.audio.play()
+            self.play_audio(display)
         elif col == "#5":
             self.upsert_word_display(display)
         elif col == "#6":
-            new_display = self.word_service.toggle_unlearned(display)
-            self.words_cache[item] = new_display
-            self.upsert_word_display(new_display, False)
+            self.writer.toggle_unlearned(display)
+            self.upsert_word_display(display, False)
+
+    def on_select(self, event):
+        """选中行时后台预取其音频，空格播放无需等待读库"""
+        for iid in self.tree.selection():
+            display = self.words_cache.get(iid)
+            if display:
+                display.prefetch_audio()
 
     # ------------------- 键盘事件 -------------------
+    @staticmethod
+    def _typing(event):
+        """在输入框中打字时不触发快捷键"""
+        return isinstance(event.widget, (tk.Entry, ttk.Entry))
+
     def on_key_1(self, event):
         """按 1 键切换显示/隐藏"""
+        if self._typing(event):
+            return
         selected = self.tree.selection()
         if not selected:
             return
@@ -176,25 +543,33 @@ class WordApp:
     
     def on_key_2(self, event):
         """按 1 键切换显示/隐藏"""
+        if self._typing(event):
+            return
         selected = self.tree.selection()
         if not selected:
             return
         iid = selected[0]
         d = self.words_cache.get(iid)
         if d:
-            new_display = self.word_service.toggle_unlearned(d)
-            self.words_cache[iid] = new_display
-            self.upsert_word_display(new_display, False)
+            self.writer.toggle_unlearned(d)
+            self.upsert_word_display(d, False)
 
     def on_space_key(self, event):
         """按空格播放当前选中行的语音"""
+        if self._typing(event):
+            return
         selected = self.tree.selection()
         if not selected:
             return
         iid = selected[0]
         display = self.words_cache.get(iid)
-        if display and display.gtts:
-            display.audio.play()
+        if display and display.has_audio:
+            self.play_audio(display)
+
+    def play_audio(self, display: WordDisplay):
+        """读库/解码放在后台；只播放最后一次请求的单词"""
+        self.data_worker.submit(display.audio.convert_audio, channel="audio",
+                                on_done=lambda _: display.audio.play())
 
     # ------------------- 状态切换 -------------------
     def upsert_word_display(self, display: WordDisplay, toggle_status=True):
@@ -206,43 +581,40 @@ class WordApp:
         :param switch: 是否触发显示状态切换
         """
 
-        def show_word(d: WordDisplay):
-            """显示单词详细信息"""
-            return (d.word, d.trans, d.ipa, "播放", "隐藏", d.is_unlearned)
-
-        def hide_word(d: WordDisplay):
-            """隐藏单词详细信息"""
-            return ("", "", "", "播放", "显示", d.is_unlearned)
-
-        # 如果是导入时插入且该单词未学习，则插入一行
-        if not self.tree.exists(display.iid):
-             # 初始显示状态根据 is_unlearned 决定
-            init_values = hide_word(display) if display.is_unlearned else show_word(display)
-            self.tree.insert("", "end", iid=display.iid, values=init_values)
-            return
-        
         if toggle_status:
-            # 读取当前行的显示状态
-            current = self.tree.item(display.iid, "values")
-            is_hidden = current and current[0] == ""
             # 普通点击：切换显示 / 隐藏
-            new_values = show_word(display) if is_hidden else hide_word(display)
+            self.shown[display.iid] = not self._is_shown(display)
         else:
-            new_values = hide_word(display) if display.is_unlearned else show_word(display)
+            # 学习状态变化：按 is_unlearned 重新决定显示状态
+            self.shown[display.iid] = not display.is_unlearned
+
+        # 虚拟模式下只更新当前已实例化的行
+        if self.tree.virtual and not self.tree.exists(display.iid):
+            return
+        self.tree.update_row(display.iid, self._row_values(display))
 
-        self.tree.item(display.iid, values=new_values)
+    def _is_shown(self, d: WordDisplay):
+        """初始显示状态根据 is_unlearned 决定"""
+        return self.shown.get(d.iid, self.reveal_all or not d.is_unlearned)
+
+    def _row_values(self, d: WordDisplay):
+        if self._is_shown(d):
+            # 显示单词详细信息
+            return (d.word, d.trans, d.ipa, "播放", "隐藏", d.is_unlearned)
+        # 隐藏单词详细信息
+        return ("", "", "", "播放", "显示", d.is_unlearned)
 
     def show_all_learned(self):
-        """恢复所有为可见状态"""
+        """恢复所有为可见状态（滚动浏览时对整个文件生效）"""
+        self.reveal_all = True
+        self.shown = {}
         for iid, display in self.words_cache.items():
-            self.tree.item(iid, values=(display.word, display.trans, display.ipa, "播放", "隐藏", display.is_unlearned))
+            self.tree.update_row(iid, self._row_values(display))
 
     def on_cell_edited(self, row_id, col_name, new_value):
         """
         单元格编辑完成后的回调
         """
-        print(f"[INFO] 单元格编辑完成: row_id={row_id}, col_name={col_name}, new_value={new_value}")
-
         wd_original = self.words_cache.get(row_id)
         if not wd_original:
             return False
@@ -251,32 +623,52 @@ class WordApp:
         if old_value == new_value:
             return True  # 值未改变，不做任何操作
 
-        # --- 创建副本 ---
-        wd_copy = copy.deepcopy(wd_original)
-        setattr(wd_copy, col_name, new_value)
-
-        print(f"[INFO] 尝试更新 row_id={row_id}, col={col_name} 从 '{old_value}' -> '{new_value}'")
-
-        # 调用统一的数据库更新方法
+        # 乐观更新内存对象，交给写后队列落库；失败时由 _on_write_failed 通知并重新加载
         try:
-            new_display = WordService.update_display(wd_copy, col_name)
+            self.writer.update_field(wd_original, col_name, new_value)
         except Exception as e:
             print(f"[ERROR] 更新失败: {e}")
             self._show_update_failed(col_name)
             return False
+        return True
 
-        if new_display:
-            # 更新缓存
-            self.words_cache[row_id] = new_display
-            return True
-        else:
-            self._show_update_failed(col_name)
-            return False
-        
+    def _on_write_failed(self, failures):
+        """后台写库失败：提示并从数据库重新加载当前页"""
+        fields = sorted({field for _, field, _, _ in failures})
+        self._show_update_failed(", ".join(fields))
+        self.refresh_table()
+
+    def _on_audio_updated(self, new_audio):
+        """修改单词后关联了新音频"""
+        for display in self.words_cache.values():
+            if display.word_id in new_audio:
+                display.set_audio_id(new_audio[display.word_id])
+
+    def on_close(self):
+        """退出前写完待写内容"""
+        self.data_worker.shutdown()
+        self.writer.close()
+        self.root.destroy()
 
-        # # 刷新 UI，例如重绘状态栏/某个统计区域
-        # self.refresh_some_ui_if_needed()
 
+    # ------------------- 调试 -------------------
+    def open_debug_panel(self, event=None):
+        """F12：耗时 / SQL 统计面板"""
+        if self.debug_panel is not None and self.debug_panel.window.winfo_exists():
+            self.debug_panel.window.lift()
+            return
+        self.debug_panel = DebugPanel(self.root, extra=self._debug_extra)
+
+    def _debug_extra(self):
+        from service.audio_service import pcm_cache
+        page = self.word_service.page_cache_stats()
+        pcm = pcm_cache.stats()
+        return {
+            "页缓存": f"命中率 {page['hit_rate']:.0%}（{page['size']}/{page['capacity']} 页）",
+            "解码缓存": f"命中 {pcm['hits']} / 未命中 {pcm['misses']}，{pcm['used_bytes'] // 1024} KiB",
+            "写后队列": f"待写 {self.writer.pending}，已写 {self.writer.stats['written']}，失败 {self.writer.stats['failed']}",
+            "丢弃的过期查询": self.data_worker.dropped,
+        }
 
     def _show_update_failed(self, col_name):
         """失败提示（避免重复写 messagebox）"""
@@ -284,3 +676,8 @@ class WordApp:
             messagebox.showerror("更新失败", f"无法更新字段 {col_name}，请重试。")
         except Exception:
             pass
+
+
+# 表格重绘耗时（Tk 线程）
+instrument_class(WordApp, "ui", ("_render_page", "_render_search", "_render_review", "_virtual_rows",
+                                "upsert_word_display", "show_all_learned"))